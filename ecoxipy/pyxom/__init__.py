@@ -192,8 +192,10 @@ bar
 The namespace URI is available as :attr:`Element.namespace_uri` and
 :attr:`Attribute.namespace_uri` (originally defined as
 :attr:`NamespaceNameMixin.namespace_uri`), these properties look up the
-namespace prefix of the node in the parent elements (this information is
-cached, so don't fear multiple retrieval):
+namespace prefix of the node in the namespace scope of its element. Scopes are
+created for elements declaring namespaces and shared by their descendants
+declaring none, they are cached until declarations change or elements are
+moved, so don't fear multiple retrieval:
 
 >>> xhtml_namespace_uri = u'http://www.w3.org/1999/xhtml/'
 >>> document[0][1].namespace_uri == xhtml_namespace_uri
@@ -239,6 +241,21 @@ If an undefined namespace prefix is used, the ``namespace_uri`` is
 True
 
 
+Changing namespace declarations affects the descendants of the element:
+
+>>> somexml = document[0][-1]
+>>> somexml.attributes['xmlns:foo'].value = 'foo://baz'
+>>> print(somexml[0].namespace_uri)
+foo://baz
+>>> del somexml.attributes['xmlns:foo']
+>>> somexml[0].namespace_uri
+False
+>>> foo_declaration = somexml.attributes.create_attribute('xmlns:foo',
+...     'foo://bar')
+>>> print(somexml[0].namespace_uri)
+foo://bar
+
+
 Indexes
 """""""
 
@@ -263,6 +280,17 @@ True
 False
 
 
+:attr:`~Document.elements_by_path` allows retrieval of elements by their path
+or path suffix:
+
+>>> list(document.elements_by_path['/article/div/p']) == [document[0][2][1]]
+True
+>>> list(document.elements_by_path['//p']) == [document[0][1], document[0][2][1]]
+True
+>>> '//html' in document.elements_by_path
+False
+
+
 Retrieve elements and attributes by their namespace data by using
 :attr:`~Document.nodes_by_namespace`:
 
@@ -301,6 +329,26 @@ True
 ... ))
 True
 
+Document Order
+""""""""""""""
+
+A :class:`Document` labels its nodes with order keys when
+:meth:`~Document.order_key` is first called, afterwards nodes can be compared
+by their position in the document in constant time. Index results and other
+node collections can thus be sorted in document order efficiently:
+
+>>> document.precedes(document[0][0], document[0][2][1])
+True
+>>> document.precedes(document[0][2][1], document[0][2])
+False
+>>> document.sort_in_document_order(document.elements_by_name['p']) == [
+...     document[0][1], document[0][2][1]]
+True
+>>> document.sort_in_document_order(document.elements_by_path['//p'],
+...     reverse=True) == [document[0][2][1], document[0][1]]
+True
+
+
 Manipulation and Equality
 ^^^^^^^^^^^^^^^^^^^^^^^^^
 
@@ -309,6 +357,187 @@ All :class:`XMLNode` instances have attributes which allow for modification.
 their contents like sequences.
 
 
+Bulk Modification
+"""""""""""""""""
+
+:meth:`~ContainerNode.extend`, slice assignment and deletion,
+:meth:`~ContainerNode.clear`, :meth:`~ContainerNode.replace_children` and
+:meth:`~ContainerNode.reverse` build the new children list at once and only
+rewire the siblings around the changed positions. Nodes are removed from
+their previous parents first:
+
+>>> source = b.div(b.p('a'), b.p('b'), b.p('c'))
+>>> target = b.div(b.hr)
+>>> target.extend(source)
+>>> print(target)
+<div><hr/><p>a</p><p>b</p><p>c</p></div>
+>>> len(source)
+0
+>>> target[1:3] = [b.br(), target[3]]
+>>> print(target)
+<div><hr/><br/><p>c</p></div>
+>>> target[1].next is target[2] and target[2].previous is target[1]
+True
+>>> del target[::2]
+>>> print(target)
+<div><br/></div>
+>>> target.replace_children(b.p(i) for i in range(3))
+>>> target.reverse()
+>>> print(target)
+<div><p>2</p><p>1</p><p>0</p></div>
+>>> target.clear()
+>>> print(target)
+<div/>
+
+
+Children are identified by identity. :meth:`~ContainerNode.index`,
+:meth:`~ContainerNode.remove` and the ``in`` operator use the parent and
+stored positions of the nodes instead of searching the children:
+
+>>> target.extend(b.p(i) for i in range(3))
+>>> paragraph = target[2]
+>>> target.index(paragraph)
+2
+>>> b.p(2) in target, paragraph in target
+(False, True)
+>>> target.remove(target[0])
+>>> target.index(paragraph)
+1
+
+
+Freezing
+""""""""
+
+:meth:`ContainerNode.freeze` makes a node without parent and its descendants
+immutable. The structural hashes and namespace data are computed once and
+frozen nodes are compared in constant time:
+
+>>> frozen = b.div(b.p('Hello', b.em('World')), b.br)
+>>> frozen.freeze()
+>>> frozen.frozen, frozen[0][1][0].frozen
+(True, True)
+>>> frozen == b.div(b.p('Hello', b.em('World')), b.br)
+True
+>>> other = b.div(b.p('Hello', b.em('World')), b.br)
+>>> other.freeze()
+>>> frozen == other and frozen is not other
+True
+>>> try:
+...     frozen[0][1][0].content = 'Universe'
+... except TypeError as e:
+...     print(e)
+Frozen nodes can not be modified.
+>>> try:
+...     target.append(frozen[0])
+... except TypeError as e:
+...     print(e)
+Frozen nodes can not be modified.
+>>> mutable = frozen.duplicate()
+>>> mutable[0][1][0].content = 'Universe'
+>>> print(mutable)
+<div><p>Hello<em>Universe</em></p><br/></div>
+
+
+Concurrent Reading
+""""""""""""""""""
+
+Some values are computed when they are first read, e.g. namespace data,
+lazily created children, document order keys and indexes. Those are computed
+only once even if multiple threads read concurrently. To avoid reading
+threads waiting for each other, :meth:`ContainerNode.warm_up` and
+:meth:`Document.warm_up` compute these values up front. Afterwards threads
+can read the structure without writing to it, as long as it is not modified:
+
+>>> import threading
+>>> shared = document.duplicate()
+>>> shared.warm_up()
+>>> results = []
+>>> def query():
+...     results.append((shared[0].namespace_uri,
+...         len(list(shared.elements_by_name[u'p'])), shared.create_str()))
+>>> threads = [threading.Thread(target=query) for i in range(4)]
+>>> for thread in threads:
+...     thread.start()
+>>> for thread in threads:
+...     thread.join()
+>>> results == [results[0]] * 4
+True
+>>> results[0][0] == xhtml_namespace_uri
+True
+>>> results[0][1]
+2
+
+
+Teardown
+""""""""
+
+Nodes reference their parents and siblings, so PyXOM trees contain
+reference cycles and are freed by the cyclic garbage collector.
+:meth:`ContainerNode.dispose` breaks the cycles, afterwards the nodes are
+freed as soon as they are no longer referenced. Documents call it when
+leaving a ``with`` block:
+
+>>> with document.duplicate() as disposable:
+...     print(disposable[0][1].name)
+p
+>>> len(disposable)
+0
+>>> paragraph = b.p('Hello', b.em('World'), count=1)
+>>> em = paragraph[1]
+>>> paragraph.dispose()
+>>> len(paragraph) == 0 and em.parent is None and em.previous is None
+True
+>>> print(em)
+<em/>
+>>> print(paragraph)
+<p count="1"/>
+
+
+If :attr:`ContainerNode.weak_parents` is set on the root node, parents are
+referenced weakly and siblings are looked up in the parent, so the tree
+contains no cycles at all:
+
+>>> weak = document.duplicate()
+>>> weak.weak_parents = True
+>>> weak[0][1].weak_parents
+True
+>>> weak[0][1][1].previous is weak[0][1][0] and weak[0][1].parent is weak[0]
+True
+>>> weak[0][1].append(b.br())
+>>> print(weak[0][1][-1].previous)
+!
+>>> weak.weak_parents = False
+>>> weak == document
+False
+>>> del weak[0][1][-1]
+>>> weak == document
+True
+
+
+Subtree Sizes
+"""""""""""""
+
+:attr:`ContainerNode.descendant_count` and :attr:`XMLNode.serialized_length`
+tell how big a subtree is, e.g. to paginate or split exports. If
+:attr:`ContainerNode.track_sizes` is set, the values are stored on the
+container nodes and updated on modification, so they are retrieved in
+constant time:
+
+>>> sized = b.div(b.p('Hello', b.em('World')), b.br)
+>>> sized.track_sizes = True
+>>> sized.descendant_count, sized.serialized_length
+(5, 42)
+>>> sized[0][1].append(b & ' & Universe')
+>>> sized[0].descendant_count, sized[0].serialized_length
+(4, 41)
+>>> sized.serialized_length == len(sized.create_str(encoding=None))
+True
+>>> removed = sized[0]
+>>> sized.remove(removed)
+>>> sized.descendant_count, sized.serialized_length, removed.track_sizes
+(1, 16, True)
+
+
 Duplication and Comparisons
 """""""""""""""""""""""""""
 
@@ -319,6 +548,31 @@ Use :meth:`XMLNode.duplicate` to create a deep copy of a XML node:
 False
 
 
+Copies of :class:`ContainerNode` instances can also be created copy-on-write.
+Such a copy creates its children when they are first accessed, so the costs
+depend on the parts of the copy used and not on the size of the original:
+
+>>> lazy_copy = document.duplicate(copy_on_write=True)
+>>> lazy_copy[0][1][1][0].content = u'Universe'
+>>> print(lazy_copy[0][1][1][0].content)
+Universe
+>>> print(document[0][1][1][0].content)
+ World
+>>> lazy_copy[0][0] == document[0][0] and lazy_copy[0][0] is not document[0][0]
+True
+
+
+Modifying the original first copies the parts still shared with copies:
+
+>>> lazy_copy = document[0][2].duplicate(copy_on_write=True)
+>>> document[0][2][1][0].content = u'changed'
+>>> print(lazy_copy[1][0].content)
+raw content
+>>> document[0][2][1][0].content = u'raw content'
+>>> lazy_copy == document[0][2]
+True
+
+
 Equality and inequality recursively compare XML nodes:
 
 >>> document == document_copy
@@ -327,6 +581,34 @@ True
 False
 
 
+Before recursing, the :attr:`~XMLNode.structural_hash` values of the nodes
+are compared. They are cached on :class:`ContainerNode` instances until the
+node or one of its descendants is modified, so unequal nodes are usually
+detected without traversing them:
+
+>>> document.structural_hash == document_copy.structural_hash
+True
+>>> document[0][1].structural_hash == document[0][2][1].structural_hash
+False
+
+
+Use :func:`group_equal_nodes` to find equal subtrees, even across multiple
+documents:
+
+>>> import itertools
+>>> groups = group_equal_nodes(itertools.chain(
+...     document.descendants(), document_copy.descendants()))
+>>> [len(group) for group in groups[:3]]
+[2, 2, 2]
+>>> groups[0] == [document[0], document_copy[0]]
+True
+>>> paragraphs = [b.p('a'), b.p('b'), b.p('a', b.br), b.p('a')]
+>>> group_equal_nodes(paragraphs) == [[paragraphs[0], paragraphs[3]]]
+True
+>>> [len(group) for group in group_equal_nodes(paragraphs, min_count=1)]
+[2, 1, 1]
+
+
 Attributes
 """"""""""
 
@@ -427,6 +709,22 @@ True
 >>> document_copy[0][0].append(p_element)
 >>> document_copy[0][0][-1] is p_element
 True
+>>> document_copy.sort_in_document_order(document_copy[0].descendants(
+...     reverse=True)) == list(document_copy[0].descendants())
+True
+>>> document_copy[0].insert(1, p_element)
+>>> document_copy.precedes(document_copy[0][0], p_element)
+True
+>>> document_copy.precedes(p_element, document_copy[0][2])
+True
+>>> removed_element = document_copy[0].pop(2)
+>>> try:
+...     document_copy.order_key(removed_element)
+... except ValueError as e:
+...     print(e)
+The node is not contained in the document.
+>>> document_copy[0].insert(2, removed_element)
+>>> document_copy[0][0].append(p_element)
 >>> p_element in document_copy[0][0]
 True
 >>> p_element.namespace_uri == u'http://www.w3.org/1999/xhtml/'
@@ -463,6 +761,50 @@ False
 False
 
 
+The indexes are held by the :attr:`~Document.index_cache` of the document
+until they are deleted. It also tells how often the indexes were built and
+retrieved and how much memory they use:
+
+>>> 'foo' in document_copy.element_by_id
+False
+>>> statistics = document_copy.index_cache.statistics(u'element_by_id')
+>>> statistics.builds, statistics.hits, statistics.entries
+(1, 1, 0)
+
+
+All indexes declared on :class:`Document` are built together in one
+traversal when the first of them is accessed:
+
+>>> statistics = document_copy.index_cache.statistics(u'nodes_by_namespace')
+>>> statistics.builds, statistics.hits
+(1, 0)
+>>> statistics.size > 0
+True
+>>> u'elements_by_name' in document_copy.index_cache
+True
+>>> del document_copy.elements_by_name
+>>> u'elements_by_name' in document_copy.index_cache
+False
+>>> document_copy.index_cache.statistics(u'elements_by_name').entries
+0
+
+Building the indexes does not create the :class:`Attributes` of elements,
+attributes found by :attr:`~Document.nodes_by_namespace` are created when
+they are retrieved:
+
+>>> lazy = document.duplicate()
+>>> lazy.element_by_id['foo'] is lazy[0][-1]
+True
+>>> em = lazy[0][1][1]
+>>> em._attributes.__class__ is dict
+True
+>>> for attribute in lazy.nodes_by_namespace(local_name='count'):
+...     print(attribute.value)
+1
+>>> em._attributes.__class__ is Attributes
+True
+
+
 XML Serialization
 ^^^^^^^^^^^^^^^^^
 
@@ -493,6 +835,48 @@ it defaults to "UTF-8":
 True
 
 
+:meth:`XMLNode.write` writes the serialized XML to a stream without creating
+a string of the whole document, traversing the tree iteratively:
+
+>>> from io import BytesIO
+>>> stream = BytesIO()
+>>> document.write(stream, buffer_size=64)
+>>> stream.getvalue() == document_string.encode('UTF-8')
+True
+>>> stream = BytesIO()
+>>> document.write(stream, encoding='UTF-16', buffer_size=20)
+>>> stream.getvalue() == document_string.encode('UTF-16')
+True
+
+
+:meth:`XMLNode.iter_encoded` lazily creates the encoded XML in chunks of a
+fixed number of characters, :class:`Document` instances use their encoding by
+default:
+
+>>> chunks = list(document.iter_encoded(chunk_size=100))
+>>> [len(chunk.decode('UTF-8')) for chunk in chunks[:3]]
+[100, 100, 100]
+>>> b''.join(chunks) == bytes(document)
+True
+>>> chunks = list(document.iter_encoded(chunk_size=100, encoding='UTF-16'))
+>>> b''.join(chunks).decode('UTF-16') == document_string
+True
+
+
+If :attr:`ContainerNode.cache_serialization` is :const:`True`, the
+representations of the node and its descendant container nodes are cached,
+modifications delete the caches of the modified node and its ancestors:
+
+>>> document_copy = document.duplicate()
+>>> document_copy.cache_serialization = True
+>>> bytes(document_copy) == bytes(document)
+True
+>>> document_copy[0][0][0].content = 'Changed'
+>>> bytes(document_copy) == bytes(document).replace(b'&lt;Example&gt;', b'Changed')
+True
+>>> document_copy.cache_serialization = False
+
+
 :class:`XMLNode` instances can also generate SAX events, see
 :meth:`XMLNode.create_sax_events` (note that the default
 :class:`xml.sax.ContentHandler` is :class:`xml.sax.saxutils.ContentHandler`,
@@ -546,6 +930,24 @@ True
 >>> string_out.close()
 
 
+The ``indent_incr`` argument is also accepted by :meth:`XMLNode.create_str`,
+:meth:`XMLNode.write` and :meth:`XMLNode.iter_encoded`, which indent the same
+way:
+
+>>> print(document[0][1][1].create_str(indent_incr='  ').decode('UTF-8'))
+<em count="1">
+   World
+</em>
+<BLANKLINE>
+>>> stream = BytesIO()
+>>> document.write(stream, indent_incr='    ')
+>>> stream.getvalue() == document.create_str(indent_incr='    ')
+True
+>>> chunks = document.iter_encoded(chunk_size=64, indent_incr='    ')
+>>> b''.join(chunks) == document.create_str(indent_incr='    ')
+True
+
+
 Classes
 -------
 
@@ -579,9 +981,15 @@ Base Classes
 .. autoclass:: ContainerNode
 .. autoclass:: ContentNode
 .. autoclass:: NamespaceNameMixin
+
+
+Functions
+^^^^^^^^^
+
+.. autofunction:: group_equal_nodes
 '''
 
-from ._common import XMLNode, ContainerNode
+from ._common import XMLNode, ContainerNode, group_equal_nodes
 from ._attributes import NamespaceNameMixin, Attribute, Attributes
 from ._document import DocumentType, Document
 from ._element import Element
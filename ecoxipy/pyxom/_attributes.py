@@ -4,33 +4,26 @@ import collections
 from ecoxipy import _unicode
 from ecoxipy import _helpers
 
-from ._common import _string_repr
+from ._common import _string_repr, _WEAK_REFERENCE
 
 class NamespaceNameMixin(object):
     '''\
     Contains functionality implementing `Namespaces in XML
     <http://www.w3.org/TR/REC-xml-names/>`_.
     '''
-    _slots = {'_namespace_prefix', '_local_name',
-        '_v_namespace_uri', '_v_namespace_source'}
+    _slots = {'_namespace_prefix', '_local_name'}
 
     def _set_namespace_properties(self, index):
         components = _helpers.get_qualified_name_components(self.name)
         self._namespace_prefix, self._local_name = components
         return components[index]
 
-    def _clear_namespace_uri(self):
-        if hasattr(self, '_v_namespace_uri'):
-            namespace_source = self._v_namespace_source
-            if namespace_source is not None:
-                namespace_source._remove_namespace_target(self)
-            del self._v_namespace_uri
-            del self._v_namespace_source
-
     def _clear_namespace_properties(self):
-        self._clear_namespace_uri()
-        del self._namespace_prefix
-        del self._local_name
+        try:
+            del self._namespace_prefix
+            del self._local_name
+        except AttributeError:
+            pass
 
     @property
     def namespace_prefix(self):
@@ -58,36 +51,30 @@ class NamespaceNameMixin(object):
         The namespace URI the :attr:`namespace_prefix` refers to. It is
         :const:`None` if there is no namespace prefix and it is :const:`False`
         if the prefix lookup failed.
+
+        The namespace declarations in effect are looked up in the namespace
+        scope of the element, which is shared by elements declaring no
+        namespaces and cached until declarations change or the element is
+        moved.
         '''
-        try:
-            return self._v_namespace_uri
-        except AttributeError:
-            if self.parent is None:
-                namespace_source = None
-                namespace_uri = False
-            else:
-                if isinstance(self, Attribute):
-                    if self.namespace_prefix is None:
-                        namespace_source = None
-                        namespace_uri = None
-                    elif self.namespace_prefix == u'xml':
-                        namespace_source = None
-                        namespace_uri = u'http://www.w3.org/XML/1998/namespace'
-                    elif self.namespace_prefix == u'xmlns':
-                        namespace_source = None
-                        namespace_uri = u'http://www.w3.org/2000/xmlns/'
-                    else:
-                        namespace_source = self.parent.parent
-                else:
-                    namespace_source = self
-                if namespace_source is not None:
-                    namespace_source, namespace_uri = namespace_source._get_namespace(
-                        self.namespace_prefix)
-                    if namespace_source is not None:
-                        namespace_source._register_namespace_target(self)
-            self._v_namespace_source = namespace_source
-            self._v_namespace_uri = namespace_uri
-            return namespace_uri
+        if self.parent is None:
+            return False
+        prefix = self.namespace_prefix
+        if isinstance(self, Attribute):
+            return _attribute_namespace_uri(self.parent.parent, prefix)
+        return self._namespace_scope()._uris.get(prefix, False)
+
+
+def _attribute_namespace_uri(element, prefix):
+    # Returns the namespace URI of an attribute of ``element`` having the
+    # namespace prefix ``prefix``.
+    if prefix is None:
+        return None
+    if prefix == u'xml':
+        return u'http://www.w3.org/XML/1998/namespace'
+    if prefix == u'xmlns':
+        return u'http://www.w3.org/2000/xmlns/'
+    return element._namespace_scope()._uris.get(prefix, False)
 
 
 class Attribute(NamespaceNameMixin):
@@ -156,9 +143,12 @@ class Attribute(NamespaceNameMixin):
         The parent :class:`Attributes`.
         '''
         try:
-            return self._parent
+            parent = self._parent
         except AttributeError:
             return None
+        if parent.__class__ is _WEAK_REFERENCE:
+            return parent()
+        return parent
 
     @property
     def name(self):
@@ -177,15 +167,18 @@ class Attribute(NamespaceNameMixin):
             return
         if self._check_well_formedness:
             _helpers.enforce_valid_xml_name(name)
-        if name in self._parent._attributes:
+        attributes = self.parent
+        if name in attributes._attributes:
             raise KeyError(
                 u'An attribute with name "{}" does already exist in the parent.'.format(
                     name))
-        del self._parent._attributes[self._name]
-        self._parent._attributes[name] = self
+        own_length = self._element_before_change()
+        del attributes._attributes[self._name]
+        attributes._attributes[name] = self
         self._name = name
         self._clear_namespace_properties()
         self._update_namespace_prefix()
+        attributes.parent._after_change(own_length)
 
     @property
     def value(self):
@@ -199,8 +192,17 @@ class Attribute(NamespaceNameMixin):
         value = _unicode(value)
         if value == self._value:
             return
-        self._update_namespace_uri()
+        own_length = self._element_before_change()
         self._value = value
+        self._update_namespace_uri()
+        attributes = self.parent
+        if attributes is not None:
+            attributes.parent._after_change(own_length)
+
+    def _element_before_change(self):
+        attributes = self.parent
+        if attributes is not None:
+            return attributes.parent._before_change()
 
     def __repr__(self):
         return 'ecoxipy.pyxom.Attribute({}, {})'.format(
@@ -228,17 +230,46 @@ class Attributes(collections.Mapping):
     '''
     __slots__ = {'_parent', '_attributes', '_check_well_formedness'}
     __slots__.update(NamespaceNameMixin._slots)
+    if not hasattr(collections.Mapping, '__weakref__'):
+        __slots__.add('__weakref__')
 
 
     def __init__(self, parent, attributes, check_well_formedness):
-        self._parent = parent
+        if parent._weak_links():
+            self._parent = _WEAK_REFERENCE(parent)
+        else:
+            self._parent = parent
         self._attributes = {}
+        link = self._link()
         for name in attributes:
             value = attributes[name]
-            self._attributes[name] = Attribute(self, name, value,
+            self._attributes[name] = Attribute(link, name, value,
                 check_well_formedness)
         self._check_well_formedness = check_well_formedness
 
+    def _link(self):
+        # Returns the object to store as the parent of attributes.
+        if self._parent.__class__ is _WEAK_REFERENCE:
+            return _WEAK_REFERENCE(self)
+        return self
+
+    def _convert_links(self, weak):
+        parent = self.parent
+        self._parent = _WEAK_REFERENCE(parent) if weak else parent
+        link = self._link()
+        for attribute in self._attributes.values():
+            attribute._parent = link
+
+    def _dispose(self):
+        # Removes the links between the element, the instance and its
+        # attributes and returns the attribute values.
+        values = {}
+        for name, attribute in self._attributes.items():
+            del attribute._parent
+            values[name] = attribute._value
+        del self._parent
+        return values
+
     def __len__(self):
         return len(self._attributes)
 
@@ -256,9 +287,13 @@ class Attributes(collections.Mapping):
     def __delitem__(self, name):
         name = _unicode(name)
         item = self._attributes[name]
-        item._clear_namespace_uri()
+        own_length = self.parent._before_change()
+        prefix = item._namespace_attribute_prefix
+        if prefix is not False:
+            item._remove_namespace(prefix)
         del self._attributes[name]
         del item._parent
+        self.parent._after_change(own_length)
 
     def create_attribute(self, name, value):
         '''\
@@ -276,8 +311,11 @@ class Attributes(collections.Mapping):
             raise KeyError(
                 u'An attribute with name "{}" already exists.'.format(name))
         value = _unicode(value)
-        attribute = Attribute(self, name, value, self._check_well_formedness)
+        own_length = self.parent._before_change()
+        attribute = Attribute(self._link(), name, value,
+            self._check_well_formedness)
         self._attributes[name] = attribute
+        self.parent._after_change(own_length)
         return attribute
 
     def add(self, attribute):
@@ -297,12 +335,14 @@ class Attributes(collections.Mapping):
         if attribute.name in self._attributes:
             raise KeyError(
                 u'An attribute with name "{}" already exists.'.format(name))
+        own_length = self.parent._before_change()
         parent = attribute.parent
-        attribute._clear_namespace_uri()
         if parent is not None:
             parent.remove(attribute)
         self._attributes[attribute.name] = attribute
-        attribute._parent = self
+        attribute._parent = self._link()
+        attribute._update_namespace_uri()
+        self.parent._after_change(own_length)
 
     def remove(self, attribute):
         '''\
@@ -326,7 +366,10 @@ class Attributes(collections.Mapping):
         '''\
         The parent :class:`Element`.
         '''
-        return self._parent
+        parent = self._parent
+        if parent.__class__ is _WEAK_REFERENCE:
+            return parent()
+        return parent
 
     def __repr__(self):
         return 'ecoxipy.pyxom.Attributes{}'.format(
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import codecs
 import collections
+import hashlib
+import threading
+import weakref
 from xml.sax.xmlreader import AttributesImpl
 from xml.sax.saxutils import XMLGenerator
 
@@ -10,9 +14,47 @@ from ecoxipy.string_output import StringOutput
 from ecoxipy import _helpers
 
 
+_LEAF_EVENT = 0
+_START_EVENT = 1
+_END_EVENT = 2
+_WHITESPACE_EVENT = 3
+
+# Guards computations on first read access which must happen only once, even
+# if multiple threads read concurrently.
+_LAZY_LOCK = threading.RLock()
+
 _string_repr = lambda value: 'None' if value is None else "'{}'".format(
     value.encode('unicode_escape').decode().replace("'", "\\'"))
 
+_WEAK_REFERENCE = weakref.ref
+
+
+class _SiblingLink(object):
+    '''\
+    Stands in for the sibling links of the children of a node with weak
+    parents (see :attr:`ContainerNode.weak_parents`), the sibling is looked
+    up in the children of the parent.
+    '''
+    __slots__ = {'_offset'}
+
+    def __init__(self, offset):
+        self._offset = offset
+
+    def _resolve(self, node):
+        parent = node._attribute_node('_parent')
+        if parent is None:
+            return None
+        position = parent._position(node) + self._offset
+        children = parent._children
+        if 0 <= position < len(children):
+            return children[position]
+        return None
+
+
+_PREVIOUS_SIBLING = _SiblingLink(-1)
+_NEXT_SIBLING = _SiblingLink(1)
+
+
 class XMLNode(object):
     '''\
     Base class for XML node objects.
@@ -20,16 +62,25 @@ class XMLNode(object):
     Retrieving the byte string from an instance yields a byte string encoded
     as `UTF-8`.
     '''
-    __slots__ = {'_parent', '_next', '_previous'}
+    __slots__ = {'_parent', '_next', '_previous', '_order_label',
+        '_v_position'}
 
     _string_output = StringOutput()
     _IS_PYXOM_NODE = True
+    _IS_CONTAINER_NODE = False
+    _IS_TEXT_NODE = False
+    _CACHED_VALUES = ()
 
     def _attribute_node(self, attribute):
         try:
-            return getattr(self, attribute)
+            node = getattr(self, attribute)
         except AttributeError:
             return None
+        if node.__class__ is _WEAK_REFERENCE:
+            return node()
+        if node.__class__ is _SiblingLink:
+            return node._resolve(self)
+        return node
 
     @property
     def parent(self):
@@ -55,6 +106,112 @@ class XMLNode(object):
         '''
         return self._attribute_node('_next')
 
+    def _before_change(self):
+        nodes = [self]
+        current = self._attribute_node('_parent')
+        while current is not None:
+            nodes.append(current)
+            current = current._attribute_node('_parent')
+        if getattr(nodes[-1], '_frozen', None) is not None:
+            raise TypeError('Frozen nodes can not be modified.')
+        for current in reversed(nodes):
+            copies = getattr(current, '_copy_on_write_copies', None)
+            if copies:
+                for children in list(copies):
+                    children._materialize()
+            for name in current._CACHED_VALUES:
+                try:
+                    delattr(current, name)
+                except AttributeError:
+                    pass
+        # If the node is included in tracked sizes the length of its own
+        # representation is returned, to be given to ``_after_change``.
+        if self._size_tracker() is not None:
+            return self._own_length()
+
+    def _after_change(self, own_length):
+        # Updates the tracked sizes after the node has been modified,
+        # ``own_length`` is the value returned by ``_before_change``.
+        if own_length is not None:
+            self._size_tracker()._add_size(0,
+                self._own_length() - own_length)
+
+    def _size_tracker(self):
+        # Returns the container node whose tracked sizes include the node or
+        # None.
+        parent = self._attribute_node('_parent')
+        if parent is not None and hasattr(parent, '_v_subtree_size'):
+            return parent
+        return None
+
+    def _own_length(self):
+        # The length of the XML representation of the node without its
+        # children.
+        return len(self._create_str(self._string_output))
+
+    def _subtree_size(self):
+        # Returns the number of descendants and the length of the XML
+        # representation.
+        return 0, self._own_length()
+
+    @property
+    def serialized_length(self):
+        '''\
+        The number of characters of the XML representation created by
+        :meth:`create_str` without pretty printing and encoding. This can
+        be used to estimate the size of the encoded representation, it is
+        equal to the number of bytes for ASCII characters encoded as UTF-8.
+        On :class:`ContainerNode` instances this is computed from the
+        tracked sizes if :attr:`ContainerNode.track_sizes` is
+        :const:`True`.
+        '''
+        return self._serialized_length()
+
+    def _serialized_length(self):
+        return self._own_length()
+
+    @property
+    def frozen(self):
+        '''\
+        :const:`True` if the node belongs to a tree frozen by
+        :meth:`ContainerNode.freeze`, :const:`False` otherwise.
+        '''
+        current = self
+        while current is not None:
+            if getattr(current, '_frozen', None) is not None:
+                return True
+            current = current._attribute_node('_parent')
+        return False
+
+    def _check_mutable(self):
+        if self.frozen:
+            raise TypeError('Frozen nodes can not be modified.')
+
+    @property
+    def structural_hash(self):
+        '''\
+        A hash of the node's structure and content. Equal nodes have equal
+        structural hashes, so differing hashes mean the nodes are not equal.
+        On :class:`ContainerNode` instances the value is cached until the node
+        or one of its descendants is modified.
+        '''
+        return self._structural_hash()
+
+    def _clear_order_labels(self):
+        # Removes the document order labels of the node and its descendants,
+        # e.g. after it has been removed from a document. Lazily created
+        # children are not labeled.
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            try:
+                del node._order_label
+            except AttributeError:
+                pass
+            if node._IS_CONTAINER_NODE and not isinstance(node._children,
+                    _LazyChildren):
+                nodes.extend(node._children)
+
     def _attribute_iterator(self, attribute):
         def iterator(current):
             while True:
@@ -110,7 +267,7 @@ class XMLNode(object):
         '''
         return self._attribute_climbing_iterator('_next')
 
-    def create_str(self, out=None, encoding='UTF-8'):
+    def create_str(self, out=None, encoding='UTF-8', indent_incr=None):
         '''\
         Creates a string containing the XML representation of the node.
 
@@ -119,14 +276,237 @@ class XMLNode(object):
             :class:`ecoxipy.string_output.StringOutput` instance is created.
         :param encoding: The output encoding or :const:`None` for Unicode
             output. Is only taken into account if ``out`` is :const:`None`.
+        :param indent_incr: If this is not :const:`None` this activates
+            pretty printing like in :meth:`create_sax_events`. In this case
+            it should be a string and it is used for indenting.
+        :type indent_incr: :func:`str`
         '''
         if out is None:
             out = self._string_output
-        output_string = self._create_str(out)
+        if indent_incr is not None:
+            output_string = u''.join(self._iter_indented_strings(out,
+                _unicode(indent_incr)))
+        elif self._IS_CONTAINER_NODE and self._serialization_cached():
+            output_string = self._cached_str(out)
+        else:
+            output_string = self._create_str(out)
         if encoding is not None:
             output_string = output_string.encode(encoding)
         return output_string
 
+    def write(self, stream, encoding='UTF-8', buffer_size=65536, out=None,
+            indent_incr=None):
+        '''\
+        Writes the XML representation of the node to a stream. The tree is
+        traversed iteratively and the created strings are written in chunks,
+        so no string of the whole representation is created and there is no
+        recursion limit on the depth of the tree.
+
+        :param stream: The stream to write to. It must have a :meth:`write`
+            method accepting Unicode strings if ``encoding`` is
+            :const:`None` and byte strings otherwise.
+        :param encoding: The output encoding or :const:`None` for Unicode
+            output.
+        :param buffer_size: The number of characters to collect before they
+            are written.
+        :type buffer_size: :func:`int`
+        :param out: A :class:`ecoxipy.string_output.StringOutput` instance or
+            :const:`None`. If it is the latter, the default instance is used.
+        :param indent_incr: If this is not :const:`None` this activates
+            pretty printing like in :meth:`create_sax_events`. In this case
+            it should be a string and it is used for indenting.
+        :type indent_incr: :func:`str`
+        '''
+        for chunk in self._iter_chunks(out, buffer_size, encoding,
+                indent_incr=indent_incr):
+            stream.write(chunk)
+
+    def iter_encoded(self, chunk_size=65536, encoding=None, out=None,
+            indent_incr=None):
+        '''\
+        Creates an iterator over the encoded XML representation of the node
+        in chunks, for example to be used as a WSGI response body. The chunks
+        are created lazily while the tree is traversed, so the first chunk is
+        available in constant time and memory usage is bounded by the chunk
+        size.
+
+        :param chunk_size: The number of characters encoded into each chunk,
+            only the last chunk may be shorter.
+        :type chunk_size: :func:`int`
+        :param encoding: The output encoding. If it is :const:`None`, UTF-8
+            is used or the encoding of the document for
+            :class:`ecoxipy.pyxom.Document` instances.
+        :param out: A :class:`ecoxipy.string_output.StringOutput` instance or
+            :const:`None`. If it is the latter, the default instance is used.
+        :param indent_incr: If this is not :const:`None` this activates
+            pretty printing like in :meth:`create_sax_events`. In this case
+            it should be a string and it is used for indenting.
+        :type indent_incr: :func:`str`
+        :returns: An iterator over byte strings.
+        '''
+        if encoding is None:
+            encoding = 'UTF-8'
+        return self._iter_chunks(out, chunk_size, encoding, True,
+            indent_incr)
+
+    def _iter_chunks(self, out, chunk_size, encoding, exact=False,
+            indent_incr=None):
+        '''\
+        Yields the XML representation in chunks of at least ``chunk_size``
+        characters, or of exactly this size if ``exact`` is :const:`True`.
+        Only the last chunk may be shorter.
+        '''
+        if out is None:
+            out = self._string_output
+        if encoding is None:
+            encode = lambda data, final=False: data
+        else:
+            # A single incremental encoder keeps the state of encodings like
+            # UTF-16, so a byte order mark is only written once.
+            encode = codecs.getincrementalencoder(encoding)().encode
+        if indent_incr is None:
+            strings = self._iter_strings(out)
+        else:
+            strings = self._iter_indented_strings(out, _unicode(indent_incr))
+        buffer = []
+        size = 0
+        for string in strings:
+            buffer.append(string)
+            size += len(string)
+            if size >= chunk_size:
+                data = u''.join(buffer)
+                if exact:
+                    while len(data) >= chunk_size:
+                        chunk = data[:chunk_size]
+                        data = data[chunk_size:]
+                        yield encode(chunk)
+                    buffer = [data]
+                    size = len(data)
+                else:
+                    yield encode(data)
+                    buffer = []
+                    size = 0
+        data = encode(u''.join(buffer), True)
+        if len(data) > 0:
+            yield data
+
+    def _iter_strings(self, out):
+        '''\
+        Yields the strings of the XML representation in document order.
+        '''
+        iterators = [iter((self,))]
+        end_tags = []
+        while iterators:
+            for node in iterators[-1]:
+                if node._IS_CONTAINER_NODE:
+                    try:
+                        serialized_out, string = node._v_serialized
+                    except AttributeError:
+                        pass
+                    else:
+                        if serialized_out is out:
+                            yield string
+                            continue
+                    start_tag, end_tag = node._create_str_tags(out)
+                    yield start_tag
+                    if end_tag is not None:
+                        iterators.append(iter(node))
+                        end_tags.append(end_tag)
+                        break
+                else:
+                    yield node._create_str(out)
+            else:
+                iterators.pop()
+                if iterators:
+                    yield end_tags.pop()
+
+    def _iter_indented_strings(self, out, indent_incr):
+        '''\
+        Yields the strings of the pretty printed XML representation in
+        document order.
+        '''
+        end_tags = []
+        for node, event, whitespace in self._iter_events(indent_incr):
+            if whitespace:
+                yield whitespace
+            if event == _LEAF_EVENT:
+                yield node._create_str(out)
+            elif event == _START_EVENT:
+                start_tag, end_tag = node._create_str_tags(out)
+                yield start_tag
+                end_tags.append(end_tag)
+            elif event == _END_EVENT:
+                end_tag = end_tags.pop()
+                if end_tag is not None:
+                    yield end_tag
+
+    def _iter_events(self, indent_incr):
+        '''\
+        Traverses the tree iteratively and yields 3-tuples of a node, the
+        event type and the whitespace to emit before the event. The event
+        types are leaf nodes, starts and ends of container nodes and
+        whitespace only (the node is :const:`None` then). If ``indent_incr``
+        is :const:`None` the whitespace is always empty, otherwise the
+        indentation strings are created once per depth.
+        '''
+        if indent_incr is None:
+            indents = None
+        else:
+            indents = [u'\n']
+        def indentation(depth):
+            while len(indents) <= depth:
+                indents.append(indents[-1] + indent_incr)
+            return indents[depth]
+        if not self._IS_CONTAINER_NODE:
+            if indents is None or self._IS_TEXT_NODE:
+                yield self, _LEAF_EVENT, u''
+            else:
+                yield self, _LEAF_EVENT, indentation(0)
+            return
+        yield self, _START_EVENT, u''
+        # A frame contains the children iterator, the container, its depth,
+        # the depth of its children and if the last child was a text node.
+        frames = [[iter(self), self, 0,
+            1 if self._INDENTS_CHILDREN else 0, False]]
+        while frames:
+            frame = frames[-1]
+            children, node, depth, child_depth, last_text = frame
+            for child in children:
+                if child._IS_CONTAINER_NODE:
+                    frame[4] = False
+                    if indents is None or child_depth == 0:
+                        yield child, _START_EVENT, u''
+                    else:
+                        yield child, _START_EVENT, indentation(child_depth)
+                    frames.append([iter(child), child, child_depth,
+                        child_depth + 1 if child._INDENTS_CHILDREN
+                        else child_depth,
+                        False])
+                    break
+                if child._IS_TEXT_NODE:
+                    if (indents is None or last_text
+                            or not node._INDENTS_CHILDREN):
+                        yield child, _LEAF_EVENT, u''
+                    else:
+                        yield child, _LEAF_EVENT, indentation(child_depth)
+                    last_text = frame[4] = True
+                else:
+                    if indents is None:
+                        yield child, _LEAF_EVENT, u''
+                    else:
+                        yield child, _LEAF_EVENT, indentation(child_depth)
+                    last_text = frame[4] = False
+            else:
+                frames.pop()
+                if (indents is None or not node._INDENTS_CHILDREN
+                        or len(node) == 0):
+                    yield node, _END_EVENT, u''
+                else:
+                    yield node, _END_EVENT, indentation(depth)
+                if (indents is not None and node._INDENTS_CHILDREN
+                        and depth == 0):
+                    yield None, _WHITESPACE_EVENT, u'\n'
+
     def create_sax_events(self, content_handler=None, out=None,
             out_encoding='UTF-8', indent_incr=None):
         '''\
@@ -149,12 +529,17 @@ class XMLNode(object):
         '''
         if content_handler is None:
             content_handler = XMLGenerator(out, out_encoding)
-        if indent_incr is None:
-            indent = False
-        else:
+        if indent_incr is not None:
             indent_incr = _unicode(indent_incr)
-            indent = (indent_incr, 0)
-        self._create_sax_events(content_handler, indent)
+        for node, event, whitespace in self._iter_events(indent_incr):
+            if event == _LEAF_EVENT:
+                node._create_sax_events(content_handler, whitespace)
+            elif event == _START_EVENT:
+                node._start_sax_events(content_handler, whitespace)
+            elif event == _END_EVENT:
+                node._end_sax_events(content_handler, whitespace)
+            else:
+                content_handler.characters(whitespace)
         return content_handler
 
     def __str__(self):
@@ -178,6 +563,80 @@ class XMLNode(object):
         '''
         raise NotImplemented()
 
+    def _copy_on_write(self):
+        return self.duplicate()
+
+
+class _LazyChildren(object):
+    '''\
+    Stands in for the children list of a :class:`ContainerNode` until it is
+    first accessed, then the children created by :meth:`_create_children`
+    become the children of the owner. Implementations must also implement
+    :meth:`__len__`.
+    '''
+    __slots__ = {'_owner'}
+
+    def __init__(self, owner):
+        self._owner = _WEAK_REFERENCE(owner)
+
+    def _create_children(self):
+        raise NotImplementedError()
+
+    def _materialize(self):
+        owner = self._owner()
+        if owner is None:
+            return []
+        with _LAZY_LOCK:
+            if owner._children is self:
+                owner._set_children(self._create_children())
+        return owner._children
+
+    def __getitem__(self, index):
+        return self._materialize()[index]
+
+    def __setitem__(self, index, child):
+        self._materialize()[index] = child
+
+    def __delitem__(self, index):
+        del self._materialize()[index]
+
+    def __iter__(self):
+        return iter(self._materialize())
+
+    def __reversed__(self):
+        return reversed(self._materialize())
+
+    def insert(self, index, child):
+        self._materialize().insert(index, child)
+
+
+class _CopyOnWriteChildren(_LazyChildren):
+    '''\
+    The children of a copy-on-write duplicate, creates copy-on-write
+    duplicates of the children of the source.
+    '''
+    __slots__ = {'_source', '__weakref__'}
+
+    def __init__(self, owner, source):
+        _LazyChildren.__init__(self, owner)
+        self._source = source
+        try:
+            copies = source._copy_on_write_copies
+        except AttributeError:
+            copies = weakref.WeakSet()
+            source._copy_on_write_copies = copies
+        copies.add(self)
+
+    def _create_children(self):
+        self._source._copy_on_write_copies.discard(self)
+        return (child._copy_on_write() for child in self._source._children)
+
+    def __len__(self):
+        return len(self._source._children)
+
+
+_ORDER_GAP = 1 << 32
+
 
 class ContainerNode(XMLNode, collections.MutableSequence):
     '''\
@@ -186,16 +645,145 @@ class ContainerNode(XMLNode, collections.MutableSequence):
     :param children: The nodes contained of in the node.
     :type children: :func:`list`
     '''
-    __slots__ = {'_children'}
+    __slots__ = {'_children', '_v_structural_hash', '_copy_on_write_copies',
+        '_v_serialized', '_cache_serialization', '_v_valid_positions',
+        '_frozen', '_weak_parents', '__weakref__', '_v_subtree_size'}
+
+    _CACHED_VALUES = ('_v_structural_hash', '_v_serialized')
+    _IS_CONTAINER_NODE = True
+    _INDENTS_CHILDREN = True
 
     def __init__(self, children):
+        self._set_children(children)
+
+    def _set_children(self, children):
+        # The children are wired before they become visible, so concurrent
+        # readers of lazy children never see partially wired children.
         children = [child for child in children]
+        if self._weak_links():
+            self._link_weakly(children)
+        else:
+            for i, child in enumerate(children):
+                child._parent = self
+                if i > 0:
+                    self._wire_neighbors(previous, child)
+                previous = child
+                if child._IS_CONTAINER_NODE and getattr(child,
+                        '_weak_parents', False):
+                    child._convert_links(False)
         self._children = children
-        for i, child in enumerate(children):
-            child._parent = self
-            if i > 0:
-                self._wire_neighbors(previous, child)
-            previous = child
+        self._positions_changed(0)
+
+    def duplicate(self, copy_on_write=False):
+        '''\
+        Return a deep copy of the node and its descendants.
+
+        :param copy_on_write: If this is :const:`True` the children of the
+            copy are only created when they are first accessed, until then
+            the copy shares them with the original. Modifying either one
+            first copies the shared nodes on the path to the modification,
+            so creating the copy and changing a few nodes is not
+            proportional to the size of the tree.
+        :type copy_on_write: :func:`bool`
+        '''
+        raise NotImplemented()
+
+    def _copy_on_write(self):
+        copy = self._shallow_duplicate()
+        children = self._children
+        if isinstance(children, _CopyOnWriteChildren):
+            source = children._source
+        else:
+            source = self
+        copy._children = _CopyOnWriteChildren(copy, source)
+        try:
+            copy._v_structural_hash = self._v_structural_hash
+        except AttributeError:
+            pass
+        try:
+            copy._v_serialized = self._v_serialized
+        except AttributeError:
+            pass
+        return copy
+
+    def freeze(self):
+        '''\
+        Makes the node and its descendants immutable. Afterwards modifying
+        any of them, inserting the node into a container or removing nodes
+        raises a :class:`TypeError`, use :meth:`duplicate` to get a mutable
+        copy.
+
+        The children are stored in tuples and the structural hashes as well
+        as namespace data are computed, so they stay available without
+        further bookkeeping. A digest of the structure is stored on each
+        container node, thus comparing frozen nodes for equality takes
+        constant time.
+
+        :raises ValueError: If the node has a parent.
+        '''
+        if self._attribute_node('_parent') is not None:
+            raise ValueError('Only nodes without a parent can be frozen.')
+        if getattr(self, '_frozen', None) is not None:
+            return
+        containers = []
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            containers.append(node)
+            node._warm_up()
+            nodes.extend(child for child in node._own_children()
+                if child._IS_CONTAINER_NODE)
+        self.structural_hash
+        for node in reversed(containers):
+            key = [node._structural_key()]
+            for child in node._children:
+                if child._IS_CONTAINER_NODE:
+                    key.append(child._frozen)
+                else:
+                    key.append(child._structural_key())
+            node._children = tuple(node._children)
+            node._frozen = hashlib.sha1(repr(key).encode('utf-8')).digest()
+
+    def warm_up(self):
+        '''\
+        Computes the values of the node and its descendants which are
+        otherwise computed and cached on first access: lazily created
+        children are created, the namespace data of elements, the structural
+        hashes and the positions of the children are computed. Afterwards
+        the structure can be read by multiple threads concurrently without
+        any of them writing to the nodes, as long as it is not modified.
+
+        Values which are computed on first access are computed only once
+        even without calling this, but then reading threads may have to wait
+        for each other.
+        '''
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            node._warm_up()
+            children = node._own_children()
+            for position, child in enumerate(children):
+                child._v_position = position
+                if child._IS_CONTAINER_NODE:
+                    nodes.append(child)
+            node._v_valid_positions = len(children)
+        self.structural_hash
+
+    def _warm_up(self):
+        # Computes the cached values of the node, which are needed for read
+        # access.
+        pass
+
+    def _frozen_equals(self, other):
+        # Returns the result of comparing the digests of frozen nodes or
+        # None if one of the nodes is not frozen.
+        digest = getattr(self, '_frozen', None)
+        if digest is None:
+            return None
+        other_digest = getattr(other, '_frozen', None)
+        if other_digest is None:
+            return None
+        return digest == other_digest
 
     def children(self, reverse=False):
         '''\
@@ -207,9 +795,373 @@ class ContainerNode(XMLNode, collections.MutableSequence):
         '''
         return self._children_rec(reverse)
 
+    def _create_str_tags(self, out):
+        '''\
+        Returns the string preceding and the string following the children
+        in the XML representation, the latter is :const:`None` if the node
+        is represented without children.
+        '''
+        raise NotImplementedError()
+
     def _children_strings(self, out):
         return collections.deque(child._create_str(out) for child in self)
 
+    def _create_str(self, out):
+        return self._create_container_str(out, self._children_strings(out))
+
+    def _create_container_str(self, out, children_strings):
+        raise NotImplementedError()
+
+    @property
+    def cache_serialization(self):
+        '''\
+        If this is :const:`True`, the XML representations created by
+        :meth:`create_str` are cached on this node and on its descendant
+        container nodes. A cache is deleted if the node or one of its
+        descendants is modified, so serializing again only recreates the
+        representations of the modified nodes and their ancestors. The
+        caches are also used by :meth:`write` and :meth:`iter_encoded`.
+
+        The caches store the representation of each container node, so they
+        need memory proportional to the size of the representation times the
+        depth of the tree. Setting this to :const:`False` deletes the caches.
+        Defaults to :const:`False`.
+        '''
+        return getattr(self, '_cache_serialization', False)
+
+    @cache_serialization.setter
+    def cache_serialization(self, value):
+        if value:
+            self._cache_serialization = True
+        else:
+            try:
+                del self._cache_serialization
+            except AttributeError:
+                pass
+            nodes = [self]
+            while nodes:
+                node = nodes.pop()
+                try:
+                    del node._v_serialized
+                except AttributeError:
+                    pass
+                if not isinstance(node._children, _LazyChildren):
+                    nodes.extend(child for child in node._children
+                        if child._IS_CONTAINER_NODE)
+
+    def _serialization_cached(self):
+        current = self
+        while current is not None:
+            if getattr(current, '_cache_serialization', False):
+                return True
+            current = current._attribute_node('_parent')
+        return False
+
+    def _cached_str(self, out):
+        try:
+            serialized_out, string = self._v_serialized
+        except AttributeError:
+            pass
+        else:
+            if serialized_out is out:
+                return string
+        string = self._create_container_str(out,
+            self._cached_children_strings(out))
+        self._v_serialized = (out, string)
+        return string
+
+    def _cached_children_strings(self, out):
+        return [child._cached_str(out) if child._IS_CONTAINER_NODE
+            else child._create_str(out) for child in self]
+
+    @property
+    def track_sizes(self):
+        '''\
+        If this is :const:`True`, :attr:`descendant_count` and
+        :attr:`serialized_length` of the node and its descendant container
+        nodes are stored. They are updated on modification of the node or
+        its descendants by adding the differences to the values of the
+        ancestors, so they are retrieved in constant time. Inserted nodes
+        are tracked too, removed nodes stay tracked.
+
+        Setting this to :const:`True` computes the values once for the whole
+        tree. Tracking can only be stopped on nodes whose parent does not
+        track sizes, setting this to :const:`False` otherwise raises a
+        :class:`ValueError`. Defaults to :const:`False`.
+        '''
+        return hasattr(self, '_v_subtree_size')
+
+    @track_sizes.setter
+    def track_sizes(self, value):
+        if value:
+            self._track_sizes()
+            return
+        if hasattr(self, '_v_subtree_size'):
+            parent = self._attribute_node('_parent')
+            if parent is not None and hasattr(parent, '_v_subtree_size'):
+                raise ValueError(
+                    'The parent of the node tracks sizes.')
+            nodes = [self]
+            while nodes:
+                node = nodes.pop()
+                try:
+                    del node._v_subtree_size
+                except AttributeError:
+                    continue
+                nodes.extend(child for child in node._children
+                    if child._IS_CONTAINER_NODE)
+
+    def _track_sizes(self):
+        # Stores the sizes on the node and its descendant container nodes
+        # which do not track sizes yet and returns them.
+        try:
+            return self._v_subtree_size
+        except AttributeError:
+            pass
+        nodes = [(self, False)]
+        while nodes:
+            node, children_done = nodes.pop()
+            if children_done:
+                count = 0
+                length = node._own_length()
+                for child in node._children:
+                    if child._IS_CONTAINER_NODE:
+                        child_count, child_length = child._v_subtree_size
+                        count += child_count + 1
+                        length += child_length
+                    else:
+                        count += 1
+                        length += child._own_length()
+                node._v_subtree_size = [count, length]
+            else:
+                nodes.append((node, True))
+                nodes.extend((child, False)
+                    for child in node._own_children()
+                    if child._IS_CONTAINER_NODE
+                        and not hasattr(child, '_v_subtree_size'))
+        return self._v_subtree_size
+
+    def _size_tracker(self):
+        if hasattr(self, '_v_subtree_size'):
+            return self
+        return None
+
+    def _own_length(self):
+        start_tag, end_tag = self._create_str_tags(self._string_output)
+        if end_tag is None:
+            return len(start_tag)
+        return len(start_tag) + len(end_tag)
+
+    def _untracked_length(self):
+        # The length of the parts of the XML representation which are not
+        # included in the tracked sizes.
+        return 0
+
+    def _subtree_size(self):
+        count, length = self._track_sizes()
+        return count, length
+
+    def _add_size(self, count, length):
+        # Adds the differences to the tracked sizes of the node and its
+        # ancestors.
+        current = self
+        while current is not None:
+            try:
+                sizes = current._v_subtree_size
+            except AttributeError:
+                break
+            sizes[0] += count
+            sizes[1] += length
+            current = current._attribute_node('_parent')
+
+    def _children_changed(self, own_length, added, removed):
+        # Updates the tracked sizes after children have been added or
+        # removed, ``own_length`` is the value returned by
+        # ``_before_change``.
+        if own_length is None:
+            return
+        count = 0
+        length = self._own_length() - own_length
+        for child in removed:
+            child_count, child_length = child._subtree_size()
+            count -= child_count + 1
+            length -= child_length
+        for child in added:
+            child_count, child_length = child._subtree_size()
+            count += child_count + 1
+            length += child_length
+        self._add_size(count, length)
+
+    @property
+    def descendant_count(self):
+        '''\
+        The number of descendants of the node. If :attr:`track_sizes` is
+        :const:`True` this takes constant time, otherwise the descendants
+        are counted.
+        '''
+        try:
+            return self._v_subtree_size[0]
+        except AttributeError:
+            pass
+        count = 0
+        for node in self.descendants():
+            count += 1
+        return count
+
+    def _serialized_length(self):
+        try:
+            sizes = self._v_subtree_size
+        except AttributeError:
+            pass
+        else:
+            return sizes[1] + self._untracked_length()
+        length = 0
+        for string in self._iter_strings(self._string_output):
+            length += len(string)
+        return length
+
+    @property
+    def weak_parents(self):
+        '''\
+        If this is :const:`True`, the nodes of the tree the node belongs to
+        reference their parents and siblings weakly: a parent is referenced by
+        a weak reference and siblings are looked up in the children of the
+        parent. The same applies to the attributes of elements. Thus the tree
+        contains no reference cycles and it is freed as soon as the root node
+        is no longer referenced, without waiting for the cyclic garbage
+        collector. Keep a reference to the root node while using the tree,
+        otherwise the nodes lose their parents.
+
+        Only nodes without a parent can be set, setting converts the links
+        of all descendants. Nodes inserted into such a tree are converted,
+        nodes removed from it keep the weak links of their descendants.
+        Defaults to :const:`False`.
+
+        :raises ValueError: If the node to set has a parent.
+        '''
+        return self._weak_links()
+
+    @weak_parents.setter
+    def weak_parents(self, value):
+        if self._attribute_node('_parent') is not None:
+            raise ValueError('Only nodes without a parent can be set.')
+        value = bool(value)
+        if value:
+            self._weak_parents = True
+        else:
+            try:
+                del self._weak_parents
+            except AttributeError:
+                pass
+        self._convert_links(value)
+
+    def _weak_links(self):
+        # Returns if the children are linked weakly, which is the case if the
+        # node itself is linked weakly or it is a root node with weak parents.
+        try:
+            parent = self._parent
+        except AttributeError:
+            return getattr(self, '_weak_parents', False)
+        return parent.__class__ is _WEAK_REFERENCE
+
+    def _link_weakly(self, children):
+        # Links the children to the node in a tree with weak parents,
+        # converting their descendants.
+        parent = _WEAK_REFERENCE(self)
+        for child in children:
+            child._parent = parent
+            child._previous = _PREVIOUS_SIBLING
+            child._next = _NEXT_SIBLING
+            if child._IS_CONTAINER_NODE:
+                try:
+                    del child._weak_parents
+                except AttributeError:
+                    pass
+                child._convert_links(True)
+
+    def _convert_links(self, weak):
+        # Converts the links of the descendants and attributes to weak or
+        # strong links. Containers whose children are already converted are
+        # skipped, as the links below them are converted too.
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            node._convert_own_links(weak)
+            children = node._children
+            if isinstance(children, _LazyChildren) or len(children) == 0:
+                continue
+            if (children[0]._parent.__class__ is _WEAK_REFERENCE) is weak:
+                continue
+            if weak:
+                parent = _WEAK_REFERENCE(node)
+                for child in children:
+                    child._parent = parent
+                    child._previous = _PREVIOUS_SIBLING
+                    child._next = _NEXT_SIBLING
+            else:
+                previous = None
+                for child in children:
+                    child._parent = node
+                    child._previous = previous
+                    if previous is not None:
+                        previous._next = child
+                    previous = child
+                previous._next = None
+            nodes.extend(child for child in children
+                if child._IS_CONTAINER_NODE)
+
+    def _convert_own_links(self, weak):
+        # Converts links of the node to other objects than nodes.
+        pass
+
+    def dispose(self):
+        '''\
+        Breaks the reference cycles between the node and its descendants in
+        one iterative pass, so they are freed as soon as they are no longer
+        referenced instead of by the cyclic garbage collector. Afterwards the
+        node and its former descendants have no children, parents or
+        siblings, elements keep their attributes. This is also possible for
+        frozen nodes, they are mutable afterwards.
+
+        Copy-on-write copies of the node or its descendants first create
+        their own children, so they stay intact.
+
+        :raises ValueError: If the node has a parent.
+        '''
+        if self._attribute_node('_parent') is not None:
+            raise ValueError('Only nodes without a parent can be disposed.')
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            copies = getattr(node, '_copy_on_write_copies', None)
+            if copies:
+                for children in list(copies):
+                    children._materialize()
+            children = node._children
+            if isinstance(children, _CopyOnWriteChildren):
+                children._source._copy_on_write_copies.discard(children)
+            elif not isinstance(children, _LazyChildren):
+                for child in children:
+                    # assigning before deleting avoids exceptions for unset
+                    # slots
+                    child._parent = child._previous = child._next = None
+                    child._order_label = None
+                    del (child._parent, child._previous, child._next,
+                        child._order_label)
+                    if child._IS_CONTAINER_NODE:
+                        nodes.append(child)
+            node._children = []
+            node._dispose_node()
+
+    def _dispose_node(self):
+        # Removes the values of the node which depend on its former
+        # descendants or tree.
+        self._v_structural_hash = self._v_serialized = None
+        self._frozen = self._weak_parents = self._v_valid_positions = None
+        self._v_subtree_size = None
+        del (self._v_structural_hash, self._v_serialized, self._frozen,
+            self._weak_parents, self._v_valid_positions, self._v_subtree_size)
+
     def descendants(self, reverse=False, depth_first=True, max_depth=None):
         '''\
         Returns an iterator over all descendants.
@@ -256,20 +1208,45 @@ class ContainerNode(XMLNode, collections.MutableSequence):
                     nodes.extend(add_children(current, depth))
         return iterator()
 
+    @property
+    def structural_hash(self):
+        try:
+            return self._v_structural_hash
+        except AttributeError:
+            pass
+        nodes = [(self, False)]
+        while nodes:
+            current, children_done = nodes.pop()
+            if children_done:
+                current._v_structural_hash = current._structural_hash()
+            else:
+                nodes.append((current, True))
+                for child in current:
+                    if (isinstance(child, ContainerNode)
+                            and not hasattr(child, '_v_structural_hash')):
+                        nodes.append((child, False))
+        return self._v_structural_hash
+
     def _children_rec(self, reverse):
         for child in (reversed(self) if reverse else self):
             yield child
 
     def _unwire_child(self, child):
         try:
-            child._clear_namespace_uri()
+            child._clear_namespace_scopes()
         except AttributeError:
             pass
+        if getattr(child, '_parent', None).__class__ is _WEAK_REFERENCE:
+            # The siblings are looked up on the parent, so there are no links
+            # to update. The descendants of the child keep their weak links.
+            if child._IS_CONTAINER_NODE:
+                child._weak_parents = True
+        else:
+            self._wire_neighbors(child.previous, child.next)
         try:
             del child._parent
         except AttributeError:
             pass
-        self._wire_neighbors(child.previous, child.next)
         try:
             del child._next
         except AttributeError:
@@ -278,6 +1255,8 @@ class ContainerNode(XMLNode, collections.MutableSequence):
             del child._previous
         except AttributeError:
             pass
+        if hasattr(child, '_order_label'):
+            child._clear_order_labels()
 
     def _wire_neighbors(self, left, right):
         if left is not None:
@@ -291,16 +1270,78 @@ class ContainerNode(XMLNode, collections.MutableSequence):
             old_parent.remove(child)
 
     def _wire_child(self, index, child):
-        child._parent = self
-        if len(self) > 1:
-            if index > 0:
-                self._wire_neighbors(self[index-1], child)
-            if index < len(self) - 1:
-                self._wire_neighbors(child, self[index+1])
+        if self._weak_links():
+            self._link_weakly([child])
+        else:
+            child._parent = self
+            if len(self) > 1:
+                if index > 0:
+                    self._wire_neighbors(self[index-1], child)
+                if index < len(self) - 1:
+                    self._wire_neighbors(child, self[index+1])
+            if child._IS_CONTAINER_NODE and getattr(child, '_weak_parents',
+                    False):
+                child._convert_links(False)
         try:
-            child._clear_namespace_uri()
+            child._clear_namespace_scopes()
         except AttributeError:
             pass
+        self._update_document_order([child])
+
+    def _update_document_order(self, children):
+        try:
+            lower = self._order_label
+        except AttributeError:
+            return
+        root = self
+        while True:
+            parent = root.parent
+            if parent is None:
+                break
+            root = parent
+        try:
+            end = root._order_end
+        except AttributeError:
+            return
+        if end is None:
+            return
+        previous = children[0].previous
+        if previous is not None:
+            while isinstance(previous, ContainerNode) and len(previous) > 0:
+                previous = previous[-1]
+            lower = previous._order_label
+        upper = None
+        current = children[-1]
+        while current is not None:
+            following = current.next
+            if following is not None:
+                upper = following._order_label
+                break
+            current = current.parent
+        nodes = []
+        for child in children:
+            nodes.append(child)
+            if isinstance(child, ContainerNode):
+                nodes.extend(child.descendants())
+        if upper is None:
+            step = _ORDER_GAP
+            root._order_end = max(end, lower + (len(nodes) + 1) * step)
+        else:
+            step = (upper - lower) // (len(nodes) + 1)
+            if step == 0:
+                root._order_end = root._label_document_order()
+                return
+        for node in nodes:
+            lower += step
+            node._order_label = lower
+
+    def _label_document_order(self):
+        label = 0
+        self._order_label = label
+        for node in self.descendants():
+            label += _ORDER_GAP
+            node._order_label = label
+        return label + _ORDER_GAP
 
     def __getitem__(self, index):
         return self._children[index]
@@ -312,44 +1353,286 @@ class ContainerNode(XMLNode, collections.MutableSequence):
         return self._children.__iter__()
 
     def __contains__(self, child):
-        for current_child in self._children:
-            if child is current_child:
-                return True
-        return False
+        return (isinstance(child, XMLNode)
+            and child._attribute_node('_parent') is self)
+
+    def _positions_changed(self, index):
+        # The stored positions of the children before ``_v_valid_positions``
+        # are correct, positions from ``index`` on may have changed.
+        if index < getattr(self, '_v_valid_positions', 0):
+            self._v_valid_positions = index
+
+    def _position(self, child):
+        # Returns the index of ``child``, which must be a child of the node.
+        # A stored position is checked before it is used, otherwise the
+        # positions are stored from the first possibly invalid one up to the
+        # child, so removing many children in document order is linear. The
+        # first valid position is retrieved before the stored position, as
+        # concurrent readers store positions before advancing it.
+        children = self._children
+        valid_positions = getattr(self, '_v_valid_positions', 0)
+        try:
+            position = child._v_position
+            if children[position] is child:
+                return position
+        except (AttributeError, IndexError):
+            pass
+        position = valid_positions
+        length = len(children)
+        while position < length:
+            current_child = children[position]
+            current_child._v_position = position
+            position += 1
+            if current_child is child:
+                self._v_valid_positions = position
+                return position - 1
+        raise ValueError(child)
 
     def __reversed__(self):
-        return self._children.__reversed__()
+        return reversed(self._children)
 
     def __setitem__(self, index, child):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._children))
+            if step == 1:
+                self._splice(start, max(start, stop), child)
+            else:
+                indexes = range(start, stop, step)
+                children = list(child)
+                if len(children) != len(indexes):
+                    raise ValueError('attempt to assign sequence of size {} '
+                        'to extended slice of size {}'.format(len(children),
+                        len(indexes)))
+                for index, child in zip(indexes, children):
+                    self[index] = child
+            return
+        self._check_insertable(child)
         self._remove_from_parent(child)
+        own_length = self._before_change()
+        if index < 0:
+            index += len(self._children)
         try:
             old_child = self._children[index]
         except IndexError:
             old_child = None
         self._children[index] = child
+        self._positions_changed(index)
         if old_child is not None:
             self._unwire_child(old_child)
         self._wire_child(index, child)
+        self._children_changed(own_length, [child],
+            [] if old_child is None else [old_child])
 
     def insert(self, index, child):
         '''\
         Insert ``child`` before ``index``.
         '''
+        self._check_insertable(child)
         self._remove_from_parent(child)
+        own_length = self._before_change()
+        length = len(self._children)
+        if index < 0:
+            index = max(0, index + length)
+        elif index > length:
+            index = length
         self._children.insert(index, child)
+        self._positions_changed(index)
         self._wire_child(index, child)
+        self._children_changed(own_length, [child], [])
 
     def __delitem__(self, index):
+        if isinstance(index, slice):
+            self._remove_children(self._children[index])
+            return
+        own_length = self._before_change()
         child = self._children[index]
         del self._children[index]
+        self._positions_changed(index if index >= 0
+            else index + len(self._children) + 1)
         self._unwire_child(child)
+        self._children_changed(own_length, [], [child])
+
+    def index(self, child, start=0, stop=None):
+        '''\
+        Returns the index of ``child``. Children are compared by identity
+        and their positions are stored, so this takes constant time if the
+        children before ``child`` have not changed.
+
+        :param start: The index to start searching at.
+        :param stop: The index to stop searching at.
+        :raises ValueError: If ``child`` is not a child of the node or not
+            between ``start`` and ``stop``.
+        '''
+        if child not in self:
+            raise ValueError(child)
+        position = self._position(child)
+        length = len(self._children)
+        if start < 0:
+            start = max(0, start + length)
+        if stop is None:
+            stop = length
+        elif stop < 0:
+            stop += length
+        if not start <= position < stop:
+            raise ValueError(child)
+        return position
 
     def remove(self, child):
         '''\
         Remove ``child``.
         '''
-        for index, current_child in enumerate(self._children):
-            if child is current_child:
-                del self[index]
-                return
-        raise ValueError(child)
+        if child not in self:
+            raise ValueError(child)
+        del self[self._position(child)]
+
+    def extend(self, children):
+        '''\
+        Append all nodes of the iterable ``children``.
+        '''
+        length = len(self._children)
+        self._splice(length, length, children)
+
+    def clear(self):
+        '''\
+        Remove all children.
+        '''
+        self._remove_children(self._children[:])
+
+    def replace_children(self, children):
+        '''\
+        Replace all children with the nodes of the iterable ``children``.
+        '''
+        self._splice(0, len(self._children), children)
+
+    def reverse(self):
+        '''\
+        Reverse the order of the children.
+        '''
+        self._splice(0, len(self._children), self._children[::-1])
+
+    def _check_insertable(self, child):
+        # Checks before modifications that neither the node, nor the new
+        # child or its parent are frozen.
+        self._check_mutable()
+        child._check_mutable()
+
+    def _own_children(self):
+        children = self._children
+        if isinstance(children, _LazyChildren):
+            children = children._materialize()
+        return children
+
+    def _remove_children(self, removed):
+        # Removes the given children with one pass over the children list.
+        if len(removed) == 0:
+            return
+        own_length = self._before_change()
+        removed_ids = set(id(child) for child in removed)
+        self._children = [child for child in self._own_children()
+            if id(child) not in removed_ids]
+        self._positions_changed(0)
+        for child in removed:
+            self._unwire_child(child)
+        self._children_changed(own_length, [], removed)
+
+    def _splice(self, start, stop, children):
+        # Replaces the children from ``start`` to ``stop`` with the given
+        # nodes, removing them from their parents first. The children list
+        # is built once and only the siblings around the inserted nodes are
+        # rewired. If a node is given multiple times, the last one counts.
+        inserted = []
+        inserted_ids = set()
+        for child in reversed(list(children)):
+            if id(child) not in inserted_ids:
+                inserted_ids.add(id(child))
+                inserted.append(child)
+        inserted.reverse()
+        self._check_mutable()
+        for child in inserted:
+            child._check_mutable()
+        other_parents = {}
+        for child in inserted:
+            parent = child.parent
+            if parent is not None and parent is not self:
+                other_parents.setdefault(id(parent), (parent, []))[1].append(
+                    child)
+        for parent, moved in other_parents.values():
+            parent._remove_children(moved)
+        if len(inserted) == 0 and start == stop:
+            return
+        own_length = self._before_change()
+        old_children = self._own_children()
+        before = [child for child in old_children[:start]
+            if id(child) not in inserted_ids]
+        after = [child for child in old_children[stop:]
+            if id(child) not in inserted_ids]
+        moved_within = len(before) + len(after) + stop - start != len(
+            old_children)
+        added = [child for child in inserted
+            if child._attribute_node('_parent') is not self]
+        removed = [child for child in old_children[start:stop]
+            if id(child) not in inserted_ids]
+        for child in removed:
+            self._unwire_child(child)
+        children = before + inserted + after
+        self._children = children
+        if moved_within:
+            first, last = 0, len(children)
+        else:
+            first, last = len(before), len(before) + len(inserted)
+        self._positions_changed(first)
+        if self._weak_links():
+            self._link_weakly(children[first:last])
+        else:
+            previous = children[first - 1] if first > 0 else None
+            for child in children[first:last]:
+                child._parent = self
+                self._wire_neighbors(previous, child)
+                previous = child
+            following = children[last] if last < len(children) else None
+            if previous is not None or following is not None:
+                self._wire_neighbors(previous, following)
+            for child in inserted:
+                if child._IS_CONTAINER_NODE and getattr(child,
+                        '_weak_parents', False):
+                    child._convert_links(False)
+        for child in inserted:
+            try:
+                child._clear_namespace_scopes()
+            except AttributeError:
+                pass
+        if len(inserted) > 0:
+            self._update_document_order(inserted)
+        self._children_changed(own_length, added, removed)
+
+
+def group_equal_nodes(nodes, min_count=2):
+    '''\
+    Groups equal nodes, for example to find duplicated subtrees in multiple
+    documents. Nodes are first grouped by their
+    :attr:`~XMLNode.structural_hash` and only compared if the hashes match.
+
+    :param nodes: The nodes to group.
+    :type nodes: iterable of :class:`XMLNode` instances
+    :param min_count: Only groups with at least this many nodes are returned.
+    :type min_count: :func:`int`
+    :returns: A :func:`list` of the groups in the order of their first node,
+        each group being a :func:`list` of equal nodes in the order given.
+    '''
+    groups = []
+    groups_by_hash = {}
+    for node in nodes:
+        try:
+            hash_groups = groups_by_hash[node.structural_hash]
+        except KeyError:
+            hash_groups = []
+            groups_by_hash[node.structural_hash] = hash_groups
+        for group in hash_groups:
+            if group[0] == node:
+                group.append(node)
+                break
+        else:
+            group = [node]
+            hash_groups.append(group)
+            groups.append(group)
+    return [group for group in groups if len(group) >= min_count]
@@ -43,7 +43,16 @@ class ContentNode(XMLNode):
 
     @content.setter
     def content(self, value):
-        self._content = _unicode(value)
+        value = _unicode(value)
+        own_length = self._before_change()
+        self._content = value
+        self._after_change(own_length)
+
+    def _structural_hash(self):
+        return hash((self.__class__, self._content))
+
+    def _structural_key(self):
+        return (self.__class__.__name__, self._content)
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
@@ -61,8 +70,10 @@ class Text(ContentNode):
     def __repr__(self):
         return 'ecoxipy.pyxom.Text({})'.format(_string_repr(self.content))
 
-    def _create_sax_events(self, content_handler, indent):
-        content_handler.characters(self.content)
+    _IS_TEXT_NODE = True
+
+    def _create_sax_events(self, content_handler, whitespace):
+        content_handler.characters(whitespace + self.content)
 
     def _create_str(self, out):
         return out.text(self.content)
@@ -108,18 +119,15 @@ class Comment(ContentNode):
     def _create_str(self, out):
         return out.comment(self.content)
 
-    def _create_sax_events(self, content_handler, indent):
+    def _create_sax_events(self, content_handler, whitespace):
         try:
             comment = content_handler.comment
         except AttributeError:
             return
         else:
-            if indent:
-                indent_incr, indent_count = indent
-                content_handler.characters(u'\n')
-                for i in range(indent_count):
-                        content_handler.characters(indent_incr)
-            comment(encode(self.content))
+            if whitespace:
+                content_handler.characters(whitespace)
+            comment(self.content)
 
     def __repr__(self):
         return 'ecoxipy.pyxom.Comment({})'.format(_string_repr(self.content))
@@ -133,7 +141,9 @@ class Comment(ContentNode):
         content = _unicode(content)
         if self._check_well_formedness:
             _helpers.enforce_valid_comment(content)
+        own_length = self._before_change()
         self._content = content
+        self._after_change(own_length)
 
     def __hash__(self):
         return object.__hash__(self)
@@ -195,7 +205,9 @@ class ProcessingInstruction(ContentNode):
         target = _unicode(target)
         if self._check_well_formedness:
             _helpers.enforce_valid_pi_target(target)
-        self._target = _unicode(target)
+        own_length = self._before_change()
+        self._target = target
+        self._after_change(own_length)
 
     @ContentNode.content.setter
     def content(self, content):
@@ -203,17 +215,22 @@ class ProcessingInstruction(ContentNode):
             content = _unicode(content)
             if self._check_well_formedness:
                 _helpers.enforce_valid_pi_content(content)
+        own_length = self._before_change()
         self._content = content
+        self._after_change(own_length)
+
+    def _structural_hash(self):
+        return hash((ProcessingInstruction, self._target, self._content))
+
+    def _structural_key(self):
+        return ('ProcessingInstruction', self._target, self._content)
 
     def _create_str(self, out):
         return out.processing_instruction(self._target, self.content)
 
-    def _create_sax_events(self, content_handler, indent):
-        if indent:
-            indent_incr, indent_count = indent
-            content_handler.characters(u'\n')
-            for i in range(indent_count):
-                    content_handler.characters(indent_incr)
+    def _create_sax_events(self, content_handler, whitespace):
+        if whitespace:
+            content_handler.characters(whitespace)
         content_handler.processingInstruction(self.target,
             u'' if self.content is None else self.content)
 
@@ -7,8 +7,9 @@ from ecoxipy import _helpers
 
 from ._common import XMLNode, ContainerNode, _string_repr
 from ._content_nodes import Text
-from .indexing import (IndexDescriptor, ElementByUniqueAttributeValueIndexer,
-    ElementsByNameIndexer, NamespaceIndexer)
+from .indexing import (IndexDescriptor, IndexCache,
+    ElementByUniqueAttributeValueIndexer, ElementsByNameIndexer,
+    NamespaceIndexer, PathIndexer)
 
 
 class DocumentType(object):
@@ -26,7 +27,8 @@ class DocumentType(object):
         will be checked to be a valid XML name.
     :type check_well_formedness: :func:`bool`
     '''
-    __slots__ = {'_name', '_publicid', '_systemid', '_check_well_formedness'}
+    __slots__ = {'_name', '_publicid', '_systemid', '_check_well_formedness',
+        '_frozen'}
 
     def __init__(self, name, publicid, systemid, check_well_formedness):
         if check_well_formedness:
@@ -55,6 +57,7 @@ class DocumentType(object):
 
     @name.setter
     def name(self, name):
+        self._check_mutable()
         if name is None:
             self._publicid = None
             self._systemid = None
@@ -77,6 +80,7 @@ class DocumentType(object):
 
     @publicid.setter
     def publicid(self, publicid):
+        self._check_mutable()
         if publicid is not None:
             publicid = _unicode(publicid)
             if self._check_well_formedness:
@@ -97,12 +101,17 @@ class DocumentType(object):
 
     @systemid.setter
     def systemid(self, systemid):
+        self._check_mutable()
         if systemid is not None:
             systemid = _unicode(systemid)
             if self._check_well_formedness:
                 _helpers.enforce_valid_doctype_systemid(systemid)
         self._systemid = systemid
 
+    def _check_mutable(self):
+        if getattr(self, '_frozen', False):
+            raise TypeError('Frozen nodes can not be modified.')
+
     def __repr__(self):
         return 'ecoxipy.pyxom.DocumentType({}, {}, {})'.format(
             _string_repr(self._name),
@@ -146,7 +155,8 @@ class DocumentType(object):
 
 class Document(ContainerNode):
     '''\
-    A :class:`ContainerNode` representing a XML document.
+    A :class:`ContainerNode` representing a XML document. Documents are
+    context managers, leaving the ``with`` block calls :meth:`dispose`.
 
     :param doctype_name: The document type root element name or :const:`None`
         if the document should not have document type declaration.
@@ -172,12 +182,15 @@ class Document(ContainerNode):
         ``doctype_publicid`` is not a valid public ID or ``doctype_systemid``
         is not a valid system ID.
     '''
-    __slots__ = {'_doctype', '_omit_xml_declaration', '_encoding'}
+    __slots__ = {'_doctype', '_omit_xml_declaration', '_encoding',
+        '_index_cache', '_order_end'}
 
     def __init__(self, doctype_name, doctype_publicid, doctype_systemid,
             children, omit_xml_declaration, encoding,
             check_well_formedness=False):
         ContainerNode.__init__(self, children)
+        self._index_cache = IndexCache()
+        self._order_end = None
         self._doctype = DocumentType(doctype_name, doctype_publicid,
             doctype_systemid, check_well_formedness)
         self._omit_xml_declaration = omit_xml_declaration
@@ -315,6 +328,7 @@ class Document(ContainerNode):
 
     @omit_xml_declaration.setter
     def omit_xml_declaration(self, value):
+        self._check_mutable()
         self._omit_xml_declaration = bool(value)
 
     @property
@@ -332,6 +346,7 @@ class Document(ContainerNode):
             value = u'UTF-8'
         else:
             value = _unicode(value)
+        self._check_mutable()
         self._encoding = value
 
     def __bytes__(self):
@@ -345,6 +360,14 @@ class Document(ContainerNode):
         __str__ = __bytes__
         del __bytes__
 
+    @_helpers.inherit_docstring(ContainerNode)
+    def iter_encoded(self, chunk_size=65536, encoding=None, out=None,
+            indent_incr=None):
+        if encoding is None:
+            encoding = self._encoding
+        return ContainerNode.iter_encoded(self, chunk_size, encoding, out,
+            indent_incr)
+
     def __hash__(self):
         return object.__hash__(self)
 
@@ -354,12 +377,33 @@ class Document(ContainerNode):
         return XMLNode.create_sax_events(self, content_handler, out,
             self._encoding, indent_incr)
 
-    def _create_str(self, out):
+    def _create_container_str(self, out, children_strings):
         return out.document(self._doctype.name, self._doctype.publicid,
-            self._doctype.systemid, self._children_strings(out),
+            self._doctype.systemid, children_strings,
             self._omit_xml_declaration, self._encoding)
 
-    def _create_sax_events(self, content_handler, indent):
+    def _cached_str(self, out):
+        # Changes of the document type are not tracked, so only the
+        # representations of the children are cached.
+        return self._create_container_str(out,
+            self._cached_children_strings(out))
+
+    def _create_str_tags(self, out):
+        return out._document_prolog(self._doctype.name,
+            self._doctype.publicid, self._doctype.systemid,
+            self._omit_xml_declaration, self._encoding), u''
+
+    def _own_length(self):
+        # Changes of the document type are not tracked, so the prolog is
+        # not included in the tracked sizes.
+        return 0
+
+    def _untracked_length(self):
+        return len(self._create_str_tags(self._string_output)[0])
+
+    _INDENTS_CHILDREN = False
+
+    def _start_sax_events(self, content_handler, whitespace):
         content_handler.startDocument()
         try:
             notationDecl = content_handler.notationDecl
@@ -368,8 +412,8 @@ class Document(ContainerNode):
         else:
             notationDecl(self._doctype.name, self._doctype.publicid,
                 self._doctype.systemid)
-        for child in self:
-            child._create_sax_events(content_handler, indent)
+
+    def _end_sax_events(self, content_handler, whitespace):
         content_handler.endDocument()
 
     def __repr__(self):
@@ -378,8 +422,59 @@ class Document(ContainerNode):
             repr(self._omit_xml_declaration),
             _string_repr(self._encoding))
 
+    def _structural_hash(self):
+        return hash((Document,
+            tuple(child.structural_hash for child in self)))
+
+    def _structural_key(self):
+        return ('Document', self._doctype._name, self._doctype._publicid,
+            self._doctype._systemid, self._omit_xml_declaration,
+            self._encoding)
+
+    def warm_up(self, indexes=True):
+        '''\
+        Computes the values which are otherwise computed on first access,
+        see :meth:`ContainerNode.warm_up`. Additionally the document is
+        labeled for :meth:`order_key` and the indexes declared on the class
+        are built, so the document can be queried by multiple threads
+        concurrently.
+
+        :param indexes: If this is :const:`False` the indexes are not built.
+        :type indexes: :func:`bool`
+        '''
+        ContainerNode.warm_up(self)
+        self.order_key(self)
+        if indexes:
+            from .indexing import IndexDescriptor
+            declared = IndexDescriptor.declared(self.__class__)
+            missing = dict((name, declared[name].indexer)
+                for name in declared if name not in self._index_cache)
+            if missing:
+                self._index_cache.build(self, missing)
+
+    @_helpers.inherit_docstring(ContainerNode)
+    def freeze(self):
+        ContainerNode.freeze(self)
+        self._doctype._frozen = True
+
+    def _dispose_node(self):
+        ContainerNode._dispose_node(self)
+        self._doctype._frozen = False
+        self._index_cache.invalidate()
+        self._order_end = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.dispose()
+
     def __eq__(self, other):
+        equal = self._frozen_equals(other)
+        if equal is not None:
+            return equal and isinstance(other, Document)
         if not(isinstance(other, Document)
+                and self.structural_hash == other.structural_hash
                 and self._doctype == other._doctype
                 and self._omit_xml_declaration == other._omit_xml_declaration
                 and self._encoding == other._encoding
@@ -391,7 +486,11 @@ class Document(ContainerNode):
         return True
 
     def __ne__(self, other):
+        equal = self._frozen_equals(other)
+        if equal is not None:
+            return not(equal and isinstance(other, Document))
         if (not(isinstance(other, Document))
+                or self.structural_hash != other.structural_hash
                 or self._doctype != other._doctype
                 or self._omit_xml_declaration != other._omit_xml_declaration
                 or self._encoding != other._encoding
@@ -403,12 +502,19 @@ class Document(ContainerNode):
         return False
 
     @_helpers.inherit_docstring(ContainerNode)
-    def duplicate(self):
+    def duplicate(self, copy_on_write=False):
+        if copy_on_write:
+            return self._copy_on_write()
         return Document(self._doctype.name, self._doctype.publicid,
             self._doctype.systemid,
             [child.duplicate() for child in self],
             self._omit_xml_declaration, self._encoding)
 
+    def _shallow_duplicate(self):
+        return Document(self._doctype.name, self._doctype.publicid,
+            self._doctype.systemid, [], self._omit_xml_declaration,
+            self._encoding)
+
     element_by_id = IndexDescriptor(ElementByUniqueAttributeValueIndexer())
     '''\
     A :class:`ecoxipy.pyxom.indexing.IndexDescriptor` instance using a
@@ -451,14 +557,102 @@ class Document(ContainerNode):
     should be deleted on the instance, which deletes the index.
     '''
 
+    elements_by_path = IndexDescriptor(PathIndexer())
+    '''\
+    A :class:`ecoxipy.pyxom.indexing.IndexDescriptor` instance using a
+    :class:`ecoxipy.pyxom.indexing.PathIndexer` for indexing.
+
+    Use it like a mapping to retrieve an iterator over elements having the
+    requested path (e.g. ``/feed/entry/link``) or path suffix (e.g.
+    ``//entry/link``), possibly throwing a :class:`KeyError` if such an
+    element does not exist.
+
+    **Important:** If the document's childs are relevantly modified (i.e. new
+    elements were added or deleted, elements' names were modified),
+    :meth:`delete_indexes` should be called or this attribute should be
+    deleted on the instance, which deletes the index.
+    '''
+
+    def order_key(self, node):
+        '''\
+        Retrieves the document order key of ``node``, an integer which is
+        lower than the key of all nodes following ``node`` and higher than
+        the key of all nodes preceding it.
+
+        On first call all nodes of the document are labeled with keys, which
+        takes time proportional to the size of the document. From then on
+        the labels are maintained when nodes are inserted into the document
+        and retrieving a key takes constant time. Inserted nodes are labeled
+        with keys lying in the gap between the keys of their neighbors in
+        document order, only if the gap is too small the whole document is
+        labeled again. Removed nodes lose their labels. Call
+        :meth:`clear_document_order` to stop maintaining the labels.
+
+        :param node: a node contained in the document or the document itself
+        :type node: :class:`XMLNode`
+        :returns: the order key
+        :rtype: :func:`int`
+        :raises ValueError: if ``node`` is not labeled, i.e. it is not
+            contained in the document
+        '''
+        if self._order_end is None:
+            self._order_end = self._label_document_order()
+        try:
+            return node._order_label
+        except AttributeError:
+            raise ValueError('The node is not contained in the document.')
+
+    def precedes(self, first, second):
+        '''\
+        Determines if ``first`` comes before ``second`` in document order,
+        see :meth:`order_key`.
+
+        :param first: a node contained in the document
+        :param second: a node contained in the document
+        :returns: :const:`True` if ``first`` precedes ``second``,
+            :const:`False` otherwise.
+        '''
+        return self.order_key(first) < self.order_key(second)
+
+    def sort_in_document_order(self, nodes, reverse=False):
+        '''\
+        Sorts nodes contained in the document in document order, using
+        :meth:`order_key`. This is useful to order the results of indexes.
+
+        :param nodes: an iterable of nodes contained in the document
+        :param reverse: If :const:`True` the nodes are returned in reverse
+            document order.
+        :returns: a :func:`list` of the nodes
+        '''
+        return sorted(nodes, key=self.order_key, reverse=reverse)
+
+    def clear_document_order(self):
+        '''\
+        Stops maintaining the labels of :meth:`order_key`, they are created
+        again on the next call of that method.
+        '''
+        self._order_end = None
+
+    @property
+    def index_cache(self):
+        '''\
+        The :class:`ecoxipy.pyxom.indexing.IndexCache` instance holding the
+        indexes of the document. When an index attribute is accessed and the
+        index is not built yet, all missing indexes declared on the class
+        are built in one traversal. Its
+        :meth:`~ecoxipy.pyxom.indexing.IndexCache.statistics` tell about the
+        memory used by the indexes and how often they were built or
+        retrieved.
+        '''
+        return self._index_cache
+
     def delete_indexes(self):
         '''\
-        A shortcut to delete the indexes of :attr:`element_by_id` and
-        :attr:`elements_by_name`.
+        A shortcut to delete all indexes of the document, i.e. those of
+        :attr:`element_by_id`, :attr:`elements_by_name`,
+        :attr:`nodes_by_namespace` and :attr:`elements_by_path`.
         '''
-        del self.element_by_id
-        del self.elements_by_name
-        del self.nodes_by_namespace
+        self._index_cache.invalidate()
 
 del (IndexDescriptor, ElementByUniqueAttributeValueIndexer,
-    ElementsByNameIndexer, NamespaceIndexer)
\ No newline at end of file
+    ElementsByNameIndexer, NamespaceIndexer, PathIndexer)
\ No newline at end of file
@@ -1,15 +1,64 @@
 # -*- coding: utf-8 -*-
 import collections
+import weakref
 from xml.sax.xmlreader import AttributesImpl
 
 from ecoxipy import _python2, _unicode
 from ecoxipy import _helpers
 
-from ._common import XMLNode, ContainerNode, _string_repr
+from ._common import (XMLNode, ContainerNode, _LazyChildren, _string_repr,
+    _LAZY_LOCK)
 from ._attributes import NamespaceNameMixin, Attributes
 from ._content_nodes import Text
 
 
+# Shared empty sentinels, which are replaced by new mappings before anything
+# is added.
+_NO_ATTRIBUTES = {}
+_NO_NAMESPACES = {}
+
+
+class _NamespaceScope(object):
+    '''\
+    The namespace declarations in effect for an element declaring namespaces
+    (the owner) and its descendants which declare none, those share the
+    scope. The scope of an element without parent element declaring no
+    namespaces is ``_EMPTY_SCOPE``.
+
+    A scope and the scopes derived from it are marked invalid, if the
+    declarations of the owner change. The owner is referenced weakly, so
+    elements and their scopes form no reference cycles.
+    '''
+    __slots__ = {'_owner', '_parent', '_uris', '_valid', '_children',
+        '__weakref__'}
+
+    def __init__(self, owner, parent):
+        self._owner = weakref.ref(owner)
+        self._parent = parent
+        self._uris = dict(parent._uris)
+        self._uris.update(owner._namespace_prefix_to_uri)
+        self._valid = True
+        self._children = weakref.WeakSet()
+        if parent is not _EMPTY_SCOPE:
+            parent._children.add(self)
+
+    def _invalidate(self):
+        scopes = [self]
+        while scopes:
+            scope = scopes.pop()
+            if scope._valid:
+                scope._valid = False
+                scopes.extend(scope._children)
+
+
+_EMPTY_SCOPE = _NamespaceScope.__new__(_NamespaceScope)
+# behaves like a dead weak reference
+_EMPTY_SCOPE._owner = lambda: None
+_EMPTY_SCOPE._parent = None
+_EMPTY_SCOPE._uris = {}
+_EMPTY_SCOPE._valid = True
+
+
 class Element(ContainerNode, NamespaceNameMixin):
     '''\
     Represents a XML element. It inherits from :class:`ContainerNode` and
@@ -30,8 +79,7 @@ class Element(ContainerNode, NamespaceNameMixin):
         ``name`` is not a valid XML name.
     '''
     __slots__ = {'_name', '_attributes',  '_namespace_prefix_to_uri',
-        '_namespace_targets', '_namespace_prefix_to_target',
-        '_check_well_formedness'}
+        '_v_namespace_scope', '_check_well_formedness'}
     __slots__.update(NamespaceNameMixin._slots)
 
     def __init__(self, name, children, attributes,
@@ -40,11 +88,22 @@ class Element(ContainerNode, NamespaceNameMixin):
             _helpers.enforce_valid_xml_name(name)
         ContainerNode.__init__(self, children)
         self._name = name
-        self._namespace_prefix_to_uri = {}
-        self._namespace_targets = {}
-        self._namespace_prefix_to_target = {}
-        self._attributes = Attributes(self, attributes, check_well_formedness)
+        self._namespace_prefix_to_uri = _NO_NAMESPACES
         self._check_well_formedness = check_well_formedness
+        if len(attributes) == 0:
+            self._attributes = _NO_ATTRIBUTES
+        else:
+            # The attribute values are stored as a dictionary until the
+            # Attributes instance is requested, it is created directly if
+            # namespaces are declared or names must be checked.
+            self._attributes = dict(attributes)
+            if check_well_formedness:
+                self.attributes
+            else:
+                for attribute_name in self._attributes:
+                    if attribute_name.startswith(u'xmlns'):
+                        self.attributes
+                        break
 
     @staticmethod
     def create(name, *children, **kargs):
@@ -76,34 +135,83 @@ class Element(ContainerNode, NamespaceNameMixin):
             }, True)
 
     def _set_namespace(self, prefix, value):
+        if self._namespace_prefix_to_uri is _NO_NAMESPACES:
+            self._namespace_prefix_to_uri = {}
         self._namespace_prefix_to_uri[prefix] = value
+        self._namespace_declarations_changed()
 
     def _remove_namespace(self, prefix):
         del self._namespace_prefix_to_uri[prefix]
-        prefix_targets = self._namespace_prefix_to_target[prefix]
-        for target_id in prefix_targets:
-            target = self._namespace_targets[target_id]
-            target._clear_namespace_uri()
-
-    def _register_namespace_target(self, target):
-        prefix = target.namespace_prefix
-        target_id = id(target)
-        self._namespace_targets[target_id] = target
+        self._namespace_declarations_changed()
+
+    def _namespace_scope(self):
+        # A cached scope implies cached scopes on all ancestor elements, so
+        # the first valid cached scope of an ancestor is the base of the
+        # scopes to compute.
         try:
-            prefix_targets = self._namespace_prefix_to_target[prefix]
-        except KeyError:
-            prefix_targets = set()
-            self._namespace_prefix_to_target[prefix] = prefix_targets
-        prefix_targets.add(target_id)
-
-    def _remove_namespace_target(self, target):
-        prefix = target.namespace_prefix
-        target_id = id(target)
-        del self._namespace_targets[target_id]
-        prefix_targets = self._namespace_prefix_to_target[prefix]
-        prefix_targets.remove(target_id)
-        if len(prefix_targets) == 0:
-            del self._namespace_prefix_to_target[prefix]
+            scope = self._v_namespace_scope
+        except AttributeError:
+            pass
+        else:
+            if scope._valid:
+                return scope
+        with _LAZY_LOCK:
+            elements = [self]
+            current = self
+            while isinstance(current, Element):
+                try:
+                    scope = current._v_namespace_scope
+                except AttributeError:
+                    pass
+                else:
+                    if scope._valid:
+                        break
+                if current is not self:
+                    elements.append(current)
+                current = current._attribute_node('_parent')
+            else:
+                scope = _EMPTY_SCOPE
+            if current is self:
+                return scope
+            for element in reversed(elements):
+                if element._namespace_prefix_to_uri:
+                    scope = _NamespaceScope(element, scope)
+                element._v_namespace_scope = scope
+            return scope
+
+    @property
+    @_helpers.inherit_docstring(NamespaceNameMixin)
+    def namespace_uri(self):
+        try:
+            scope = self._v_namespace_scope
+            self._parent
+            if scope._valid:
+                return scope._uris.get(self._namespace_prefix, False)
+        except AttributeError:
+            pass
+        return NamespaceNameMixin.namespace_uri.fget(self)
+
+    def _namespace_declarations_changed(self):
+        try:
+            scope = self._v_namespace_scope
+        except AttributeError:
+            return
+        if scope._owner() is self:
+            scope._invalidate()
+        else:
+            self._clear_namespace_scopes()
+
+    def _clear_namespace_scopes(self):
+        elements = [self]
+        while elements:
+            element = elements.pop()
+            try:
+                del element._v_namespace_scope
+            except AttributeError:
+                continue
+            if not isinstance(element._children, _LazyChildren):
+                elements.extend(child for child in element._children
+                    if isinstance(child, Element))
 
     @property
     def namespace_prefixes(self):
@@ -120,13 +228,14 @@ class Element(ContainerNode, NamespaceNameMixin):
         return iterator()
 
     def _get_namespace(self, prefix):
-        current = self
-        while isinstance(current, Element):
-            try:
-                return current, current._namespace_prefix_to_uri[prefix]
-            except KeyError:
-                current = current.parent
-        return None, False
+        scope = self._namespace_scope()
+        try:
+            namespace_uri = scope._uris[prefix]
+        except KeyError:
+            return None, False
+        while prefix not in scope._owner()._namespace_prefix_to_uri:
+            scope = scope._parent
+        return scope._owner(), namespace_uri
 
     def get_namespace_prefix_element(self, prefix):
         '''\
@@ -159,61 +268,94 @@ class Element(ContainerNode, NamespaceNameMixin):
             return
         if self._check_well_formedness:
             _helpers.enforce_valid_xml_name(name)
+        own_length = self._before_change()
         self._name = name
         self._clear_namespace_properties()
+        self._after_change(own_length)
 
     @property
     def attributes(self):
         '''\
         An :class:`Attributes` instance containing the element's attributes.
+        It is created on first access.
+        '''
+        attributes = self._attributes
+        if attributes.__class__ is not Attributes:
+            with _LAZY_LOCK:
+                attributes = self._attributes
+                if attributes.__class__ is not Attributes:
+                    attributes = Attributes(self, attributes,
+                        self._check_well_formedness)
+                    self._attributes = attributes
+        return attributes
+
+    def _attribute_values(self):
+        '''\
+        Returns a mapping of the attribute names to their values, which must
+        not be modified.
         '''
-        return self._attributes
+        attributes = self._attributes
+        if attributes.__class__ is Attributes:
+            return attributes.to_dict()
+        return attributes
 
-    def _create_str(self, out):
-        return out.element(self.name, self._children_strings(out),
-            self._attributes._attribute_value_mapping())
+    def _create_container_str(self, out, children_strings):
+        return out.element(self.name, children_strings,
+            dict(self._attribute_values()))
 
-    def _create_sax_events(self, content_handler, indent):
-        if indent:
-            indent_incr, indent_count = indent
-            child_indent = (indent_incr, indent_count + 1)
-        else:
-            child_indent = indent
-        def do_indent(at_start=False):
-            if indent:
-                if indent_count > 0 or not at_start:
-                    content_handler.characters(u'\n')
-                for i in range(indent_count):
-                    content_handler.characters(indent_incr)
-        do_indent(True)
-        attributes = AttributesImpl(
-            self._attributes.to_dict())
-        content_handler.startElement(self.name, attributes)
-        last_event_characters = False
-        for child in self:
-            if isinstance(child, Text):
-                if indent and not last_event_characters:
-                    do_indent()
-                    content_handler.characters(indent_incr)
-                child._create_sax_events(content_handler, child_indent)
-                last_event_characters = True
-            else:
-                child._create_sax_events(content_handler, child_indent)
-                last_event_characters = False
-        if len(self) > 0:
-            do_indent()
-        content_handler.endElement(self.name)
-        if indent and indent_count == 0:
-            content_handler.characters(u'\n')
+    def _create_str_tags(self, out):
+        return out._element_tags(self._name, self._attribute_values(),
+            len(self) == 0)
+
+    def _start_sax_events(self, content_handler, whitespace):
+        if whitespace:
+            content_handler.characters(whitespace)
+        content_handler.startElement(self._name,
+            AttributesImpl(dict(self._attribute_values())))
+
+    def _end_sax_events(self, content_handler, whitespace):
+        if whitespace:
+            content_handler.characters(whitespace)
+        content_handler.endElement(self._name)
 
     def __repr__(self):
         return 'ecoxipy.pyxom.Element[{}, {{...}}]'.format(
             _string_repr(self._name))
 
+    def _structural_hash(self):
+        return hash((Element, self._name,
+            frozenset(self._attribute_values().items()),
+            tuple(child.structural_hash for child in self)))
+
+    def _structural_key(self):
+        return ('Element', self._name,
+            tuple(sorted(self._attribute_values().items())))
+
+    def _warm_up(self):
+        self.namespace_uri
+        self.local_name
+
+    def _convert_own_links(self, weak):
+        attributes = self._attributes
+        if attributes.__class__ is Attributes:
+            attributes._convert_links(weak)
+
+    def _dispose_node(self):
+        ContainerNode._dispose_node(self)
+        self._v_namespace_scope = None
+        del self._v_namespace_scope
+        attributes = self._attributes
+        if attributes.__class__ is Attributes:
+            self._attributes = attributes._dispose()
+
     def __eq__(self, other):
+        equal = self._frozen_equals(other)
+        if equal is not None:
+            return equal and isinstance(other, Element)
         if not(isinstance(other, Element)
+                and self.structural_hash == other.structural_hash
                 and self._name == other._name
-                and self._attributes == other._attributes
+                and self._attribute_values() == other._attribute_values()
                 and len(self) == len(other)):
             return False
         for i in range(len(self)):
@@ -222,9 +364,13 @@ class Element(ContainerNode, NamespaceNameMixin):
         return True
 
     def __ne__(self, other):
+        equal = self._frozen_equals(other)
+        if equal is not None:
+            return not(equal and isinstance(other, Element))
         if (not(isinstance(other, Element))
+                or self.structural_hash != other.structural_hash
                 or self._name != other._name
-                or self._attributes != other._attributes
+                or self._attribute_values() != other._attribute_values()
                 or len(self) != len(other)):
             return True
         for i in range(len(self)):
@@ -236,9 +382,14 @@ class Element(ContainerNode, NamespaceNameMixin):
         return object.__hash__(self)
 
     @_helpers.inherit_docstring(ContainerNode)
-    def duplicate(self):
+    def duplicate(self, copy_on_write=False):
+        if copy_on_write:
+            return self._copy_on_write()
         return Element(self._name,
             [child.duplicate() for child in self],
-            self._attributes.to_dict())
+            self._attribute_values())
+
+    def _shallow_duplicate(self):
+        return Element(self._name, [], self._attribute_values())
 
 del collections
@@ -0,0 +1,644 @@
+# -*- coding: utf-8 -*-
+u'''\
+:mod:`ecoxipy.pyxom.binary` - Binary Serialization of PyXOM Structures
+======================================================================
+
+This module stores :mod:`ecoxipy.pyxom` structures in a compact binary format,
+which is loaded considerably faster than XML is parsed. :func:`dumps` and
+:func:`dump` serialize :class:`ecoxipy.pyxom.Document`,
+:class:`ecoxipy.pyxom.Element`, :class:`ecoxipy.pyxom.Text`,
+:class:`ecoxipy.pyxom.Comment` and :class:`ecoxipy.pyxom.ProcessingInstruction`
+instances including the document type and XML declaration data of documents,
+:func:`loads` and :func:`load` recreate them.
+
+
+Format
+------
+
+All numbers are little-endian. The data starts with a header:
+
+*   the magic bytes ``PYXOM``,
+*   the format version as an unsigned byte,
+*   flags as an unsigned byte, if bit 0 is set the rest of the data is
+    compressed with :mod:`zlib`.
+
+The body starts with the string table, containing all names, contents and
+document data exactly once. It consists of the string count as an unsigned
+32-bit integer, the end offsets of the strings (relative to the start of the
+string data) as unsigned 64-bit integers and the UTF-8 encoded strings. String
+references are unsigned 32-bit integers, ``0xFFFFFFFF`` stands for
+:const:`None`.
+
+The string table is followed by the record of the root node. A record starts
+with the node kind as an unsigned byte:
+
+=====  ======================  ===============================================
+Kind   Node                    Fields
+=====  ======================  ===============================================
+0      document                XML declaration omitted flag (unsigned byte),
+                               document type name, public ID and system ID,
+                               encoding (string references), child count
+                               (unsigned 32-bit), byte length of the children
+                               records (unsigned 64-bit), children records
+1      element                 name (string reference), attribute count and
+                               child count (unsigned 32-bit), byte length of
+                               the children records (unsigned 64-bit),
+                               attribute name and value string references,
+                               children records
+2      text                    content (string reference)
+3      comment                 content (string reference)
+4      processing instruction  target and content (string references)
+=====  ======================  ===============================================
+
+As the byte lengths of children records are stored, a reader may skip
+subtrees.
+
+
+.. _ecoxipy.pyxom.binary.examples:
+
+Examples
+--------
+
+>>> from ecoxipy import MarkupBuilder
+>>> b = MarkupBuilder()
+>>> document = b[:'article':True](
+...     b.article(
+...         b.h1('Example', data='<&>'),
+...         b.p('Hello', b.em(' World', count=1), '!'),
+...         b | 'A comment',
+...         b['pi-target':'PI content'],
+...         b['pi-without-content':],
+...         {'xmlns': 'http://www.w3.org/1999/xhtml/'}
+...     )
+... )
+>>> data = dumps(document)
+>>> data[:5] == b'PYXOM'
+True
+>>> loaded = loads(data)
+>>> loaded == document and loaded is not document
+True
+>>> print(loaded.doctype.name)
+article
+>>> loaded.omit_xml_declaration
+True
+>>> print(loaded[0][1][1].namespace_uri)
+http://www.w3.org/1999/xhtml/
+
+
+The data can be compressed and any node can be serialized:
+
+>>> compressed = dumps(document, compression=9)
+>>> loads(compressed) == document
+True
+>>> loads(dumps(document[0][1])) == document[0][1]
+True
+>>> print(loads(dumps(document[0][-1])).content)
+None
+
+
+Files are written and read with :func:`dump` and :func:`load`:
+
+>>> from io import BytesIO
+>>> stream = BytesIO()
+>>> dump(document, stream)
+>>> position = stream.seek(0)
+>>> load(stream) == document
+True
+
+
+Uncompressed files can be memory-mapped with :func:`load_mapped`. Only the
+root node is created when opening, the children of container nodes are
+decoded when they are first accessed:
+
+>>> from tempfile import TemporaryFile
+>>> with TemporaryFile() as file:
+...     dump(document, file)
+...     mapped = load_mapped(file)
+>>> len(mapped)
+1
+>>> article = mapped[0]
+>>> print(article.name)
+article
+>>> print(article[1][1].parent.name)
+p
+>>> print(article[1][1].attributes['count'].value)
+1
+>>> len(list(mapped.descendants()))
+11
+>>> mapped == document
+True
+
+
+Invalid data is rejected:
+
+>>> loads(b'<xml/>')
+Traceback (most recent call last):
+ValueError: The data is not in the PyXOM binary format.
+>>> loads(data[:len(data) // 2])
+Traceback (most recent call last):
+ValueError: The data is truncated or invalid.
+>>> loads(data + b'junk')
+Traceback (most recent call last):
+ValueError: There is data after the root node.
+
+
+Functions
+---------
+
+.. autofunction:: dumps
+.. autofunction:: dump
+.. autofunction:: loads
+.. autofunction:: load
+.. autofunction:: load_mapped
+'''
+
+import gc
+import mmap
+import struct
+import zlib
+
+from ._common import _LazyChildren
+from ._document import Document
+from ._element import Element
+from ._content_nodes import Text, Comment, ProcessingInstruction
+
+
+_MAGIC = b'PYXOM'
+_VERSION = 1
+_COMPRESSED = 1
+_NONE = 0xFFFFFFFF
+
+_DOCUMENT = 0
+_ELEMENT = 1
+_TEXT = 2
+_COMMENT = 3
+_PROCESSING_INSTRUCTION = 4
+
+_HEADER = struct.Struct('<5sBB')
+_COUNT = struct.Struct('<I')
+_OFFSET = struct.Struct('<Q')
+_KIND = struct.Struct('<B')
+_DOCUMENT_RECORD = struct.Struct('<BBIIIIIQ')
+_ELEMENT_RECORD = struct.Struct('<BIIIQ')
+_CONTENT_RECORD = struct.Struct('<BI')
+_PROCESSING_INSTRUCTION_RECORD = struct.Struct('<BII')
+# the Adler-32 checksum ending zlib streams
+_CHECKSUM = struct.Struct('>I')
+
+
+class _StringTable(object):
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def __call__(self, value):
+        if value is None:
+            return _NONE
+        try:
+            return self.ids[value]
+        except KeyError:
+            string_id = len(self.strings)
+            self.ids[value] = string_id
+            self.strings.append(value)
+            return string_id
+
+    def dumps(self):
+        encoded = [string.encode('UTF-8') for string in self.strings]
+        offsets = []
+        offset = 0
+        for string in encoded:
+            offset += len(string)
+            offsets.append(offset)
+        return b''.join([_COUNT.pack(len(encoded)),
+            struct.pack('<{}Q'.format(len(offsets)), *offsets)] + encoded)
+
+
+def _dump_records(node, string_id):
+    pieces = []
+    length = 0
+    nodes = [node]
+    while nodes:
+        current = nodes.pop()
+        if current.__class__ is tuple:
+            piece_index, children_start, record, values, suffix = current
+            pieces[piece_index] = record.pack(
+                *(values + (length - children_start,))) + suffix
+            continue
+        suffix = None
+        if isinstance(current, Element):
+            attributes = [
+                string_id(value)
+                for attribute_item in current._attribute_values().items()
+                for value in attribute_item
+            ]
+            record = _ELEMENT_RECORD
+            values = (_ELEMENT, string_id(current.name),
+                len(attributes) // 2, len(current))
+            suffix = struct.pack('<{}I'.format(len(attributes)), *attributes)
+        elif isinstance(current, Document):
+            doctype = current.doctype
+            record = _DOCUMENT_RECORD
+            values = (_DOCUMENT, 1 if current.omit_xml_declaration else 0,
+                string_id(doctype.name), string_id(doctype.publicid),
+                string_id(doctype.systemid), string_id(current.encoding),
+                len(current))
+            suffix = b''
+        elif isinstance(current, Text):
+            piece = _CONTENT_RECORD.pack(_TEXT, string_id(current.content))
+        elif isinstance(current, Comment):
+            piece = _CONTENT_RECORD.pack(_COMMENT,
+                string_id(current.content))
+        elif isinstance(current, ProcessingInstruction):
+            piece = _PROCESSING_INSTRUCTION_RECORD.pack(
+                _PROCESSING_INSTRUCTION, string_id(current.target),
+                string_id(current.content))
+        else:
+            raise TypeError('Unknown node type: {}'.format(current))
+        if suffix is None:
+            pieces.append(piece)
+            length += len(piece)
+        else:
+            pieces.append(None)
+            length += record.size + len(suffix)
+            nodes.append((len(pieces) - 1, length, record, values, suffix))
+            nodes.extend(reversed(current))
+    return pieces
+
+
+def dumps(node, compression=None):
+    '''\
+    Serializes a PyXOM structure into the binary format.
+
+    :param node: The node to serialize, it may be of any PyXOM node type.
+    :type node: :class:`ecoxipy.pyxom.XMLNode`
+    :param compression: If this is not :const:`None` the data is compressed
+        with :mod:`zlib` using this value as the compression level
+        (``0`` to ``9``).
+    :type compression: :func:`int`
+    :returns: The serialized data.
+    :rtype: :func:`bytes`
+    '''
+    string_id = _StringTable()
+    records = _dump_records(node, string_id)
+    body = b''.join([string_id.dumps()] + records)
+    if compression is None:
+        flags = 0
+    else:
+        flags = _COMPRESSED
+        body = zlib.compress(body, compression)
+    return _HEADER.pack(_MAGIC, _VERSION, flags) + body
+
+
+def dump(node, file, compression=None):
+    '''\
+    Serializes a PyXOM structure into the binary format and writes it to a
+    file.
+
+    :param node: The node to serialize, it may be of any PyXOM node type.
+    :type node: :class:`ecoxipy.pyxom.XMLNode`
+    :param file: The binary file to write to.
+    :param compression: If this is not :const:`None` the data is compressed
+        with :mod:`zlib` using this value as the compression level.
+    :type compression: :func:`int`
+    '''
+    file.write(dumps(node, compression))
+
+
+_TRUNCATED = 'The data is truncated or invalid.'
+
+_TRAILING_DATA = 'There is data after the root node.'
+
+
+def _read_header(data):
+    if len(data) < _HEADER.size:
+        raise ValueError('The data is not in the PyXOM binary format.')
+    magic, version, flags = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError('The data is not in the PyXOM binary format.')
+    if version != _VERSION:
+        raise ValueError(
+            'The PyXOM binary format version {} is not supported.'.format(
+                version))
+    return flags
+
+
+def _read_string_table(data, position):
+    '''\
+    Returns the string count, the position of the offsets, the position of
+    the string data and the position of the root record.
+    '''
+    count = _COUNT.unpack_from(data, position)[0]
+    offsets_position = position + _COUNT.size
+    strings_position = offsets_position + count * _OFFSET.size
+    if count == 0:
+        strings_length = 0
+    else:
+        strings_length = _OFFSET.unpack_from(data,
+            strings_position - _OFFSET.size)[0]
+    return (count, offsets_position, strings_position,
+        strings_position + strings_length)
+
+
+def _load_strings(data, position):
+    try:
+        count, offsets_position, strings_position, root_position = (
+            _read_string_table(data, position))
+        offsets = struct.unpack_from('<{}Q'.format(count), data,
+            offsets_position)
+    except struct.error:
+        raise ValueError(_TRUNCATED)
+    if root_position > len(data):
+        raise ValueError(_TRUNCATED)
+    strings = []
+    start = strings_position
+    for offset in offsets:
+        end = strings_position + offset
+        strings.append(data[start:end].decode('UTF-8'))
+        start = end
+    return strings, root_position
+
+
+def _load_records(data, position, strings):
+    '''\
+    Returns the root node and the position after its record.
+    '''
+    try:
+        return _decode_records(data, position, strings)
+    except (struct.error, IndexError):
+        raise ValueError(_TRUNCATED)
+
+
+def _decode_records(data, position, strings):
+    def string(string_id):
+        return None if string_id == _NONE else strings[string_id]
+    unpack_kind = _KIND.unpack_from
+    unpack_element = _ELEMENT_RECORD.unpack_from
+    element_size = _ELEMENT_RECORD.size
+    unpack_content = _CONTENT_RECORD.unpack_from
+    content_size = _CONTENT_RECORD.size
+    stack = []
+    while True:
+        kind = unpack_kind(data, position)[0]
+        if kind == _ELEMENT:
+            (kind, name, attribute_count, child_count,
+                length) = unpack_element(data, position)
+            position += element_size
+            attributes = {}
+            if attribute_count > 0:
+                attribute_ids = struct.unpack_from(
+                    '<{}I'.format(2 * attribute_count), data, position)
+                position += 8 * attribute_count
+                for i in range(0, 2 * attribute_count, 2):
+                    attributes[strings[attribute_ids[i]]] = strings[
+                        attribute_ids[i + 1]]
+            if child_count > 0:
+                stack.append((child_count, [], Element, (strings[name],),
+                    (attributes,)))
+                continue
+            node = Element(strings[name], [], attributes)
+        elif kind == _TEXT:
+            node = Text(strings[unpack_content(data, position)[1]])
+            position += content_size
+        elif kind == _COMMENT:
+            node = Comment(strings[unpack_content(data, position)[1]])
+            position += content_size
+        elif kind == _PROCESSING_INSTRUCTION:
+            kind, target, content = _PROCESSING_INSTRUCTION_RECORD.unpack_from(
+                data, position)
+            node = ProcessingInstruction(strings[target], string(content))
+            position += _PROCESSING_INSTRUCTION_RECORD.size
+        elif kind == _DOCUMENT:
+            (kind, omit_xml_declaration, doctype_name, doctype_publicid,
+                doctype_systemid, encoding, child_count,
+                length) = _DOCUMENT_RECORD.unpack_from(data, position)
+            position += _DOCUMENT_RECORD.size
+            arguments = (string(doctype_name), string(doctype_publicid),
+                string(doctype_systemid))
+            trailing_arguments = (omit_xml_declaration == 1,
+                string(encoding))
+            if child_count > 0:
+                stack.append((child_count, [], Document, arguments,
+                    trailing_arguments))
+                continue
+            node = Document(*(arguments + ([],) + trailing_arguments))
+        else:
+            raise ValueError('Invalid node kind {} at position {}.'.format(
+                kind, position))
+        while True:
+            if not stack:
+                return node, position
+            child_count, children, node_type, arguments, trailing_arguments = (
+                stack[-1])
+            children.append(node)
+            if len(children) < child_count:
+                break
+            stack.pop()
+            node = node_type(*(arguments + (children,) + trailing_arguments))
+
+
+def _body(data):
+    flags = _read_header(data)
+    if flags & _COMPRESSED:
+        compressed = data[_HEADER.size:]
+        decompressor = zlib.decompressobj()
+        try:
+            body = decompressor.decompress(compressed) + decompressor.flush()
+        except zlib.error:
+            raise ValueError(_TRUNCATED)
+        if decompressor.unused_data:
+            raise ValueError(_TRAILING_DATA)
+        # A truncated stream is decompressed without error, but it does not
+        # end with the checksum of the data.
+        if (len(compressed) < 4 or _CHECKSUM.unpack(compressed[-4:])[0]
+                != zlib.adler32(body) & 0xFFFFFFFF):
+            raise ValueError(_TRUNCATED)
+        return body, 0
+    return data, _HEADER.size
+
+
+def _check_end(data, position):
+    if position != len(data):
+        raise ValueError(_TRAILING_DATA)
+
+
+def loads(data):
+    '''\
+    Creates a PyXOM structure from data in the binary format. The cyclic
+    garbage collector is paused while the nodes are created, as the
+    allocations would otherwise trigger it very often.
+
+    :param data: The serialized data.
+    :type data: :func:`bytes`
+    :returns: The created node.
+    :rtype: :class:`ecoxipy.pyxom.XMLNode`
+    :raises ValueError: If the data is not in the binary format, it is
+        truncated or there is data after the root node.
+    '''
+    data, position = _body(data)
+    strings, position = _load_strings(data, position)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        node, position = _load_records(data, position, strings)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    _check_end(data, position)
+    return node
+
+
+def load(file):
+    '''\
+    Reads data in the binary format from a file and creates a PyXOM
+    structure.
+
+    :param file: The binary file to read from.
+    :returns: The created node.
+    :rtype: :class:`ecoxipy.pyxom.XMLNode`
+    :raises ValueError: If the data is not in the binary format, it is
+        truncated or there is data after the root node.
+    '''
+    return loads(file.read())
+
+
+class _MappedData(object):
+    '''\
+    Decodes strings and records from memory-mapped data on demand.
+    '''
+    def __init__(self, data, position):
+        self.data = data
+        (count, self.offsets_position, self.strings_position,
+            self.root_position) = _read_string_table(data, position)
+        self.strings = {}
+
+    def string(self, string_id):
+        if string_id == _NONE:
+            return None
+        try:
+            return self.strings[string_id]
+        except KeyError:
+            pass
+        data = self.data
+        offsets_position = self.offsets_position + string_id * _OFFSET.size
+        if string_id == 0:
+            start = 0
+        else:
+            start = _OFFSET.unpack_from(data,
+                offsets_position - _OFFSET.size)[0]
+        end = _OFFSET.unpack_from(data, offsets_position)[0]
+        strings_position = self.strings_position
+        value = data[strings_position + start:strings_position + end].decode(
+            'UTF-8')
+        self.strings[string_id] = value
+        return value
+
+    def node(self, position):
+        '''\
+        Creates the node whose record starts at ``position``, its children
+        are decoded lazily. Returns the node and the position after its
+        record including its children records.
+        '''
+        data = self.data
+        string = self.string
+        kind = _KIND.unpack_from(data, position)[0]
+        if kind == _ELEMENT:
+            (kind, name, attribute_count, child_count,
+                length) = _ELEMENT_RECORD.unpack_from(data, position)
+            position += _ELEMENT_RECORD.size
+            attributes = {}
+            if attribute_count > 0:
+                attribute_ids = struct.unpack_from(
+                    '<{}I'.format(2 * attribute_count), data, position)
+                position += 8 * attribute_count
+                for i in range(0, 2 * attribute_count, 2):
+                    attributes[string(attribute_ids[i])] = string(
+                        attribute_ids[i + 1])
+            node = Element(string(name), [], attributes)
+        elif kind == _TEXT:
+            return (Text(string(_CONTENT_RECORD.unpack_from(data, position)[1])),
+                position + _CONTENT_RECORD.size)
+        elif kind == _COMMENT:
+            return (
+                Comment(string(_CONTENT_RECORD.unpack_from(data, position)[1])),
+                position + _CONTENT_RECORD.size)
+        elif kind == _PROCESSING_INSTRUCTION:
+            kind, target, content = _PROCESSING_INSTRUCTION_RECORD.unpack_from(
+                data, position)
+            return (ProcessingInstruction(string(target), string(content)),
+                position + _PROCESSING_INSTRUCTION_RECORD.size)
+        elif kind == _DOCUMENT:
+            (kind, omit_xml_declaration, doctype_name, doctype_publicid,
+                doctype_systemid, encoding, child_count,
+                length) = _DOCUMENT_RECORD.unpack_from(data, position)
+            position += _DOCUMENT_RECORD.size
+            node = Document(string(doctype_name), string(doctype_publicid),
+                string(doctype_systemid), [], omit_xml_declaration == 1,
+                string(encoding))
+        else:
+            raise ValueError('Invalid node kind {} at position {}.'.format(
+                kind, position))
+        if child_count > 0:
+            node._children = _MappedChildren(node, self, position,
+                child_count)
+        return node, position + length
+
+
+class _MappedChildren(_LazyChildren):
+    '''\
+    The children of a container node loaded by :func:`load_mapped`, which are
+    decoded on first access.
+    '''
+    __slots__ = {'_data', '_position', '_count'}
+
+    def __init__(self, owner, data, position, count):
+        _LazyChildren.__init__(self, owner)
+        self._data = data
+        self._position = position
+        self._count = count
+
+    def _create_children(self):
+        node = self._data.node
+        position = self._position
+        children = []
+        for i in range(self._count):
+            child, position = node(position)
+            children.append(child)
+        return children
+
+    def __len__(self):
+        return self._count
+
+
+def load_mapped(file):
+    '''\
+    Maps a file containing uncompressed data in the binary format into memory
+    and creates its root node. The children of container nodes are decoded
+    when they are first accessed, so opening takes constant time and memory
+    usage grows with the part of the structure which is used. Navigation and
+    modification work as on other PyXOM structures.
+
+    The mapping stays open until all children are decoded or the structure is
+    garbage collected, the file may be closed after calling this function.
+
+    :param file: The binary file to map, it must support :meth:`fileno`.
+    :returns: The root node.
+    :rtype: :class:`ecoxipy.pyxom.XMLNode`
+    :raises ValueError: If the data is not in the binary format, it is
+        compressed, it is truncated or there is data after the root node.
+    '''
+    file.flush()
+    data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        flags = _read_header(data)
+        if flags & _COMPRESSED:
+            raise ValueError('Compressed data can not be memory-mapped.')
+        try:
+            mapped_data = _MappedData(data, _HEADER.size)
+            node, position = mapped_data.node(mapped_data.root_position)
+        except struct.error:
+            raise ValueError(_TRUNCATED)
+        _check_end(data, position)
+    except ValueError:
+        data.close()
+        raise
+    return node
@@ -0,0 +1,1034 @@
+# -*- coding: utf-8 -*-
+u'''\
+:mod:`ecoxipy.pyxom.compact` - Compact Read-Only Documents
+==========================================================
+
+Every :mod:`ecoxipy.pyxom` node is a Python object with references to its
+parent and siblings, elements also have a list of children, an
+:class:`ecoxipy.pyxom.Attributes` mapping of
+:class:`ecoxipy.pyxom.Attribute` objects and namespace bookkeeping. For very
+large documents this module provides :class:`CompactDocument`, which stores
+node kinds, interned names, parent and child links as well as the positions
+of node contents in typed arrays (:class:`array.array`) and all contents in
+one string.
+
+A :class:`CompactDocument` is read-only. Its navigation API is compatible with
+the accessors of :class:`ecoxipy.pyxom.ContainerNode`,
+:class:`ecoxipy.pyxom.Element` and the content nodes, but node objects are only
+created as light-weight views on access. A complete PyXOM structure of any
+node is created by :meth:`CompactNode.materialize`.
+
+
+.. _ecoxipy.pyxom.compact.examples:
+
+Examples
+--------
+
+A compact document is created by parsing XML or from a PyXOM structure:
+
+>>> document = CompactDocument.parse(b"""\\
+... <article xmlns="http://www.w3.org/1999/xhtml/" lang="en">\\
+... <h1>Example</h1><p>Hello<em count="1"> World</em>!</p>\\
+... <!--A comment--><?pi-target PI content?>\\
+... <foo:data xmlns:foo="foo://bar" foo:id="1"/></article>""")
+>>> len(document)
+1
+>>> article = document[0]
+>>> print(article.name)
+article
+>>> print(article.attributes['lang'].value)
+en
+>>> print(article[1][1][0].content)
+ World
+>>> article[1][1].parent == article[1]
+True
+>>> article[1].next == article[2] and article[2].previous == article[1]
+True
+>>> print(article[2].content)
+A comment
+>>> print(article[3].target)
+pi-target
+>>> list(article[1][1].ancestors) == [article[1], article, document]
+True
+>>> article[-1].namespace_uri == u'foo://bar'
+True
+>>> article[-1].attributes['foo:id'].namespace_uri == u'foo://bar'
+True
+>>> article[1][0] in article[1]
+True
+
+
+Descendants are retrieved like from PyXOM structures:
+
+>>> print(u', '.join(node.name for node in article.descendants()
+...     if isinstance(node, CompactElement)))
+h1, p, em, foo:data
+>>> print(u', '.join(node.name for node in article.descendants(
+...     depth_first=False, max_depth=1)
+...     if isinstance(node, CompactElement)))
+h1, p, foo:data
+
+
+The nodes can be serialized or be materialized as PyXOM nodes:
+
+>>> print(article[1])
+<p>Hello<em count="1"> World</em>!</p>
+>>> from ecoxipy import pyxom
+>>> paragraph = article[1].materialize()
+>>> isinstance(paragraph, pyxom.Element) and paragraph.parent is None
+True
+>>> paragraph == pyxom.Element.create('p', 'Hello',
+...     pyxom.Element.create('em', ' World', attributes={'count': 1}), '!')
+True
+>>> bytes(document.materialize()) == bytes(document)
+True
+
+
+Creating a compact document from a PyXOM structure:
+
+>>> from ecoxipy import MarkupBuilder
+>>> b = MarkupBuilder()
+>>> original = b[:'html':True](b.html(b.body(b.p('Foo'), b.p('Bar'))))
+>>> compact = CompactDocument.from_node(original)
+>>> print(compact.doctype.name)
+html
+>>> bytes(compact) == bytes(original)
+True
+>>> compact.materialize() == original
+True
+
+
+Classes
+-------
+
+.. autoclass:: CompactDocument
+.. autoclass:: CompactNode
+.. autoclass:: CompactContainerNode
+.. autoclass:: CompactElement
+.. autoclass:: CompactAttributes
+.. autoclass:: CompactAttribute
+.. autoclass:: CompactContentNode
+.. autoclass:: CompactText
+.. autoclass:: CompactComment
+.. autoclass:: CompactProcessingInstruction
+'''
+
+import collections
+from array import array
+from io import BytesIO
+from xml.sax import (SAXNotRecognizedException, SAXNotSupportedException,
+    make_parser)
+from xml.sax.handler import (ContentHandler, DTDHandler,
+    property_lexical_handler)
+
+from tinkerpy import LexicalHandler, DeclarationHandler
+
+from ecoxipy import _python2, _unicode
+from ecoxipy import _helpers
+from ecoxipy.string_output import StringOutput
+
+from ._document import DocumentType, Document
+from ._element import Element
+from ._content_nodes import Text, Comment, ProcessingInstruction
+
+
+_DOCUMENT = 0
+_ELEMENT = 1
+_TEXT = 2
+_COMMENT = 3
+_PROCESSING_INSTRUCTION = 4
+_PROCESSING_INSTRUCTION_WITHOUT_CONTENT = 5
+
+_XML_NAMESPACE_URI = u'http://www.w3.org/XML/1998/namespace'
+_XMLNS_NAMESPACE_URI = u'http://www.w3.org/2000/xmlns/'
+
+
+class _CompactBuilder(object):
+    def __init__(self):
+        self.names = []
+        self.name_ids = {}
+        self.kinds = array('b', [_DOCUMENT])
+        self.node_names = array('i', [-1])
+        self.parents = array('i', [-1])
+        self.positions = array('i', [0])
+        self.ends = array('i', [1])
+        self.child_starts = array('i', [0])
+        self.child_counts = array('i', [0])
+        self.child_list = array('i')
+        self.content_starts = array('l', [0, 0])
+        self.contents = []
+        self.content_length = 0
+        self.attribute_starts = array('i', [0, 0])
+        self.attribute_names = array('i')
+        self.attribute_value_starts = array('l', [0])
+        self.attribute_values = []
+        self.attribute_values_length = 0
+        self.stack = [(0, [])]
+
+    def _name_id(self, name):
+        try:
+            return self.name_ids[name]
+        except KeyError:
+            name_id = len(self.names)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+            return name_id
+
+    def _add_node(self, kind, name, content):
+        index = len(self.kinds)
+        parent, children = self.stack[-1]
+        self.kinds.append(kind)
+        self.node_names.append(-1 if name is None else self._name_id(name))
+        self.parents.append(parent)
+        self.positions.append(len(children))
+        self.ends.append(index + 1)
+        self.child_starts.append(0)
+        self.child_counts.append(0)
+        if content:
+            self.contents.append(content)
+            self.content_length += len(content)
+        self.content_starts.append(self.content_length)
+        self.attribute_starts.append(len(self.attribute_names))
+        children.append(index)
+        return index
+
+    def start_element(self, name, attributes):
+        for attribute_name, attribute_value in attributes:
+            self.attribute_names.append(self._name_id(attribute_name))
+            self.attribute_values.append(attribute_value)
+            self.attribute_values_length += len(attribute_value)
+            self.attribute_value_starts.append(self.attribute_values_length)
+        index = self._add_node(_ELEMENT, name, None)
+        self.stack.append((index, []))
+
+    def _close(self):
+        index, children = self.stack.pop()
+        self.child_starts[index] = len(self.child_list)
+        self.child_counts[index] = len(children)
+        self.child_list.extend(children)
+        self.ends[index] = len(self.kinds)
+
+    end_element = _close
+
+    def text(self, content, merge=True):
+        if (merge and self.kinds[-1] == _TEXT
+                and self.parents[-1] == self.stack[-1][0]):
+            self.contents.append(content)
+            self.content_length += len(content)
+            self.content_starts[-1] = self.content_length
+        else:
+            self._add_node(_TEXT, None, content)
+
+    def comment(self, content):
+        self._add_node(_COMMENT, None, content)
+
+    def processing_instruction(self, target, content):
+        if content is None:
+            self._add_node(_PROCESSING_INSTRUCTION_WITHOUT_CONTENT, target,
+                None)
+        else:
+            self._add_node(_PROCESSING_INSTRUCTION, target, content)
+
+    def create_document(self, doctype_name, doctype_publicid,
+            doctype_systemid, omit_xml_declaration, encoding):
+        while self.stack:
+            self._close()
+        return CompactDocument(self, doctype_name, doctype_publicid,
+            doctype_systemid, omit_xml_declaration, encoding)
+
+
+class _CompactHandler(ContentHandler, DTDHandler, LexicalHandler,
+        DeclarationHandler):
+    def __init__(self):
+        self._builder = _CompactBuilder()
+        self._doctype = (None, None, None)
+
+    def notationDecl(self, name, publicId, systemId):
+        self._doctype = tuple(None if value is None else _unicode(value)
+            for value in (name, publicId, systemId))
+
+    def unparsedEntityDecl(self, name, publicId, systemId, ndata):
+        self.notationDecl(name, publicId, systemId)
+
+    def startDTD(self, name, public_id, system_id):
+        self.notationDecl(name, public_id, system_id)
+
+    def endDocument(self):
+        self.document = self._builder.create_document(
+            self._doctype[0], self._doctype[1], self._doctype[2], True,
+            u'UTF-8')
+
+    def startElement(self, name, attrs):
+        self._builder.start_element(_unicode(name), [
+            (_unicode(attr_name), _unicode(attr_value))
+            for attr_name, attr_value in attrs.items()
+        ])
+
+    def endElement(self, name):
+        self._builder.end_element()
+
+    def characters(self, content):
+        self._builder.text(_unicode(content))
+
+    def ignorableWhitespace(self, content):
+        self.characters(content)
+
+    def processingInstruction(self, target, data):
+        self._builder.processing_instruction(_unicode(target),
+            _unicode(data))
+
+    def comment(self, content):
+        self._builder.comment(_unicode(content))
+
+
+class CompactNode(object):
+    '''\
+    Base class of the views on the nodes of a :class:`CompactDocument`.
+    Instances are created on access and are equal if they represent the
+    same node.
+    '''
+    __slots__ = {'_document', '_index'}
+
+    _string_output = StringOutput()
+
+    def __init__(self, document, index):
+        self._document = document
+        self._index = index
+
+    @property
+    def document(self):
+        '''\
+        The :class:`CompactDocument` containing the node.
+        '''
+        return self._document
+
+    @property
+    def parent(self):
+        '''\
+        The parent :class:`CompactContainerNode` or :const:`None` if the node
+        has no parent.
+        '''
+        parent = self._document._parents[self._index]
+        if parent < 0:
+            return None
+        return self._document._node(parent)
+
+    def _sibling(self, offset):
+        document = self._document
+        parent = document._parents[self._index]
+        if parent < 0:
+            return None
+        position = document._positions[self._index] + offset
+        if position < 0 or position >= document._child_counts[parent]:
+            return None
+        return document._node(
+            document._child_list[document._child_starts[parent] + position])
+
+    @property
+    def previous(self):
+        '''\
+        The previous node or :const:`None` if the node has no preceding
+        sibling.
+        '''
+        return self._sibling(-1)
+
+    @property
+    def next(self):
+        '''\
+        The next node or :const:`None` if the node has no following sibling.
+        '''
+        return self._sibling(1)
+
+    def _attribute_iterator(self, attribute):
+        current = self
+        while True:
+            current = getattr(current, attribute)
+            if current is None:
+                break
+            yield current
+
+    @property
+    def ancestors(self):
+        '''\
+        Returns an iterator over all ancestors.
+        '''
+        return self._attribute_iterator('parent')
+
+    @property
+    def preceding_siblings(self):
+        '''\
+        Returns an iterator over all preceding siblings.
+        '''
+        return self._attribute_iterator('previous')
+
+    @property
+    def following_siblings(self):
+        '''\
+        Returns an iterator over all following siblings.
+        '''
+        return self._attribute_iterator('next')
+
+    def _attribute_climbing_iterator(self, attribute):
+        nodes = list(self._attribute_iterator(attribute))
+        while nodes:
+            current = nodes.pop(0)
+            yield current
+            if len(nodes) == 0:
+                parent = current.parent
+                if parent is not None:
+                    nodes.extend(parent._attribute_iterator(attribute))
+
+    @property
+    def preceding(self):
+        '''\
+        Returns an iterator over all preceding nodes.
+        '''
+        return self._attribute_climbing_iterator('previous')
+
+    @property
+    def following(self):
+        '''\
+        Returns an iterator over all following nodes.
+        '''
+        return self._attribute_climbing_iterator('next')
+
+    def materialize(self):
+        '''\
+        Creates the PyXOM representation of the node and its descendants.
+
+        :returns: The created :class:`ecoxipy.pyxom.XMLNode` instance.
+        '''
+        raise NotImplementedError()
+
+    def create_str(self, out=None, encoding='UTF-8'):
+        '''\
+        Creates a string containing the XML representation of the node.
+
+        :param out: A :class:`ecoxipy.string_output.StringOutput` instance or
+            :const:`None`. If it is the latter, a new
+            :class:`ecoxipy.string_output.StringOutput` instance is created.
+        :param encoding: The output encoding or :const:`None` for Unicode
+            output. Is only taken into account if ``out`` is :const:`None`.
+        '''
+        if out is None:
+            out = self._string_output
+        output_string = self._create_str(out)
+        if encoding is not None:
+            output_string = output_string.encode(encoding)
+        return output_string
+
+    def __str__(self):
+        return _unicode(self.create_str(encoding=None))
+
+    def __bytes__(self):
+        return self.create_str(encoding='UTF-8')
+
+    if _python2:
+        __unicode__ = __str__
+        __str__ = __bytes__
+        del __bytes__
+
+    def __eq__(self, other):
+        return (isinstance(other, CompactNode)
+            and self._document is other._document
+            and self._index == other._index)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self._document), self._index))
+
+    def __repr__(self):
+        return 'ecoxipy.pyxom.compact.{}[{}]'.format(self.__class__.__name__,
+            self._index)
+
+
+class CompactContainerNode(CompactNode):
+    '''\
+    A :class:`CompactNode` containing other nodes with read-only sequence
+    semantics.
+    '''
+    __slots__ = set()
+
+    def _child_index(self, position):
+        document = self._document
+        count = document._child_counts[self._index]
+        if position < 0:
+            position += count
+        if position < 0 or position >= count:
+            raise IndexError(position)
+        return document._child_list[
+            document._child_starts[self._index] + position]
+
+    def __len__(self):
+        return self._document._child_counts[self._index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position]
+                for position in range(*index.indices(len(self)))]
+        return self._document._node(self._child_index(index))
+
+    def __iter__(self):
+        document = self._document
+        start = document._child_starts[self._index]
+        for position in range(start,
+                start + document._child_counts[self._index]):
+            yield document._node(document._child_list[position])
+
+    def __reversed__(self):
+        document = self._document
+        start = document._child_starts[self._index]
+        for position in range(
+                start + document._child_counts[self._index] - 1,
+                start - 1, -1):
+            yield document._node(document._child_list[position])
+
+    def __contains__(self, node):
+        return (isinstance(node, CompactNode)
+            and node._document is self._document
+            and self._document._parents[node._index] == self._index)
+
+    def children(self, reverse=False):
+        '''\
+        Returns an iterator over the children.
+
+        :param reverse: If this is :const:`True` the children are returned in
+            reverse document order.
+        :returns: An iterator over the children.
+        '''
+        return reversed(self) if reverse else iter(self)
+
+    def descendants(self, reverse=False, depth_first=True, max_depth=None):
+        '''\
+        Returns an iterator over all descendants, see
+        :meth:`ecoxipy.pyxom.ContainerNode.descendants`.
+        '''
+        reverse = bool(reverse)
+        depth_first = bool(depth_first)
+        document = self._document
+        if not reverse and depth_first and max_depth is None:
+            return (document._node(index) for index in range(self._index + 1,
+                document._ends[self._index]))
+        if depth_first:
+            child_reverse = not reverse
+            pop_position = -1
+        else:
+            child_reverse = reverse
+            pop_position = 0
+        if max_depth is not None:
+            max_depth = int(max_depth)
+            if max_depth < 1:
+                raise ValueError(
+                    'The argument "max_depth" must be greater than zero.')
+        nodes = [(child, 1) for child in self.children(child_reverse)]
+        def iterator():
+            while nodes:
+                current, depth = nodes.pop(pop_position)
+                yield current
+                if (isinstance(current, CompactContainerNode)
+                        and (max_depth is None or depth < max_depth)):
+                    nodes.extend((child, depth + 1)
+                        for child in current.children(child_reverse))
+        return iterator()
+
+    @property
+    def descendant_count(self):
+        '''\
+        The number of descendants of the node.
+        '''
+        return self._document._ends[self._index] - self._index - 1
+
+    def _children_strings(self, out):
+        return [child._create_str(out) for child in self]
+
+
+class CompactAttribute(object):
+    '''\
+    A read-only view on an attribute of a :class:`CompactElement`.
+    '''
+    __slots__ = {'_element', '_index'}
+
+    def __init__(self, element, index):
+        self._element = element
+        self._index = index
+
+    @property
+    def parent(self):
+        '''\
+        The :class:`CompactAttributes` containing the attribute.
+        '''
+        return self._element.attributes
+
+    @property
+    def name(self):
+        '''\
+        The name of the attribute.
+        '''
+        document = self._element._document
+        return document._names[document._attribute_names[self._index]]
+
+    @property
+    def value(self):
+        '''\
+        The value of the attribute.
+        '''
+        document = self._element._document
+        return document._attribute_values[
+            document._attribute_value_starts[self._index]:
+            document._attribute_value_starts[self._index + 1]]
+
+    @property
+    def namespace_prefix(self):
+        '''\
+        The namespace prefix (the part before ``:``) of the attribute's name.
+        '''
+        return _helpers.get_qualified_name_components(self.name)[0]
+
+    @property
+    def local_name(self):
+        '''\
+        The local name (the part after ``:``) of the attribute's name.
+        '''
+        return _helpers.get_qualified_name_components(self.name)[1]
+
+    @property
+    def namespace_uri(self):
+        '''\
+        The namespace URI the :attr:`namespace_prefix` refers to, see
+        :attr:`ecoxipy.pyxom.NamespaceNameMixin.namespace_uri`.
+        '''
+        prefix = self.namespace_prefix
+        if prefix is None:
+            return None
+        if prefix == u'xml':
+            return _XML_NAMESPACE_URI
+        if prefix == u'xmlns':
+            return _XMLNS_NAMESPACE_URI
+        return self._element.get_namespace_uri(prefix)
+
+    def __eq__(self, other):
+        return (isinstance(other, CompactAttribute)
+            and self.name == other.name
+            and self.value == other.value)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return object.__hash__(self)
+
+    def __repr__(self):
+        return 'ecoxipy.pyxom.compact.CompactAttribute({}, {})'.format(
+            repr(self.name), repr(self.value))
+
+
+class CompactAttributes(collections.Mapping):
+    '''\
+    A read-only mapping of the :class:`CompactAttribute` instances of a
+    :class:`CompactElement` identified by their names.
+    '''
+    __slots__ = {'_element'}
+
+    def __init__(self, element):
+        self._element = element
+
+    def _range(self):
+        document = self._element._document
+        index = self._element._index
+        return range(document._attribute_starts[index],
+            document._attribute_starts[index + 1])
+
+    def __len__(self):
+        return len(self._range())
+
+    def __iter__(self):
+        document = self._element._document
+        for index in self._range():
+            yield document._names[document._attribute_names[index]]
+
+    def __getitem__(self, name):
+        name = _unicode(name)
+        document = self._element._document
+        name_id = document._name_ids.get(name, None)
+        if name_id is not None:
+            for index in self._range():
+                if document._attribute_names[index] == name_id:
+                    return CompactAttribute(self._element, index)
+        raise KeyError(name)
+
+    @property
+    def parent(self):
+        '''\
+        The parent :class:`CompactElement`.
+        '''
+        return self._element
+
+    def to_dict(self):
+        '''\
+        Creates a :class:`dict` from the attribute names and values.
+        '''
+        attributes = {}
+        element = self._element
+        for index in self._range():
+            attribute = CompactAttribute(element, index)
+            attributes[attribute.name] = attribute.value
+        return attributes
+
+    def __repr__(self):
+        return 'ecoxipy.pyxom.compact.CompactAttributes{}'.format(
+            ', '.join(repr(attribute) for attribute in self.values()))
+
+
+class CompactElement(CompactContainerNode):
+    '''\
+    A view on an element of a :class:`CompactDocument`, providing the
+    read-only accessors of :class:`ecoxipy.pyxom.Element`.
+    '''
+    __slots__ = set()
+
+    @property
+    def name(self):
+        '''\
+        The name of the element.
+        '''
+        document = self._document
+        return document._names[document._node_names[self._index]]
+
+    @property
+    def attributes(self):
+        '''\
+        A :class:`CompactAttributes` instance containing the element's
+        attributes.
+        '''
+        return CompactAttributes(self)
+
+    @property
+    def namespace_prefix(self):
+        '''\
+        The namespace prefix (the part before ``:``) of the element's name.
+        '''
+        return _helpers.get_qualified_name_components(self.name)[0]
+
+    @property
+    def local_name(self):
+        '''\
+        The local name (the part after ``:``) of the element's name.
+        '''
+        return _helpers.get_qualified_name_components(self.name)[1]
+
+    def _get_namespace(self, prefix):
+        if prefix is None:
+            declaration = u'xmlns'
+        else:
+            declaration = u'xmlns:' + prefix
+        current = self
+        while isinstance(current, CompactElement):
+            try:
+                attribute = current.attributes[declaration]
+            except KeyError:
+                current = current.parent
+            else:
+                value = attribute.value
+                return current, (value if len(value) > 0 else None)
+        return None, False
+
+    def get_namespace_prefix_element(self, prefix):
+        '''\
+        Calculates the element the namespace ``prefix`` is defined in, this
+        is :const:`None` if the prefix is not defined.
+        '''
+        return self._get_namespace(prefix)[0]
+
+    def get_namespace_uri(self, prefix):
+        '''\
+        Calculates the namespace URI for the ``prefix``, this is
+        :const:`False` if the prefix is not defined.
+        '''
+        return self._get_namespace(prefix)[1]
+
+    @property
+    def namespace_uri(self):
+        '''\
+        The namespace URI the :attr:`namespace_prefix` refers to, see
+        :attr:`ecoxipy.pyxom.NamespaceNameMixin.namespace_uri`.
+        '''
+        return self.get_namespace_uri(self.namespace_prefix)
+
+    def _create_str(self, out):
+        return out.element(self.name, self._children_strings(out),
+            self.attributes.to_dict())
+
+    def materialize(self):
+        return Element(self.name,
+            [child.materialize() for child in self],
+            self.attributes.to_dict())
+
+
+class CompactContentNode(CompactNode):
+    '''\
+    A view on a node with content.
+    '''
+    __slots__ = set()
+
+    @property
+    def content(self):
+        '''\
+        The node content.
+        '''
+        document = self._document
+        return document._content[document._content_starts[self._index]:
+            document._content_starts[self._index + 1]]
+
+
+class CompactText(CompactContentNode):
+    '''\
+    A view on a text node.
+    '''
+    __slots__ = set()
+
+    def _create_str(self, out):
+        return out.text(self.content)
+
+    def materialize(self):
+        return Text(self.content)
+
+
+class CompactComment(CompactContentNode):
+    '''\
+    A view on a comment.
+    '''
+    __slots__ = set()
+
+    def _create_str(self, out):
+        return out.comment(self.content)
+
+    def materialize(self):
+        return Comment(self.content)
+
+
+class CompactProcessingInstruction(CompactContentNode):
+    '''\
+    A view on a processing instruction.
+    '''
+    __slots__ = set()
+
+    @property
+    def target(self):
+        '''\
+        The processing instruction target.
+        '''
+        document = self._document
+        return document._names[document._node_names[self._index]]
+
+    @property
+    def content(self):
+        '''\
+        The processing instruction content or :const:`None`.
+        '''
+        if (self._document._kinds[self._index]
+                == _PROCESSING_INSTRUCTION_WITHOUT_CONTENT):
+            return None
+        return CompactContentNode.content.fget(self)
+
+    def _create_str(self, out):
+        return out.processing_instruction(self.target, self.content)
+
+    def materialize(self):
+        return ProcessingInstruction(self.target, self.content)
+
+
+_NODE_CLASSES = {
+    _ELEMENT: CompactElement,
+    _TEXT: CompactText,
+    _COMMENT: CompactComment,
+    _PROCESSING_INSTRUCTION: CompactProcessingInstruction,
+    _PROCESSING_INSTRUCTION_WITHOUT_CONTENT: CompactProcessingInstruction,
+}
+
+
+class CompactDocument(CompactContainerNode):
+    '''\
+    A read-only document storing its nodes in typed arrays. Use
+    :meth:`parse` or :meth:`from_node` to create instances.
+
+    Besides the content strings a node uses about 40 bytes and an attribute
+    about 12 bytes, names are stored only once.
+    '''
+    __slots__ = {'_names', '_name_ids', '_kinds', '_node_names', '_parents',
+        '_positions', '_ends', '_child_starts', '_child_counts',
+        '_child_list', '_content_starts', '_content', '_attribute_starts',
+        '_attribute_names', '_attribute_value_starts', '_attribute_values',
+        '_doctype', '_omit_xml_declaration', '_encoding'}
+
+    def __init__(self, builder, doctype_name, doctype_publicid,
+            doctype_systemid, omit_xml_declaration, encoding):
+        CompactContainerNode.__init__(self, self, 0)
+        self._names = builder.names
+        self._name_ids = builder.name_ids
+        self._kinds = builder.kinds
+        self._node_names = builder.node_names
+        self._parents = builder.parents
+        self._positions = builder.positions
+        self._ends = builder.ends
+        self._child_starts = builder.child_starts
+        self._child_counts = builder.child_counts
+        self._child_list = builder.child_list
+        self._content_starts = builder.content_starts
+        self._content = u''.join(builder.contents)
+        self._attribute_starts = builder.attribute_starts
+        self._attribute_names = builder.attribute_names
+        self._attribute_value_starts = builder.attribute_value_starts
+        self._attribute_values = u''.join(builder.attribute_values)
+        self._doctype = DocumentType(doctype_name, doctype_publicid,
+            doctype_systemid, False)
+        self._omit_xml_declaration = omit_xml_declaration
+        if encoding is None:
+            encoding = u'UTF-8'
+        self._encoding = encoding
+
+    @staticmethod
+    def parse(source, parser=None):
+        '''\
+        Parses XML into a :class:`CompactDocument`, without creating
+        intermediate node objects.
+
+        :param source: The XML source to parse. If this a byte string it will
+            be wrapped into an :class:`io.BytesIO` instance. Then it is given
+            to the ``parser``'s :meth:`xml.sax.xmlreader.XMLReader.parse`
+            method.
+        :param parser: The parser to use. If it is :const:`None`
+            :func:`xml.sax.make_parser` is used to create one.
+        :raises: :class:`xml.sax.SAXException` if the XML is not well-formed.
+        :returns: The created document.
+        :rtype: :class:`CompactDocument`
+        '''
+        handler = _CompactHandler()
+        if parser is None:
+            parser = make_parser()
+        parser.setContentHandler(handler)
+        parser.setDTDHandler(handler)
+        try:
+            parser.setProperty(property_lexical_handler, handler)
+        except (SAXNotRecognizedException, SAXNotSupportedException):
+            pass
+        if isinstance(source, bytes):
+            byte_stream = BytesIO(source)
+            try:
+                parser.parse(byte_stream)
+            finally:
+                byte_stream.close()
+        else:
+            parser.parse(source)
+        return handler.document
+
+    @staticmethod
+    def from_node(node):
+        '''\
+        Creates a :class:`CompactDocument` from a PyXOM structure.
+
+        :param node: If this is a :class:`ecoxipy.pyxom.Document` its
+            children and document data are used, otherwise the node becomes
+            the only child of the created document.
+        :type node: :class:`ecoxipy.pyxom.XMLNode`
+        :returns: The created document.
+        :rtype: :class:`CompactDocument`
+        '''
+        builder = _CompactBuilder()
+        if isinstance(node, Document):
+            nodes = list(reversed(node))
+        else:
+            nodes = [node]
+        while nodes:
+            current = nodes.pop()
+            if current is None:
+                builder.end_element()
+            elif isinstance(current, Element):
+                builder.start_element(current.name,
+                    list(current._attribute_values().items()))
+                nodes.append(None)
+                nodes.extend(reversed(current))
+            elif isinstance(current, Text):
+                builder.text(current.content, False)
+            elif isinstance(current, Comment):
+                builder.comment(current.content)
+            else:
+                builder.processing_instruction(current.target,
+                    current.content)
+        if isinstance(node, Document):
+            return builder.create_document(node.doctype.name,
+                node.doctype.publicid, node.doctype.systemid,
+                node.omit_xml_declaration, node.encoding)
+        return builder.create_document(None, None, None, True, None)
+
+    def _node(self, index):
+        if index == 0:
+            return self
+        return _NODE_CLASSES[self._kinds[index]](self, index)
+
+    @property
+    def doctype(self):
+        '''\
+        The :class:`ecoxipy.pyxom.DocumentType` instance of the document.
+        '''
+        return self._doctype
+
+    @property
+    def omit_xml_declaration(self):
+        '''\
+        If :const:`True` the XML declaration is omitted.
+        '''
+        return self._omit_xml_declaration
+
+    @property
+    def encoding(self):
+        '''\
+        The encoding of the document.
+        '''
+        return self._encoding
+
+    @property
+    def node_count(self):
+        '''\
+        The number of nodes in the document, including the document node.
+        '''
+        return len(self._kinds)
+
+    def __bytes__(self):
+        return self.create_str(encoding=self._encoding)
+
+    if _python2:
+        __str__ = __bytes__
+        del __bytes__
+
+    def __sizeof__(self):
+        size = object.__sizeof__(self)
+        for value in (self._names, self._kinds, self._node_names,
+                self._parents, self._positions, self._ends,
+                self._child_starts, self._child_counts, self._child_list,
+                self._content_starts, self._content, self._attribute_starts,
+                self._attribute_names, self._attribute_value_starts,
+                self._attribute_values):
+            size += value.__sizeof__()
+        size += self._name_ids.__sizeof__()
+        for name in self._names:
+            size += name.__sizeof__()
+        return size
+
+    def _create_str(self, out):
+        return out.document(self._doctype.name, self._doctype.publicid,
+            self._doctype.systemid, self._children_strings(out),
+            self._omit_xml_declaration, self._encoding)
+
+    def materialize(self):
+        return Document(self._doctype.name, self._doctype.publicid,
+            self._doctype.systemid, [child.materialize() for child in self],
+            self._omit_xml_declaration, self._encoding)
+
+    def __repr__(self):
+        return 'ecoxipy.pyxom.compact.CompactDocument[{}]'.format(
+            repr(self._doctype))
+
+
+del collections, ContentHandler, DTDHandler, LexicalHandler, DeclarationHandler
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+u'''\
+:mod:`ecoxipy.pyxom.events` - Pulling Events from PyXOM Structures
+==================================================================
+
+:meth:`ecoxipy.pyxom.XMLNode.create_sax_events` pushes events into a
+:class:`xml.sax.ContentHandler` until the whole structure is processed. This
+module provides a pull API instead: :func:`iterate` returns a lazy iterator
+over ``(event, data)`` tuples in document order, so consumers can process
+events at their own pace. :func:`replay_sax` feeds such events into a
+:class:`xml.sax.ContentHandler` and :func:`replay` creates a representation
+with an :class:`ecoxipy.Output` instance.
+
+The events and their data are:
+
+===============================  ================================================
+Event                            Data
+===============================  ================================================
+:const:`START_DOCUMENT`          a tuple of the document type name, public ID and
+                                 system ID, if the XML declaration is omitted and
+                                 the encoding
+:const:`END_DOCUMENT`            :const:`None`
+:const:`START_ELEMENT`           a tuple of the name and a :func:`dict` of the
+                                 attributes
+:const:`END_ELEMENT`             the name
+:const:`CHARACTERS`              the text
+:const:`COMMENT`                 the content
+:const:`PROCESSING_INSTRUCTION`  a tuple of the target and content
+===============================  ================================================
+
+The values of the event constants are the names of the corresponding
+:class:`xml.sax.ContentHandler` methods.
+
+
+.. _ecoxipy.pyxom.events.examples:
+
+Examples
+--------
+
+>>> from ecoxipy import MarkupBuilder
+>>> b = MarkupBuilder()
+>>> document = b[:'article':True](
+...     b.article(
+...         b.h1('Example', data='<&>'),
+...         b.p('Hello', b.em(' World', count=1), '!'),
+...         b | 'A comment',
+...         b['pi-target':'PI content'],
+...         {'xmlns': 'http://www.w3.org/1999/xhtml/'}
+...     )
+... )
+>>> events = iterate(document)
+>>> next(events) == (START_DOCUMENT, (u'article', None, None, True, u'UTF-8'))
+True
+>>> next(events) == (START_ELEMENT,
+...     (u'article', {u'xmlns': u'http://www.w3.org/1999/xhtml/'}))
+True
+>>> for event, data in events:
+...     if event == CHARACTERS:
+...         print(data)
+Example
+Hello
+ World
+!
+
+
+The iterator is lazy, so events of independent structures can be
+interleaved:
+
+>>> first = iterate(b.p('First'))
+>>> second = iterate(b.p('Second'))
+>>> for pair in zip(first, second):
+...     print(' '.join(data if event == CHARACTERS else event
+...         for event, data in pair))
+startElement startElement
+First Second
+endElement endElement
+
+
+Pretty printing is supported too, the indentation becomes part of the
+:const:`CHARACTERS` events:
+
+>>> for event, data in iterate(b.p('Hello', b.em('World')), '  '):
+...     print(repr(str(data)) if event == CHARACTERS else event)
+startElement
+'\\n  Hello'
+'\\n  '
+startElement
+'\\n    World'
+'\\n  '
+endElement
+'\\n'
+endElement
+'\\n'
+
+
+:func:`replay_sax` feeds the events into a :class:`xml.sax.ContentHandler`,
+which creates the same output as
+:meth:`ecoxipy.pyxom.XMLNode.create_sax_events`:
+
+>>> from io import BytesIO
+>>> stream = BytesIO()
+>>> handler = replay_sax(iterate(document), out=stream)
+>>> expected = BytesIO()
+>>> handler = document.create_sax_events(out=expected)
+>>> stream.getvalue() == expected.getvalue()
+True
+
+
+:func:`replay` creates a representation of the events using any
+:class:`ecoxipy.Output` implementation, by default
+:class:`ecoxipy.pyxom.output.PyXOMOutput`:
+
+>>> copy = replay(iterate(document))
+>>> copy == document and copy is not document
+True
+>>> from ecoxipy.string_output import StringOutput
+>>> print(replay(iterate(document[0][1]), StringOutput()))
+<p>Hello<em count="1"> World</em>!</p>
+
+
+Functions
+---------
+
+.. autofunction:: iterate
+.. autofunction:: replay_sax
+.. autofunction:: replay
+
+
+Events
+------
+
+.. autodata:: START_DOCUMENT
+.. autodata:: END_DOCUMENT
+.. autodata:: START_ELEMENT
+.. autodata:: END_ELEMENT
+.. autodata:: CHARACTERS
+.. autodata:: COMMENT
+.. autodata:: PROCESSING_INSTRUCTION
+'''
+
+from xml.sax.xmlreader import AttributesImpl
+from xml.sax.saxutils import XMLGenerator
+
+from ecoxipy import _unicode
+
+from ._common import _LEAF_EVENT, _START_EVENT, _END_EVENT
+from ._document import Document
+from ._element import Element
+from ._content_nodes import Text, Comment, ProcessingInstruction
+
+
+START_DOCUMENT = 'startDocument'
+'''The start of a document.'''
+
+END_DOCUMENT = 'endDocument'
+'''The end of a document.'''
+
+START_ELEMENT = 'startElement'
+'''The start of an element.'''
+
+END_ELEMENT = 'endElement'
+'''The end of an element.'''
+
+CHARACTERS = 'characters'
+'''Text, including whitespace created by pretty printing.'''
+
+COMMENT = 'comment'
+'''A comment.'''
+
+PROCESSING_INSTRUCTION = 'processingInstruction'
+'''A processing instruction.'''
+
+
+def iterate(node, indent_incr=None):
+    '''\
+    Creates a lazy iterator over the events of a PyXOM structure in document
+    order. The structure must not be modified while iterating.
+
+    :param node: The node to create events for, it may be of any PyXOM node
+        type.
+    :type node: :class:`ecoxipy.pyxom.XMLNode`
+    :param indent_incr: If this is not :const:`None` this activates
+        pretty printing. In this case it should be a string and it is used
+        for indenting.
+    :type indent_incr: :func:`str`
+    :returns: An iterator over ``(event, data)`` tuples.
+    '''
+    if indent_incr is not None:
+        indent_incr = _unicode(indent_incr)
+    for current, event, whitespace in node._iter_events(indent_incr):
+        if event == _LEAF_EVENT:
+            if isinstance(current, Text):
+                yield CHARACTERS, whitespace + current.content
+                continue
+            if whitespace:
+                yield CHARACTERS, whitespace
+            if isinstance(current, Comment):
+                yield COMMENT, current.content
+            elif isinstance(current, ProcessingInstruction):
+                yield PROCESSING_INSTRUCTION, (current.target,
+                    current.content)
+            else:
+                raise TypeError('Unknown node type: {}'.format(current))
+        elif event == _START_EVENT:
+            if whitespace:
+                yield CHARACTERS, whitespace
+            if isinstance(current, Element):
+                yield START_ELEMENT, (current.name,
+                    dict(current._attribute_values()))
+            elif isinstance(current, Document):
+                doctype = current.doctype
+                yield START_DOCUMENT, (doctype.name, doctype.publicid,
+                    doctype.systemid, current.omit_xml_declaration,
+                    current.encoding)
+            else:
+                raise TypeError('Unknown node type: {}'.format(current))
+        elif event == _END_EVENT:
+            if whitespace:
+                yield CHARACTERS, whitespace
+            if isinstance(current, Element):
+                yield END_ELEMENT, current.name
+            else:
+                yield END_DOCUMENT, None
+        else:
+            yield CHARACTERS, whitespace
+
+
+def replay_sax(events, content_handler=None, out=None, out_encoding='UTF-8'):
+    '''\
+    Feeds events into a SAX content handler. :const:`COMMENT` events are
+    only replayed if the content handler has a method :meth:`comment`.
+
+    :param events: An iterable of ``(event, data)`` tuples, like the
+        iterators returned by :func:`iterate`.
+    :param content_handler: If this is :const:`None` a
+        :class:`xml.sax.saxutils.XMLGenerator` is created and used as the
+        content handler. If in this case ``out`` is not :const:`None`,
+        it is used for output.
+    :type content_handler: :class:`xml.sax.ContentHandler`
+    :param out: The output to write to if no ``content_handler`` is given.
+        It should have a :meth:`write` method like files.
+    :param out_encoding: The output encoding or :const:`None` for
+        Unicode output.
+    :returns: The content handler used.
+    '''
+    if content_handler is None:
+        content_handler = XMLGenerator(out, out_encoding)
+    characters = content_handler.characters
+    comment = getattr(content_handler, 'comment', None)
+    for event, data in events:
+        if event == CHARACTERS:
+            characters(data)
+        elif event == START_ELEMENT:
+            name, attributes = data
+            content_handler.startElement(name, AttributesImpl(attributes))
+        elif event == END_ELEMENT:
+            content_handler.endElement(data)
+        elif event == COMMENT:
+            if comment is not None:
+                comment(data)
+        elif event == PROCESSING_INSTRUCTION:
+            target, content = data
+            content_handler.processingInstruction(target,
+                u'' if content is None else content)
+        elif event == START_DOCUMENT:
+            content_handler.startDocument()
+            try:
+                notationDecl = content_handler.notationDecl
+            except AttributeError:
+                pass
+            else:
+                notationDecl(*data[:3])
+        elif event == END_DOCUMENT:
+            content_handler.endDocument()
+        else:
+            raise ValueError('Unknown event: {}'.format(event))
+    return content_handler
+
+
+def replay(events, output=None):
+    '''\
+    Creates a representation of events using an :class:`ecoxipy.Output`
+    instance.
+
+    :param events: An iterable of ``(event, data)`` tuples, like the
+        iterators returned by :func:`iterate`.
+    :param output: The output to use. If it is :const:`None` an
+        :class:`ecoxipy.pyxom.output.PyXOMOutput` instance is used.
+    :type output: :class:`ecoxipy.Output`
+    :returns: The representation of the root node. If the events contain
+        multiple root nodes, a :func:`list` of their representations is
+        returned.
+    :raises ValueError: If the events are not properly nested.
+    '''
+    if output is None:
+        from ecoxipy.pyxom.output import PyXOMOutput
+        output = PyXOMOutput()
+    children = []
+    stack = []
+    for event, data in events:
+        if event == CHARACTERS:
+            children.append(output.text(data))
+        elif event == START_ELEMENT or event == START_DOCUMENT:
+            stack.append((event, data, children))
+            children = []
+        elif event == END_ELEMENT or event == END_DOCUMENT:
+            if not stack or stack[-1][0] != (START_ELEMENT
+                    if event == END_ELEMENT else START_DOCUMENT):
+                raise ValueError('Unexpected event: {}'.format(event))
+            start_event, start_data, parent_children = stack.pop()
+            if event == END_ELEMENT:
+                name, attributes = start_data
+                node = output.element(name, children, attributes)
+            else:
+                (doctype_name, doctype_publicid, doctype_systemid,
+                    omit_xml_declaration, encoding) = start_data
+                node = output.document(doctype_name, doctype_publicid,
+                    doctype_systemid, children, omit_xml_declaration,
+                    encoding)
+            children = parent_children
+            children.append(node)
+        elif event == COMMENT:
+            children.append(output.comment(data))
+        elif event == PROCESSING_INSTRUCTION:
+            target, content = data
+            children.append(output.processing_instruction(target, content))
+        else:
+            raise ValueError('Unknown event: {}'.format(event))
+    if stack:
+        raise ValueError('Missing end event: {}'.format(
+            END_ELEMENT if stack[-1][0] == START_ELEMENT else END_DOCUMENT))
+    if len(children) == 1:
+        return children[0]
+    return children
@@ -7,35 +7,53 @@ The abstract base class :class:`Indexer` establishes an interface for indexing
 PyXOM structures.
 
 
-Two mapping implementations are provided to serve as indexes:
+Three mapping implementations are provided to serve as indexes:
 
 *   :class:`UniqueValueIndex` allows only one value per key.
 
 *   :class:`MultiValueIndex` holds a :class:`set` of values per key.
 
+*   :class:`SortedValueIndex` holds values in the order of their (optionally
+    converted) keys and supports range, prefix and ordered queries.
+
 
 For easier implementation of indexers there are some abstract base classes:
 
 *   :meth:`Indexer.new_index` and :meth:`Indexer.register` are implemented by
-    :class:`UniqueValueIndexer` and :class:`MultiValueIndexer`, which use
-    :class:`UniqueValueIndex` or :class:`MultiValueIndex` respectively.
+    :class:`UniqueValueIndexer`, :class:`MultiValueIndexer` and
+    :class:`SortedValueIndexer`, which use :class:`UniqueValueIndex`,
+    :class:`MultiValueIndex` or :class:`SortedValueIndex` respectively.
 
 *   :class:`AttributeValueIndexer` in contrast implements
     :meth:`Indexer.node_predicate` and :meth:`Indexer.extract_items` to index
     attributes by their value.
 
 
-Two ready-to-use indexer implementations are provided:
+Ready-to-use indexer implementations are provided:
 
 *   :class:`ElementByUniqueAttributeValueIndexer` indexes
     :class:`ecoxipy.pyxom.Element` instances under the value of a specific
     attribute they have, e.g. ``xml:id`` or ``id``.
 
+*   :class:`ElementsBySortedAttributeValueIndexer` indexes
+    :class:`ecoxipy.pyxom.Element` instances sorted by the value of a
+    specific attribute.
+
 *   To index :class:`ecoxipy.pyxom.Element` instances by their name use
     :class:`ElementsByNameIndexer`.
 
+*   :class:`PathIndexer` creates a :class:`PathIndex` of
+    :class:`ecoxipy.pyxom.Element` instances by the names of their ancestors
+    and themselves.
+
+*   :class:`TextIndexer` creates a full-text :class:`TextIndex` of the
+    :class:`ecoxipy.pyxom.Text` nodes.
 
-The :class:`IndexDescriptor` makes index access and deletion more convenient.
+
+To build multiple indexes in a single traversal use :class:`MultiIndexer`.
+
+The :class:`IndexDescriptor` makes index access and deletion more convenient,
+the indexes are held by an :class:`IndexCache` owned by the indexed object.
 
 
 .. _ecoxipy.pyxom.indexing.examples:
@@ -93,6 +111,104 @@ True
 >>> u'unknown' in index
 False
 
+To query elements by ranges of attribute values use
+:class:`ElementsBySortedAttributeValueIndexer`, here with numeric keys:
+
+>>> shop = b.shop(
+...     b.item(price='20', name='Foo'),
+...     b.item(price='9.5', name='Bar'),
+...     b.item(price='12', name='Baz'),
+...     b.item(price='unknown', name='Bla'),
+...     b.offer(price='15'),
+... )
+>>> indexer = ElementsBySortedAttributeValueIndexer(u'price', float, u'item')
+>>> index = indexer(shop)
+>>> index.rejected_count
+1
+>>> [item.attributes['name'].value for item in index.range(10, 20)] == [u'Baz']
+True
+>>> [item.attributes['name'].value for item in index.range(10, 20,
+...     include_stop=True)] == [u'Baz', u'Foo']
+True
+>>> [item.attributes['name'].value for item in index.range(stop=15,
+...     reverse=True)] == [u'Baz', u'Bar']
+True
+>>> list(index) == [9.5, 12.0, 20.0]
+True
+>>> list(index['20'])[0] is shop[0]
+True
+
+With Unicode keys prefix queries are possible:
+
+>>> index = ElementsBySortedAttributeValueIndexer(u'name')(shop)
+>>> [item.attributes['name'].value for item in index.prefix('Ba')] == [
+...     u'Bar', u'Baz']
+True
+>>> [key for key, item in index.ordered_items()] == [
+...     u'Bar', u'Baz', u'Bla', u'Foo']
+True
+
+:class:`PathIndexer` creates an index of the element paths, which can be
+queried for exact paths or path suffixes:
+
+>>> feed = b.feed(
+...     b.title('Example'),
+...     b.entry(b.title('Foo'), b.link(href='foo')),
+...     b.entry(b.title('Bar'), b.link(href='bar')),
+... )
+>>> index = PathIndexer()(feed)
+>>> list(index['/feed/entry/link']) == [feed[1][1], feed[2][1]]
+True
+>>> list(index['//title']) == [feed[0], feed[1][0], feed[2][0]]
+True
+
+Suffix paths matching multiple paths yield the elements in document order:
+
+>>> root = b.r(b.x(b.y('1')), b.z(b.y('2')), b.x(b.y('3')))
+>>> list(PathIndexer()(root)['//y']) == [root[0][0], root[1][0], root[2][0]]
+True
+>>> '//entry/title' in index and '/entry/title' not in index
+True
+>>> print(index.path(feed[2][1]))
+/feed/entry/link
+>>> sorted(index) == [u'/feed', u'/feed/entry', u'/feed/entry/link',
+...     u'/feed/entry/title', u'/feed/title']
+True
+
+:class:`TextIndexer` creates an inverted index of the words in text nodes,
+retrieving the nodes containing them:
+
+>>> article = b.article(
+...     b.h1('The quick brown fox'),
+...     b.p('The lazy dog sleeps, ', b.em('the fox'), ' is quick.'),
+...     b.p('A quick ', 'brown dog.'),
+... )
+>>> index = TextIndexer()(article)
+>>> set(index['Quick']) == {article[0], article[1], article[2]}
+True
+>>> set(index.all('quick', 'brown')) == {article[0], article[2]}
+True
+>>> set(index.any('fox', 'lazy')) == {article[0], article[1], article[1][1]}
+True
+>>> set(index.phrase('quick brown')) == {article[0], article[2]}
+True
+>>> set(index.phrase('dog sleeps')) == {article[1]}
+True
+>>> list(index.phrase('fox is'))
+[]
+>>> 'cat' in index
+False
+
+:class:`MultiIndexer` creates the indexes of multiple indexers while
+traversing the tree only once:
+
+>>> multi_indexer = MultiIndexer(ElementByUniqueAttributeValueIndexer(),
+...     ElementsByNameIndexer())
+>>> by_id, by_name = multi_indexer(test)
+>>> by_id[u'c'] is test[-1]
+True
+>>> set(by_name[u'foo']) == {test[0], test[1]}
+True
 
 
 .. _ecoxipy.pyxom.indexing.abc:
@@ -107,6 +223,8 @@ Abstract Base Classes
 
 .. autoclass:: MultiValueIndexer
 
+.. autoclass:: SortedValueIndexer
+
 .. autoclass:: AttributeValueIndexer
 
 
@@ -118,27 +236,50 @@ Indexing-related Classes
 
 .. autoclass:: ElementByUniqueAttributeValueIndexer
 
+.. autoclass:: ElementsBySortedAttributeValueIndexer
+
 .. autoclass:: ElementsByNameIndexer
 
 .. autoclass:: UniqueValueIndex
 
 .. autoclass:: MultiValueIndex
 
+.. autoclass:: SortedValueIndex
+
+.. autoclass:: PathIndexer
+
+.. autoclass:: PathIndex
+
+.. autoclass:: TextIndexer
+
+.. autoclass:: TextIndex
+
 .. autoclass:: NamespaceIndex
 
 .. autoclass:: NamespaceIndexer
     :special-members: __call__
 
+.. autoclass:: MultiIndexer
+    :special-members: __call__
+
 .. autoclass:: IndexDescriptor
+
+.. autoclass:: IndexCache
+
+.. autoclass:: IndexStatistics
 '''
 
 import abc
 import collections
+import heapq as _heapq
+import sys as _sys
+import threading as _threading
+from bisect import bisect_left as _bisect_left, bisect_right as _bisect_right
 from collections import Iterator as _Iterator
 
 from tinkerpy import metaclass
 
-from ecoxipy import _unicode
+from ecoxipy import _unicode, _helpers
 
 
 @metaclass(abc.ABCMeta)
@@ -171,20 +312,20 @@ class Indexer(object):
         3.  The index data structure ist returned.
         '''
         index = self.new_index()
-        def register(node):
-            items = self.extract_items(node)
-            if isinstance(items, _Iterator):
-                for key, node in items:
-                    self.register(index, key, node)
-            else:
-                key, node = items
-                self.register(index, key, node)
-        if self.node_predicate(root_node):
-            register(root_node)
-        for node in filter(self.node_predicate, root_node.descendants()):
-            register(node)
+        for node in _self_and_descendants(root_node):
+            if self.node_predicate(node):
+                self._register_items(index, node)
         return index
 
+    def _register_items(self, index, node):
+        items = self.extract_items(node)
+        if isinstance(items, _Iterator):
+            for key, value in items:
+                self.register(index, key, value)
+        else:
+            key, value = items
+            self.register(index, key, value)
+
     @abc.abstractmethod
     def new_index(self):
         '''\
@@ -228,6 +369,56 @@ class Indexer(object):
         pass
 
 
+def _self_and_descendants(root_node):
+    yield root_node
+    try:
+        descendants = root_node.descendants
+    except AttributeError:
+        return
+    for node in descendants():
+        yield node
+
+
+class MultiIndexer(object):
+    '''\
+    Runs multiple :class:`Indexer` instances in one traversal of a
+    :class:`ecoxipy.pyxom.XMLNode` tree. Each node is given to those indexers
+    whose :meth:`Indexer.node_predicate` returns :const:`True` for it.
+
+    :param indexers: the indexers to run, they become :attr:`indexers`
+    '''
+    def __init__(self, *indexers):
+        self._indexers = indexers
+
+    @property
+    def indexers(self):
+        '''\
+        A :func:`tuple` of the :class:`Indexer` instances to run.
+        '''
+        return self._indexers
+
+    def __call__(self, root_node):
+        '''\
+        Indexes a :class:`ecoxipy.pyxom.XMLNode` tree with all
+        :attr:`indexers`.
+
+        :param root_node: the node to start indexing on
+        :type root_node: :class:`ecoxipy.pyxom.ContainerNode`
+        :returns: a :func:`list` containing the index data structures in the
+            order of :attr:`indexers`
+        '''
+        indexes = [indexer.new_index() for indexer in self._indexers]
+        runs = [
+            (indexer.node_predicate, indexer._register_items, index)
+            for indexer, index in zip(self._indexers, indexes)
+        ]
+        for node in _self_and_descendants(root_node):
+            for node_predicate, register_items, index in runs:
+                if node_predicate(node):
+                    register_items(index, node)
+        return indexes
+
+
 class UniqueValueIndex(collections.Mapping):
     '''\
     A read-only-semantics mapping enforcing only one value is registered under
@@ -265,6 +456,16 @@ class UniqueValueIndex(collections.Mapping):
     def __iter__(self):
         return iter(self._index)
 
+    @property
+    def entry_count(self):
+        '''\
+        The number of registered values.
+        '''
+        return len(self._index)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + _dict_sizeof(self._index)
+
     def __repr__(self):
         return u'{}.{}{}'.format(self.__class__.__module__,
             self.__class__.__name__, repr(self._index))
@@ -285,6 +486,18 @@ class _MultiDict(dict):
     def __call__(self, key):
         return dict.__getitem__(self, key)
 
+    def value_count(self):
+        return sum(len(values) for values in dict.values(self))
+
+
+def _dict_sizeof(mapping):
+    size = _sys.getsizeof(mapping)
+    for key, value in dict.items(mapping):
+        size += _sys.getsizeof(key)
+        if value.__class__ is set:
+            size += _sys.getsizeof(value)
+    return size
+
 
 class MultiValueIndex(UniqueValueIndex):
     '''\
@@ -307,6 +520,241 @@ class MultiValueIndex(UniqueValueIndex):
         key = _unicode(key)
         self._index[key] = value
 
+    @property
+    def entry_count(self):
+        '''\
+        The number of registered values.
+        '''
+        return self._index.value_count()
+
+
+class SortedValueIndex(collections.Mapping):
+    '''\
+    A read-only-semantics mapping holding values in the order of their keys,
+    which allows for range, prefix and ordered queries. Multiple values may
+    be registered under the same key. Value access returns an iterator over
+    the values registered under the key.
+
+    >>> index = SortedValueIndex(float)
+    >>> for number, key in enumerate(['3', 'nan', '1', '2', '0', '5']):
+    ...     index.register(key, number)
+    >>> index.rejected_count
+    1
+    >>> list(index)
+    [0.0, 1.0, 2.0, 3.0, 5.0]
+    >>> list(index.range(1, 3))
+    [2, 3]
+
+    The keys are converted by calling ``key_type`` with the key as the
+    argument. Values are not registered if this raises a :class:`ValueError`
+    or :class:`TypeError` or if the converted key is not equal to itself
+    (like a float NaN, which cannot be ordered), they are counted as
+    :attr:`rejected_count`. Keys given to the query methods are converted
+    the same way.
+
+    The index is sorted on the first query after values have been
+    registered out of order, so creating it takes ``O(n log n)`` time and
+    queries take ``O(log n + m)`` time, with ``m`` being the number of values
+    retrieved.
+
+    :param key_type: A callable converting keys, e.g. :class:`float` to
+        index numeric values. If this is :const:`None` keys are converted to
+        Unicode strings.
+    '''
+    def __init__(self, key_type=None):
+        self._key_type = _unicode if key_type is None else key_type
+        self._keys = []
+        self._values = []
+        self._sorted = True
+        self._sort_lock = _threading.Lock()
+        self._distinct_count = 0
+        self._rejected_count = 0
+
+    @property
+    def key_type(self):
+        '''\
+        The callable converting keys.
+        '''
+        return self._key_type
+
+    @property
+    def rejected_count(self):
+        '''\
+        The number of values which were not registered, because their keys
+        could not be converted or cannot be ordered.
+        '''
+        return self._rejected_count
+
+    def register(self, key, value):
+        '''\
+        Add ``value`` under ``key``.
+
+        :param key: the identifier, it is converted using :attr:`key_type`
+        :param value: the entry's value
+        '''
+        try:
+            key = self._key_type(key)
+        except (ValueError, TypeError):
+            self._rejected_count += 1
+            return
+        if key != key:
+            # Keys not equal to themselves (NaN) cannot be ordered.
+            self._rejected_count += 1
+            return
+        keys = self._keys
+        if self._sorted and len(keys) > 0 and key < keys[-1]:
+            self._sorted = False
+        keys.append(key)
+        self._values.append(value)
+        self._distinct_count = None
+
+    def _sort(self):
+        # The index is marked sorted after keys and values are replaced, so
+        # concurrent queries either sort or see both sorted.
+        if not self._sorted:
+            with self._sort_lock:
+                if not self._sorted:
+                    keys = self._keys
+                    order = sorted(range(len(keys)), key=keys.__getitem__)
+                    self._keys = [keys[i] for i in order]
+                    values = self._values
+                    self._values = [values[i] for i in order]
+                    self._sorted = True
+        return self._keys
+
+    def _convert_key(self, key):
+        try:
+            return self._key_type(key)
+        except (ValueError, TypeError):
+            raise KeyError(key)
+
+    def _bounds(self, start, stop, include_start, include_stop):
+        keys = self._sort()
+        if start is None:
+            low = 0
+        else:
+            start = self._key_type(start)
+            if include_start:
+                low = _bisect_left(keys, start)
+            else:
+                low = _bisect_right(keys, start)
+        if stop is None:
+            high = len(keys)
+        else:
+            stop = self._key_type(stop)
+            if include_stop:
+                high = _bisect_right(keys, stop)
+            else:
+                high = _bisect_left(keys, stop)
+        return low, high
+
+    def _slice_values(self, low, high, reverse):
+        values = self._values
+        if reverse:
+            return (values[i] for i in range(high - 1, low - 1, -1))
+        return (values[i] for i in range(low, high))
+
+    def __getitem__(self, key):
+        key = self._convert_key(key)
+        keys = self._sort()
+        low = _bisect_left(keys, key)
+        high = _bisect_right(keys, key, low)
+        if low == high:
+            raise KeyError(key)
+        return self._slice_values(low, high, False)
+
+    def __contains__(self, key):
+        try:
+            key = self._key_type(key)
+        except (ValueError, TypeError):
+            return False
+        keys = self._sort()
+        position = _bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def __len__(self):
+        if self._distinct_count is None:
+            self._distinct_count = sum(1 for key in self)
+        return self._distinct_count
+
+    def __iter__(self):
+        keys = self._sort()
+        previous = None
+        for i, key in enumerate(keys):
+            if i == 0 or key != previous:
+                yield key
+            previous = key
+
+    def range(self, start=None, stop=None, include_start=True,
+            include_stop=False, reverse=False):
+        '''\
+        Retrieves the values whose keys are in a range.
+
+        :param start: The lower bound or :const:`None` for no lower bound.
+        :param stop: The upper bound or :const:`None` for no upper bound.
+        :param include_start: If :const:`True` values with a key equal to
+            ``start`` are included.
+        :type include_start: :func:`bool`
+        :param include_stop: If :const:`True` values with a key equal to
+            ``stop`` are included.
+        :type include_stop: :func:`bool`
+        :param reverse: If :const:`True` the values are returned in
+            descending key order.
+        :type reverse: :func:`bool`
+        :returns: an iterator over the values in the order of their keys
+        '''
+        low, high = self._bounds(start, stop, include_start, include_stop)
+        return self._slice_values(low, high, reverse)
+
+    def prefix(self, prefix):
+        '''\
+        Retrieves the values whose keys start with ``prefix``. This is only
+        applicable if the keys are strings.
+
+        :param prefix: the prefix of the keys
+        :returns: an iterator over the values in the order of their keys
+        '''
+        prefix = self._key_type(prefix)
+        keys = self._sort()
+        low = _bisect_left(keys, prefix)
+        high = low
+        while high < len(keys) and keys[high].startswith(prefix):
+            high += 1
+        return self._slice_values(low, high, False)
+
+    def ordered_items(self, reverse=False):
+        '''\
+        Retrieves all index items in the order of their keys.
+
+        :param reverse: If :const:`True` the items are returned in
+            descending key order.
+        :type reverse: :func:`bool`
+        :returns: an iterator over 2-:func:`tuple` instances containing the
+            key as first and the value as second item
+        '''
+        keys = self._sort()
+        values = self._values
+        indexes = range(len(keys))
+        if reverse:
+            indexes = reversed(indexes)
+        return ((keys[i], values[i]) for i in indexes)
+
+    @property
+    def entry_count(self):
+        '''\
+        The number of registered values.
+        '''
+        return len(self._keys)
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + _sys.getsizeof(self._keys)
+            + _sys.getsizeof(self._values)
+            + sum(_sys.getsizeof(key) for key in self._keys))
+
+    def __repr__(self):
+        return u'{}.{}({})'.format(self.__class__.__module__,
+            self.__class__.__name__, repr(list(self.ordered_items())))
+
 
 class UniqueValueIndexer(Indexer):
     '''\
@@ -339,6 +787,32 @@ class MultiValueIndexer(UniqueValueIndexer):
         return MultiValueIndex()
 
 
+class SortedValueIndexer(UniqueValueIndexer):
+    '''\
+    An abstract :class:`Indexer` base class which uses
+    :class:`SortedValueIndex` as the index.
+
+    :param key_type: defines :attr:`key_type`
+    '''
+    def __init__(self, key_type=None):
+        self._key_type = key_type
+
+    @property
+    def key_type(self):
+        '''\
+        The key conversion callable given to the created indexes or
+        :const:`None` to use Unicode strings as keys.
+        '''
+        return self._key_type
+
+    def new_index(self):
+        '''\
+        Creates and returns a :class:`SortedValueIndex` instance using
+        :attr:`key_type`.
+        '''
+        return SortedValueIndex(self._key_type)
+
+
 class AttributeValueIndexer(Indexer):
     '''\
     An abstract :class:`Indexer` base class which selects
@@ -368,7 +842,7 @@ class AttributeValueIndexer(Indexer):
         :const:`False` otherwise.
         '''
         return (isinstance(node, self._node_class)
-            and self._attribute_name in node.attributes)
+            and self._attribute_name in node._attribute_values())
 
     def extract_items(self, node):
         '''\
@@ -376,6 +850,7 @@ class AttributeValueIndexer(Indexer):
         :attr:`attribute_name` on ``node`` as first item and the attribute
         itself as second item.
         '''
+        # The attribute is the indexed value, so it has to be created.
         attribute = node.attributes[self._attribute_name]
         return (attribute.value, attribute)
 
@@ -399,8 +874,53 @@ class ElementByUniqueAttributeValueIndexer(UniqueValueIndexer,
         :attr:`AttributeValueIndexer.attribute_name` on ``node`` as first item
         and ``node`` as second item.
         '''
-        attribute = node.attributes[self._attribute_name]
-        return (attribute.value, node)
+        return (node._attribute_values()[self._attribute_name], node)
+
+
+class ElementsBySortedAttributeValueIndexer(SortedValueIndexer,
+        AttributeValueIndexer):
+    '''\
+    An :class:`Indexer` implementation creating a :class:`SortedValueIndex`
+    of elements having an attribute with the name equal to ``attribute_name``
+    identified by the value of that attribute.
+
+    :param attribute_name: defines
+        :attr:`AttributeValueIndexer.attribute_name`
+    :param key_type: defines :attr:`SortedValueIndexer.key_type`
+    :param element_name: defines :attr:`element_name`
+    '''
+    def __init__(self, attribute_name, key_type=None, element_name=None):
+        AttributeValueIndexer.__init__(self, attribute_name)
+        SortedValueIndexer.__init__(self, key_type)
+        self._element_name = element_name
+
+    @property
+    def element_name(self):
+        '''\
+        If this is not :const:`None` only elements with this name are
+        indexed.
+        '''
+        return self._element_name
+
+    def node_predicate(self, node):
+        '''\
+        Returns :const:`True` if ``node`` is an :class:`ecoxipy.pyxom.Element`
+        instance, has an attribute with name
+        :attr:`AttributeValueIndexer.attribute_name` and has the name
+        :attr:`element_name` (if it is not :const:`None`), :const:`False`
+        otherwise.
+        '''
+        return (AttributeValueIndexer.node_predicate(self, node)
+            and (self._element_name is None
+                or node.name == self._element_name))
+
+    def extract_items(self, node):
+        '''\
+        Returns a 2-:func:`tuple` with the value of the attribute with name
+        :attr:`AttributeValueIndexer.attribute_name` on ``node`` as first item
+        and ``node`` as second item.
+        '''
+        return (node._attribute_values()[self._attribute_name], node)
 
 
 class ElementsByNameIndexer(MultiValueIndexer):
@@ -427,6 +947,20 @@ class ElementsByNameIndexer(MultiValueIndexer):
         return (node.name, node)
 
 
+class _AttributeReference(object):
+    # Refers to the attribute with the given name of an element. References
+    # are compared by identity, as the same reference is registered under
+    # the namespace URI and the local name.
+    __slots__ = {'_element', '_name'}
+
+    def __init__(self, element, name):
+        self._element = element
+        self._name = name
+
+    def resolve(self):
+        return self._element.attributes[self._name]
+
+
 class NamespaceIndex(object):
     '''\
     An index holding XML namespace information.
@@ -448,6 +982,18 @@ class NamespaceIndex(object):
         self._by_namespace_uri[namespace_uri] = node
         self._by_local_name[local_name] = node
 
+    @property
+    def entry_count(self):
+        '''\
+        The number of registered nodes.
+        '''
+        return self._by_namespace_uri.value_count()
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self)
+            + _dict_sizeof(self._by_namespace_uri)
+            + _dict_sizeof(self._by_local_name))
+
     def __call__(self, uri=True, local_name=True):
         '''\
         Retrieve an iterator over the nodes with the namespace information
@@ -477,12 +1023,16 @@ class NamespaceIndex(object):
                         yield node
         if uri is True:
             if local_name is True:
-                return all()
-            return self._by_local_name[local_name]
-        if local_name is True:
-            return self._by_namespace_uri[uri]
-        return iter(self._by_namespace_uri(uri).intersection(
-            self._by_local_name(local_name)))
+                nodes = all()
+            else:
+                nodes = self._by_local_name[local_name]
+        elif local_name is True:
+            nodes = self._by_namespace_uri[uri]
+        else:
+            nodes = self._by_namespace_uri(uri).intersection(
+                self._by_local_name(local_name))
+        return (node.resolve() if node.__class__ is _AttributeReference
+            else node for node in nodes)
 
 
 class NamespaceIndexer(Indexer):
@@ -497,12 +1047,16 @@ class NamespaceIndexer(Indexer):
         return isinstance(node, self._node_class)
 
     def extract_items(self, node):
-        create_item = lambda node: ((node.namespace_uri, node.local_name),
-            node)
+        # Attributes are registered as references, which are resolved when
+        # they are retrieved, so indexing does not create them.
+        from ._attributes import _attribute_namespace_uri
         def iterator():
-            yield create_item(node)
-            for attribute in node.attributes.values():
-                yield create_item(attribute)
+            yield (node.namespace_uri, node.local_name), node
+            for name in node._attribute_values():
+                prefix, local_name = _helpers.get_qualified_name_components(
+                    name)
+                yield ((_attribute_namespace_uri(node, prefix), local_name),
+                    _AttributeReference(node, name))
         return iterator()
 
     def register(self, index, key, value):
@@ -510,6 +1064,598 @@ class NamespaceIndexer(Indexer):
         index.register(namespace_uri, local_name, value)
 
 
+class PathIndex(collections.Mapping):
+    '''\
+    An index of elements by their path, i.e. the names of the elements from
+    the indexed root to the element (which are the ancestors being elements
+    and the element itself). Entries are created using :meth:`register`, the
+    parent of an element must be registered before the element.
+
+    The keys are path strings like ``/feed/entry/link``, which match the
+    elements with exactly this path. On value access also suffix paths like
+    ``//entry/link`` can be used, which match the elements whose path ends
+    with the given names. Value access returns an iterator over the matching
+    elements in the order of their registration. Exact paths take time
+    proportional to the number of results ``m``, suffix paths matching ``p``
+    distinct paths take ``O(m log p)`` time.
+    '''
+    def __init__(self):
+        self._element_paths = {}
+        self._elements_by_path = {}
+        self._orders_by_path = {}
+        self._paths_by_suffix = {}
+        self._registration_count = 0
+
+    def register(self, name, element):
+        '''\
+        Registers ``element`` under the path of its parent extended by
+        ``name``.
+
+        :param name: the name of the element
+        :type name: Unicode string
+        :param element: the element to register
+        :type element: :class:`ecoxipy.pyxom.Element`
+        '''
+        path = self._element_paths.get(element.parent, ()) + (name,)
+        try:
+            elements = self._elements_by_path[path]
+        except KeyError:
+            elements = []
+            self._elements_by_path[path] = elements
+            self._orders_by_path[path] = []
+            for i in range(len(path)):
+                suffix = path[i:]
+                try:
+                    self._paths_by_suffix[suffix].append(path)
+                except KeyError:
+                    self._paths_by_suffix[suffix] = [path]
+        else:
+            path = self._element_paths[elements[0]]
+        elements.append(element)
+        self._orders_by_path[path].append(self._registration_count)
+        self._registration_count += 1
+        self._element_paths[element] = path
+
+    @staticmethod
+    def _format(path):
+        return u'/' + u'/'.join(path)
+
+    @staticmethod
+    def _parse(path):
+        path = _unicode(path)
+        if path.startswith(u'//'):
+            return True, tuple(path[2:].split(u'/'))
+        if path.startswith(u'/'):
+            return False, tuple(path[1:].split(u'/'))
+        raise ValueError(
+            u'The path "{}" does not start with "/".'.format(path))
+
+    def path(self, element):
+        '''\
+        Retrieves the path of an element.
+
+        :param element: the element to get the path of
+        :type element: :class:`ecoxipy.pyxom.Element`
+        :returns: the path, e.g. ``/feed/entry/link``
+        :rtype: Unicode string
+        :raises KeyError: if ``element`` is not registered
+        '''
+        return self._format(self._element_paths[element])
+
+    def __getitem__(self, path):
+        is_suffix, names = self._parse(path)
+        if not is_suffix:
+            return iter(self._elements_by_path[names])
+        paths = self._paths_by_suffix[names]
+        if len(paths) == 1:
+            return iter(self._elements_by_path[paths[0]])
+        def iterator():
+            # The registration orders are unique, so elements are never
+            # compared.
+            for order, element in _heapq.merge(*[
+                    zip(self._orders_by_path[matching_path],
+                        self._elements_by_path[matching_path])
+                    for matching_path in paths]):
+                yield element
+        return iterator()
+
+    def __contains__(self, path):
+        is_suffix, names = self._parse(path)
+        if is_suffix:
+            return names in self._paths_by_suffix
+        return names in self._elements_by_path
+
+    def __len__(self):
+        return len(self._elements_by_path)
+
+    def __iter__(self):
+        for path in self._elements_by_path:
+            yield self._format(path)
+
+    @property
+    def entry_count(self):
+        '''\
+        The number of registered elements.
+        '''
+        return len(self._element_paths)
+
+    def __sizeof__(self):
+        size = (object.__sizeof__(self) + _sys.getsizeof(self._element_paths)
+            + _sys.getsizeof(self._elements_by_path)
+            + _sys.getsizeof(self._orders_by_path)
+            + _sys.getsizeof(self._paths_by_suffix))
+        for path, elements in self._elements_by_path.items():
+            size += (_sys.getsizeof(path) + _sys.getsizeof(elements)
+                + _sys.getsizeof(self._orders_by_path[path]))
+        for suffix, paths in self._paths_by_suffix.items():
+            size += _sys.getsizeof(suffix) + _sys.getsizeof(paths)
+        return size
+
+    def __repr__(self):
+        return u'{}.{}({})'.format(self.__class__.__module__,
+            self.__class__.__name__, repr(sorted(self)))
+
+
+class PathIndexer(Indexer):
+    '''\
+    An :class:`Indexer` implementation creating a :class:`PathIndex` of the
+    :class:`ecoxipy.pyxom.Element` instances.
+    '''
+    def __init__(self):
+        from ._element import Element
+        self._node_class = Element
+
+    def new_index(self):
+        '''\
+        Creates and returns a :class:`PathIndex` instance.
+        '''
+        return PathIndex()
+
+    def node_predicate(self, node):
+        '''\
+        Returns :const:`True` if ``node`` is an :class:`ecoxipy.pyxom.Element`
+        instance, :const:`False` otherwise.
+        '''
+        return isinstance(node, self._node_class)
+
+    def extract_items(self, node):
+        '''\
+        Returns a 2-:func:`tuple` with the name of ``node`` as first item
+        and ``node`` as second item.
+        '''
+        return (node.name, node)
+
+    def register(self, index, name, node):
+        '''\
+        Registers ``node`` by calling ``register(name, node)`` on ``index``.
+        '''
+        index.register(name, node)
+
+
+def _default_normalizer(token):
+    return token.lower()
+
+
+class TextIndex(collections.Mapping):
+    '''\
+    An inverted index mapping terms to the nodes (usually
+    :class:`ecoxipy.pyxom.Element` instances) containing
+    :class:`ecoxipy.pyxom.Text` nodes with the terms. Entries are created
+    using :meth:`register`. Value access returns an iterator over the nodes
+    containing the term, the key is normalized first.
+
+    The position of each term occurrence within the text of the containing
+    node is recorded, which allows for :meth:`phrase` queries. The text of a
+    node consists of the content of its :class:`ecoxipy.pyxom.Text` children
+    in document order, text in child elements is not part of it. Terms of
+    text nodes separated by other nodes (e.g. child elements) are not
+    adjacent, so phrases do not match across them:
+
+    >>> from ecoxipy import MarkupBuilder
+    >>> b = MarkupBuilder()
+    >>> p = b.p('hello ', b.b('big'), ' world, hello ', 'world')
+    >>> index = TextIndexer()(p)
+    >>> list(index.phrase('hello world')) == [p]
+    True
+    >>> list(index.phrase('world hello')) == [p]
+    True
+    >>> list(index.phrase('hello big'))
+    []
+
+    :param tokenizer: A callable returning the tokens of a Unicode string as
+        an iterable.
+    :param normalizer: A callable normalizing tokens, it returns the term for
+        a token. If it returns :const:`None` or an empty string, the token is
+        ignored.
+    '''
+    def __init__(self, tokenizer, normalizer):
+        self._tokenizer = tokenizer
+        self._normalizer = normalizer
+        self._postings = {}
+        self._next_positions = {}
+        self._entry_count = 0
+        from ._content_nodes import Text
+        self._text_class = Text
+
+    def terms(self, text):
+        '''\
+        Tokenizes and normalizes ``text``.
+
+        :param text: the text to retrieve the terms of
+        :type text: Unicode string
+        :returns: a :func:`list` of the terms
+        '''
+        return _text_terms(text, self._tokenizer, self._normalizer)
+
+    def register(self, term, text_node):
+        '''\
+        Registers an occurence of ``term`` as the next term of the parent of
+        ``text_node``. The text nodes of a parent must be registered in
+        document order.
+
+        :param term: the normalized term
+        :type term: Unicode string
+        :param text_node: the node containing the term
+        :type text_node: :class:`ecoxipy.pyxom.Text`
+        '''
+        node = text_node.parent
+        try:
+            position, last_text_node = self._next_positions[node]
+        except KeyError:
+            position = 0
+        else:
+            if text_node is not last_text_node:
+                # Leave a gap unless only text nodes lie in between.
+                sibling = text_node.previous
+                while (sibling is not last_text_node
+                        and isinstance(sibling, self._text_class)):
+                    sibling = sibling.previous
+                if sibling is not last_text_node:
+                    position += 1
+        self._next_positions[node] = (position + 1, text_node)
+        try:
+            nodes = self._postings[term]
+        except KeyError:
+            nodes = {}
+            self._postings[term] = nodes
+        try:
+            nodes[node].append(position)
+        except KeyError:
+            nodes[node] = [position]
+        self._entry_count += 1
+
+    def _normalize(self, term):
+        return self._normalizer(_unicode(term))
+
+    def __getitem__(self, term):
+        return iter(self._postings[self._normalize(term)])
+
+    def __contains__(self, term):
+        return self._normalize(term) in self._postings
+
+    def __len__(self):
+        return len(self._postings)
+
+    def __iter__(self):
+        return iter(self._postings)
+
+    def _postings_of(self, terms):
+        postings = []
+        for term in terms:
+            try:
+                postings.append(self._postings[term])
+            except KeyError:
+                return None
+        return postings
+
+    def _all(self, terms):
+        postings = self._postings_of(terms)
+        if not postings:
+            return set()
+        postings.sort(key=len)
+        nodes = set(postings[0])
+        for term_postings in postings[1:]:
+            nodes.intersection_update(term_postings)
+            if len(nodes) == 0:
+                break
+        return nodes
+
+    def all(self, *terms):
+        '''\
+        Retrieves the nodes containing all of the given terms.
+
+        :param terms: The terms to find, they are normalized first.
+        :returns: an iterator over the nodes
+        '''
+        return iter(self._all([self._normalize(term) for term in terms]))
+
+    def any(self, *terms):
+        '''\
+        Retrieves the nodes containing any of the given terms.
+
+        :param terms: The terms to find, they are normalized first.
+        :returns: an iterator over the nodes
+        '''
+        nodes = set()
+        for term in terms:
+            try:
+                nodes.update(self._postings[self._normalize(term)])
+            except KeyError:
+                pass
+        return iter(nodes)
+
+    def phrase(self, text):
+        '''\
+        Retrieves the nodes containing the terms of ``text`` in sequence.
+
+        :param text: The phrase to find, it is tokenized and normalized with
+            the tokenizer and normalizer of the index.
+        :type text: Unicode string
+        :returns: an iterator over the nodes
+        '''
+        terms = self.terms(_unicode(text))
+        postings = self._postings_of(terms)
+        if not postings:
+            return iter(())
+        def iterator():
+            for node in self._all(terms):
+                first_positions = postings[0][node]
+                other_positions = [set(term_postings[node])
+                    for term_postings in postings[1:]]
+                for position in first_positions:
+                    for offset, positions in enumerate(other_positions):
+                        if position + offset + 1 not in positions:
+                            break
+                    else:
+                        yield node
+                        break
+        return iterator()
+
+    @property
+    def entry_count(self):
+        '''\
+        The number of registered term occurences.
+        '''
+        return self._entry_count
+
+    def __sizeof__(self):
+        size = (object.__sizeof__(self) + _sys.getsizeof(self._postings)
+            + _sys.getsizeof(self._next_positions))
+        for term, nodes in self._postings.items():
+            size += _sys.getsizeof(term) + _sys.getsizeof(nodes)
+            for positions in nodes.values():
+                size += _sys.getsizeof(positions)
+        return size
+
+    def __repr__(self):
+        return u'{}.{}({})'.format(self.__class__.__module__,
+            self.__class__.__name__, repr(sorted(self._postings)))
+
+
+def _text_terms(text, tokenizer, normalizer):
+    terms = []
+    for token in tokenizer(text):
+        term = normalizer(token)
+        if term:
+            terms.append(term)
+    return terms
+
+
+class TextIndexer(Indexer):
+    '''\
+    An :class:`Indexer` implementation creating a :class:`TextIndex` from
+    the :class:`ecoxipy.pyxom.Text` nodes.
+
+    :param tokenizer: Defines :attr:`tokenizer`, if it is :const:`None` the
+        text is split into sequences of Unicode word characters.
+    :param normalizer: Defines :attr:`normalizer`, if it is :const:`None`
+        tokens are converted to lower case.
+    '''
+    def __init__(self, tokenizer=None, normalizer=None):
+        if tokenizer is None:
+            import re
+            tokenizer = re.compile(u'\\w+', re.UNICODE).findall
+        if normalizer is None:
+            normalizer = _default_normalizer
+        self._tokenizer = tokenizer
+        self._normalizer = normalizer
+        from ._content_nodes import Text
+        self._node_class = Text
+
+    @property
+    def tokenizer(self):
+        '''\
+        The callable returning the tokens of a Unicode string as an iterable.
+        '''
+        return self._tokenizer
+
+    @property
+    def normalizer(self):
+        '''\
+        The callable returning the term for a token, tokens for which it
+        returns :const:`None` or an empty string are ignored.
+        '''
+        return self._normalizer
+
+    def new_index(self):
+        '''\
+        Creates and returns a :class:`TextIndex` using :attr:`tokenizer` and
+        :attr:`normalizer`.
+        '''
+        return TextIndex(self._tokenizer, self._normalizer)
+
+    def node_predicate(self, node):
+        '''\
+        Returns :const:`True` if ``node`` is a :class:`ecoxipy.pyxom.Text`
+        instance with a parent, :const:`False` otherwise.
+        '''
+        return isinstance(node, self._node_class) and node.parent is not None
+
+    def extract_items(self, node):
+        '''\
+        Returns an iterator over 2-:func:`tuple` instances, having the terms
+        of the content of ``node`` as first item and ``node`` as second item.
+        '''
+        return iter([(term, node) for term in _text_terms(node.content,
+            self._tokenizer, self._normalizer)])
+
+    def register(self, index, term, node):
+        '''\
+        Registers ``term`` of ``node`` by calling ``register(term, node)`` on
+        ``index``.
+        '''
+        index.register(term, node)
+
+
+class IndexStatistics(collections.namedtuple('IndexStatistics',
+        ['entries', 'size', 'builds', 'hits'])):
+    '''\
+    A :func:`collections.namedtuple` describing an index held by an
+    :class:`IndexCache`.
+
+    :attr:`entries`
+        The number of values registered on the index, this is ``0`` if the
+        index is not built.
+
+    :attr:`size`
+        The approximate memory in bytes used by the index data structure
+        (not counting the indexed nodes), this is ``0`` if the index is not
+        built.
+
+    :attr:`builds`
+        How often the index was built.
+
+    :attr:`hits`
+        How often the index was retrieved without building it.
+    '''
+    __slots__ = ()
+
+
+class IndexCache(object):
+    '''\
+    Holds the indexes created by :class:`IndexDescriptor` instances for one
+    indexed object (e.g. a :class:`ecoxipy.pyxom.Document`), which owns the
+    cache. The indexes are identified by the attribute name of the
+    descriptor.
+
+    Indexes are held until they are explicitly invalidated by calling
+    :meth:`invalidate` or deleting the descriptor attribute on the owner.
+
+    The cache may be used by multiple threads concurrently: building indexes
+    is guarded by a lock, so an index requested by several threads at once
+    is built only once. Retrieving built indexes does not lock, thus the
+    :attr:`IndexStatistics.hits` may miss some retrievals in that case.
+    '''
+    def __init__(self):
+        self._indexes = {}
+        self._builds = {}
+        self._hits = {}
+        self._lock = _threading.RLock()
+
+    def get(self, name, indexer, root_node, declared=None):
+        '''\
+        Returns the index identified by ``name``, if it does not exist it is
+        created by calling ``indexer`` with ``root_node`` as the argument.
+
+        :param name: the identifier of the index
+        :param indexer: the indexer to create the index with
+        :type indexer: :class:`Indexer`
+        :param root_node: the node to create the index on
+        :param declared: If this is not :const:`None` it should be a mapping
+            of index names to indexers. If the requested index must be built,
+            the indexes of this mapping that are not yet built are built
+            along with it, using a single traversal.
+        :returns: the index
+        '''
+        try:
+            index = self._indexes[name]
+        except KeyError:
+            with self._lock:
+                try:
+                    # another thread may have built the index meanwhile
+                    return self._indexes[name]
+                except KeyError:
+                    pass
+                indexers = {name: indexer}
+                if declared is not None:
+                    for declared_name in declared:
+                        if declared_name not in self._indexes:
+                            indexers[declared_name] = declared[declared_name]
+                self.build(root_node, indexers)
+                return self._indexes[name]
+        self._hits[name] = self._hits.get(name, 0) + 1
+        return index
+
+    def build(self, root_node, indexers):
+        '''\
+        Builds indexes in one traversal using a :class:`MultiIndexer`,
+        replacing already existing indexes with the same names.
+
+        :param root_node: the node to create the indexes on
+        :param indexers: a mapping of index names to the :class:`Indexer`
+            instances to build the indexes with
+        '''
+        names = list(indexers)
+        with self._lock:
+            if len(names) == 1:
+                indexes = [indexers[names[0]](root_node)]
+            else:
+                multi_indexer = MultiIndexer(
+                    *[indexers[name] for name in names])
+                indexes = multi_indexer(root_node)
+            for name, index in zip(names, indexes):
+                self._indexes[name] = index
+                self._builds[name] = self._builds.get(name, 0) + 1
+
+    def invalidate(self, name=None):
+        '''\
+        Removes the index identified by ``name`` or all indexes if ``name`` is
+        :const:`None`. Indexes which are not built are ignored.
+        '''
+        if name is None:
+            self._indexes.clear()
+        else:
+            try:
+                del self._indexes[name]
+            except KeyError:
+                pass
+
+    def __contains__(self, name):
+        return name in self._indexes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __iter__(self):
+        return iter(self._indexes)
+
+    def statistics(self, name=None):
+        '''\
+        Retrieves statistics about the indexes.
+
+        :param name: If this is :const:`None` a :class:`dict` mapping the
+            names of all indexes ever built to their statistics is returned,
+            otherwise the statistics for the index identified by ``name``.
+        :returns: :class:`IndexStatistics` instances
+        :raises KeyError: if ``name`` is given and no such index was ever
+            built.
+        '''
+        if name is None:
+            return dict((name, self.statistics(name)) for name in self._builds)
+        builds = self._builds[name]
+        hits = self._hits.get(name, 0)
+        try:
+            index = self._indexes[name]
+        except KeyError:
+            return IndexStatistics(0, 0, builds, hits)
+        return IndexStatistics(_entry_count(index), _sys.getsizeof(index),
+            builds, hits)
+
+    def __repr__(self):
+        return u'{}.{}({})'.format(self.__class__.__module__,
+            self.__class__.__name__, repr(sorted(self._indexes)))
+
+
 class IndexDescriptor(object):
     '''\
     A descriptor handling index creation using a given :class:`Indexer`.
@@ -525,18 +1671,21 @@ class IndexDescriptor(object):
     Attribute setting is not allowed by the descriptor. Deletion deletes the
     index for the instance.
 
+    If the index must be built, the other indexes declared as
+    :class:`IndexDescriptor` attributes on the class of the instance which
+    are not yet built are created along with it, using a
+    :class:`MultiIndexer` to traverse the structure only once.
+
     **Important:** This class does not hold track of changes in the indexed
     structures for performance reasons. It is the responsibility of using
     code to ensure the index is deleted after an instance is modified.
 
-    This descriptor does not modify the indexed instance, instead it holds a
-    :class:`weakref.WeakValueDictionary`, mapping instance IDs (as generated
-    by :func:`id`) to the generated index for the instance.
+    The indexes are stored in the :class:`IndexCache` instance retrieved as
+    the attribute ``index_cache`` of the indexed instance, identified by the
+    name of the attribute the descriptor is defined as.
     '''
     def __init__(self, indexer):
         self._indexer = indexer
-        from weakref import WeakValueDictionary
-        self._indexes = WeakValueDictionary()
 
     @property
     def indexer(self):
@@ -545,25 +1694,60 @@ class IndexDescriptor(object):
         '''
         return self._indexer
 
+    @staticmethod
+    def declared(owner):
+        '''\
+        Retrieves the :class:`IndexDescriptor` instances defined on a class.
+
+        :param owner: the class to retrieve the descriptors of
+        :returns: a :class:`dict` mapping attribute names to the descriptors
+        '''
+        descriptors = {}
+        for cls in reversed(owner.__mro__):
+            for name, value in vars(cls).items():
+                if isinstance(value, IndexDescriptor):
+                    descriptors[name] = value
+                elif name in descriptors:
+                    del descriptors[name]
+        return descriptors
+
+    def _name(self, owner):
+        try:
+            return self._v_name
+        except AttributeError:
+            for name, descriptor in self.declared(owner).items():
+                if descriptor is self:
+                    self._v_name = name
+                    return name
+            raise AttributeError(
+                'The descriptor is not an attribute of "{}".'.format(owner))
+
     def __get__(self, instance, owner):
         if instance is None:
             return self
-        instance_id = id(instance)
-        try:
-            index = self._indexes[instance_id]
-        except KeyError:
-            index = self._indexer(instance)
-            self._indexes[instance_id] = index
-        return index
+        name = self._name(owner)
+        index_cache = instance.index_cache
+        if name in index_cache:
+            return index_cache.get(name, self._indexer, instance)
+        return index_cache.get(name, self._indexer, instance, dict(
+            (declared_name, descriptor.indexer)
+            for declared_name, descriptor in self.declared(owner).items()
+        ))
 
     def __set__(self, instance, value):
         raise AttributeError('No setting allowed.')
 
     def __delete__(self, instance):
-        instance_id = id(instance)
+        instance.index_cache.invalidate(self._name(instance.__class__))
+
+
+def _entry_count(index):
+    try:
+        return index.entry_count
+    except AttributeError:
         try:
-            del self._indexes[instance_id]
-        except KeyError:
-            pass
+            return len(index)
+        except TypeError:
+            return None
 
 del abc, collections, metaclass
\ No newline at end of file
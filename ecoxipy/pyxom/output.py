@@ -49,6 +49,28 @@ Creating a document and retrieving the byte string:
 >>> bytes(document) == document_string.encode('UTF-8')
 True
 
+Documents containing data often contain many equal short texts. A
+:class:`TextInterner` lets those :class:`ecoxipy.pyxom.Text` nodes share
+their content strings, while the nodes stay distinct objects:
+
+>>> from ecoxipy.parsing import MarkupHandler
+>>> interner = TextInterner()
+>>> handler = MarkupHandler(PyXOMOutput(intern_text=interner))
+>>> document = handler.parse(
+...     b'<data><v>true</v><v>true</v><v>false</v><v>true</v></data>')
+>>> first, second = [element[0] for element in document[0][:2]]
+>>> first is second
+False
+>>> first == second
+True
+>>> first.content is second.content
+True
+>>> statistics = interner.statistics
+>>> statistics.entries, statistics.lookups, statistics.hits
+(2, 4, 2)
+>>> statistics.saved > 0
+True
+
 For more examples see :mod:`ecoxipy.pyxom`.
 
 
@@ -56,11 +78,111 @@ For more examples see :mod:`ecoxipy.pyxom`.
 ------------------------------
 
 .. autoclass:: ecoxipy.pyxom.output.PyXOMOutput
+
+
+Interning Text
+--------------
+
+.. autoclass:: ecoxipy.pyxom.output.TextInterner
+
+.. autoclass:: ecoxipy.pyxom.output.InternStatistics
 '''
 
+import collections
+import sys
+
 from ecoxipy import Output, _unicode, pyxom
 
 
+class InternStatistics(collections.namedtuple('InternStatistics',
+        ['entries', 'lookups', 'hits', 'saved'])):
+    '''\
+    A :func:`collections.namedtuple` describing the state of a
+    :class:`TextInterner`.
+
+    :attr:`entries`
+        The number of strings in the table.
+
+    :attr:`lookups`
+        How often a string was interned.
+
+    :attr:`hits`
+        How often an equal string was found in the table.
+
+    :attr:`saved`
+        The approximate memory in bytes of the strings which were replaced by
+        strings from the table.
+    '''
+    __slots__ = ()
+
+
+class TextInterner(object):
+    '''\
+    Deduplicates text content strings: :meth:`intern` returns an equal
+    string from its table if there is one, so equal texts share a single
+    string object.
+
+    The table is bounded: at most ``max_entries`` strings are stored and
+    only strings of at most ``max_length`` characters are considered, as
+    those are the ones most likely to be repeated (e.g. numbers, status
+    codes and booleans). When the table is full, strings not yet in it are
+    returned unchanged.
+
+    :param max_entries: The maximum number of strings in the table.
+    :type max_entries: :func:`int`
+    :param max_length: The maximum length of strings to intern.
+    :type max_length: :func:`int`
+    '''
+    __slots__ = {'_table', '_max_entries', '_max_length', '_lookups',
+        '_hits', '_saved'}
+
+    def __init__(self, max_entries=65536, max_length=64):
+        self._max_entries = max_entries
+        self._max_length = max_length
+        self.clear()
+
+    def intern(self, content):
+        '''\
+        Retrieves the string from the table which is equal to ``content``,
+        adding ``content`` to the table if there is no such string and the
+        table is not full.
+
+        :param content: The string to intern.
+        :returns: ``content`` or an equal string.
+        '''
+        if len(content) > self._max_length:
+            return content
+        self._lookups += 1
+        table = self._table
+        try:
+            interned = table[content]
+        except KeyError:
+            if len(table) < self._max_entries:
+                table[content] = content
+            return content
+        if interned is not content:
+            self._hits += 1
+            self._saved += sys.getsizeof(content)
+        return interned
+
+    @property
+    def statistics(self):
+        '''\
+        The current :class:`InternStatistics`.
+        '''
+        return InternStatistics(len(self._table), self._lookups, self._hits,
+            self._saved)
+
+    def clear(self):
+        '''\
+        Empties the table and resets the statistics.
+        '''
+        self._table = {}
+        self._lookups = 0
+        self._hits = 0
+        self._saved = 0
+
+
 class PyXOMOutput(Output):
     '''\
     An :class:`Output` implementation which creates
@@ -69,15 +191,32 @@ class PyXOMOutput(Output):
     :param check_well_formedness: The attribute
         :attr:`check_well_formedness` is determined by this value.
     :type check_well_formedness: :func:`bool`
+    :param intern_text: If this is :const:`True` a :class:`TextInterner` is
+        created, which may also be given directly (e.g. to share it between
+        outputs). The :attr:`text_interner` deduplicates the content of the
+        created :class:`ecoxipy.pyxom.Text` nodes.
+    :type intern_text: :func:`bool` or :class:`TextInterner`
     '''
-    def __init__(self, check_well_formedness=False):
+    def __init__(self, check_well_formedness=False, intern_text=False):
         self._check_well_formedness = bool(check_well_formedness)
+        if intern_text is True:
+            intern_text = TextInterner()
+        elif not intern_text:
+            intern_text = None
+        self._text_interner = intern_text
 
     @property
     def check_well_formedness(self):
         '''If :const:`True` the nodes will be checked for valid values.'''
         return self._check_well_formedness
 
+    @property
+    def text_interner(self):
+        '''\
+        The :class:`TextInterner` used for text content or :const:`None`.
+        '''
+        return self._text_interner
+
     @staticmethod
     def is_native_type(content):
         '''\
@@ -106,10 +245,14 @@ class PyXOMOutput(Output):
 
     def text(self, content):
         '''\
-        Creates a :class:`ecoxipy.pyxom.Text` node.
+        Creates a :class:`ecoxipy.pyxom.Text` node. If there is a
+        :attr:`text_interner` it is used to deduplicate ``content``, the
+        node itself is always a new object.
 
         :rtype: :class:`ecoxipy.pyxom.Text`
         '''
+        if self._text_interner is not None:
+            content = self._text_interner.intern(content)
         return pyxom.Text(content)
 
     def comment(self, content):
@@ -33,6 +33,24 @@ Usage Example:
 >>> xml == u"""<?xml version="1.0"?>\\n<!DOCTYPE section><section attr="'&quot;&lt;&amp;&gt;"><p>Hello World!</p><p>äöüß</p><p>&lt;&amp;&gt;</p><raw/>text<br/>012345<!--<This is a comment!>--><?pi-target <PI content>?><?pi-without-content?></section>"""
 True
 
+The encoded document is also available in chunks:
+
+>>> chunks = list(xml.iter_encoded(16))
+>>> len(chunks[0])
+16
+>>> b''.join(chunks) == xml.encoded
+True
+
+Encodings with a byte order mark, like UTF-16, write it only once:
+
+>>> utf16 = xml_output.document(None, None, None,
+...     [xml_output.text(u'äöüß <&> ' * 4)], True, u'UTF-16')
+>>> chunks = list(utf16.iter_encoded(10))
+>>> len(chunks) > 1
+True
+>>> b''.join(chunks).decode('UTF-16') == utf16.encode('UTF-16').decode('UTF-16')
+True
+
 >>> from ecoxipy import XMLWellFormednessException
 >>> def catch_not_well_formed(method, *args):
 ...     try:
@@ -57,6 +75,7 @@ The value "invalid PI content ?>" is not a valid XML processing instruction cont
 The value "invalid XML comment --" is not a valid XML comment because it contains "--".
 '''
 
+import codecs
 from xml.sax.saxutils import quoteattr, escape
 
 from ecoxipy import Output, _python2, _unicode, _helpers
@@ -91,10 +110,11 @@ class StringOutput(Output):
         self._join = u''.join
         self._format_element = u'<{0}{1}>{2}</{0}>'.format
         self._format_element_empty = u'<{}{}/>'.format
+        self._format_element_start = u'<{}{}>'.format
+        self._format_element_end = u'</{}>'.format
         self._format_attribute = u' {}={}'.format
         self._format_pi = u'<?{}{}?>'.format
         self._format_comment = u'<!--{}-->'.format
-        self._format_document = u'{}{}{}'.format
         self._format_xml_declaration = u'<?xml version="1.0" encoding="{}"?>\n'.format
         self._xml_declaration_no_encoding = u'<?xml version="1.0"?>\n'
         self._format_doctype_empty = u'<!DOCTYPE {}>'.format
@@ -119,6 +139,26 @@ class StringOutput(Output):
             quoteattr(value, self._entities)
         )
 
+    def _prepare_attributes(self, attributes):
+        return self._join([
+            self._prepare_attribute(attr_name, attr_value)
+            for attr_name, attr_value in attributes.items()
+        ])
+
+    def _element_tags(self, name, attributes, empty):
+        '''\
+        Creates the start and end tag of an element. If ``empty`` is
+        :const:`True` the first is an empty element tag and the latter is
+        :const:`None`.
+        '''
+        self._check_name(name)
+        name = self._prepare_text(name)
+        attributes = self._prepare_attributes(attributes)
+        if empty:
+            return self._format_element_empty(name, attributes), None
+        return (self._format_element_start(name, attributes),
+            self._format_element_end(name))
+
     @staticmethod
     def is_native_type(content):
         '''\
@@ -141,10 +181,7 @@ class StringOutput(Output):
         '''
         self._check_name(name)
         name = self._prepare_text(name)
-        attributes = self._join([
-            self._prepare_attribute(attr_name, attr_value)
-            for attr_name, attr_value in attributes.items()
-        ])
+        attributes = self._prepare_attributes(attributes)
         if len(children) == 0:
             return XMLFragment(self._format_element_empty(name, attributes))
         return XMLFragment(self._format_element(name, attributes,
@@ -204,6 +241,17 @@ class StringOutput(Output):
             ``doctype_publicid`` is not a valid public ID or
             ``doctype_systemid`` is not a valid system ID.
         '''
+        document = self._document_prolog(doctype_name, doctype_publicid,
+            doctype_systemid, omit_xml_declaration, encoding) + self._join(
+            [child for child in children])
+        return XMLDocument._create(document, encoding)
+
+    def _document_prolog(self, doctype_name, doctype_publicid,
+            doctype_systemid, omit_xml_declaration, encoding):
+        '''\
+        Creates the XML declaration and the document type declaration of a
+        document.
+        '''
         if omit_xml_declaration:
             xml_declaration = u''
         else:
@@ -243,10 +291,7 @@ class StringOutput(Output):
                 doctype = self._format_doctype_public_system(
                     doctype_name, doctype_publicid,
                     systemid_creator(doctype_systemid))
-        document = self._format_document(xml_declaration, doctype,
-            self._join([child for child in children])
-        )
-        return XMLDocument._create(document, encoding)
+        return xml_declaration + doctype
 
     def fragment(self, children):
         '''\
@@ -305,5 +350,35 @@ class XMLDocument(XMLFragment):
             self._v_encoded = self.encode(self._encoding)
             return self._v_encoded
 
+    def iter_encoded(self, chunk_size=65536):
+        '''\
+        Creates an iterator over the document encoded with :attr:`encoding`
+        in chunks, for example to be used as a WSGI response body. If
+        :attr:`encoded` was retrieved before, its data is split into chunks
+        of ``chunk_size`` bytes. Otherwise chunks of ``chunk_size``
+        characters are encoded lazily, so no encoded copy of the whole
+        document is created.
+
+        :param chunk_size: The size of the chunks, only the last chunk may be
+            shorter.
+        :type chunk_size: :func:`int`
+        :returns: An iterator over byte strings.
+        '''
+        try:
+            data = self._v_encoded
+        except AttributeError:
+            return self._encode_chunks(chunk_size)
+        return (data[start:start + chunk_size]
+            for start in range(0, len(data), chunk_size))
+
+    def _encode_chunks(self, chunk_size):
+        # A single incremental encoder keeps the state of encodings like
+        # UTF-16, so a byte order mark is only written once.
+        encode = codecs.getincrementalencoder(self._encoding)().encode
+        length = len(self)
+        for start in range(0, length, chunk_size):
+            end = start + chunk_size
+            yield encode(self[start:end], end >= length)
+
 
 del Output
@@ -8,6 +8,9 @@ def test_suite():
     import ecoxipy.pyxom._document
     import ecoxipy.pyxom.output
     import ecoxipy.pyxom.indexing
+    import ecoxipy.pyxom.compact
+    import ecoxipy.pyxom.binary
+    import ecoxipy.pyxom.events
     import ecoxipy.decorators
     import ecoxipy.parsing
     import ecoxipy.validation
@@ -21,6 +24,9 @@ def test_suite():
     suite.addTests(doctest.DocTestSuite(ecoxipy.pyxom._document))
     suite.addTests(doctest.DocTestSuite(ecoxipy.pyxom.output))
     suite.addTests(doctest.DocTestSuite(ecoxipy.pyxom.indexing))
+    suite.addTests(doctest.DocTestSuite(ecoxipy.pyxom.compact))
+    suite.addTests(doctest.DocTestSuite(ecoxipy.pyxom.binary))
+    suite.addTests(doctest.DocTestSuite(ecoxipy.pyxom.events))
     suite.addTests(doctest.DocTestSuite(ecoxipy.decorators))
     suite.addTests(doctest.DocTestSuite(ecoxipy.parsing))
     suite.addTests(doctest.DocTestSuite(ecoxipy.validation))
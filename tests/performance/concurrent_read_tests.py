@@ -0,0 +1,81 @@
+import sys
+import threading
+import timeit
+
+from ecoxipy.pyxom import Element
+
+from tests.performance.timeit_tests import LOREM_IPSUM
+from tests.performance import ecoxipy_pyxom_output
+
+
+def query(document):
+    elements = []
+    for node in document.descendants():
+        if isinstance(node, Element):
+            elements.append((node.namespace_uri, node.local_name,
+                node.attributes.to_dict(), node.structural_hash,
+                node.parent.index(node), document.order_key(node)))
+    paragraphs = sorted(document.order_key(element)
+        for element in document.elements_by_name[u'p'])
+    return elements, paragraphs, document.create_str()
+
+
+def run_threads(document, thread_count, warm_up):
+    # Reads a lazily created copy of the document from multiple threads and
+    # returns the results of the threads.
+    shared = document.duplicate(copy_on_write=True)
+    if warm_up:
+        shared.warm_up()
+    results = [None] * thread_count
+    barrier = threading.Event()
+
+    def target(number):
+        barrier.wait()
+        results[number] = query(shared)
+
+    threads = [threading.Thread(target=target, args=(number,))
+        for number in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    barrier.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print('''\
+arguments: <repetitions> <data_count> <thread_count>
+
+<repetitions>       Specifies how often the tests should be run.
+
+<data count>        Determines the length of the document, a linear increase
+                    of this value yields exponential test document size
+                    increase.
+
+<thread count>      The number of threads reading the document concurrently.
+''')
+        sys.exit(1)
+    repetitions = int(sys.argv[1])
+    data_count = int(sys.argv[2])
+    thread_count = int(sys.argv[3])
+    # switch threads often to provoke races
+    try:
+        sys.setswitchinterval(1e-6)
+    except AttributeError:
+        sys.setcheckinterval(1)
+    document = ecoxipy_pyxom_output.create_testdoc(u'Test Page',
+        u'Hello World!', data_count, LOREM_IPSUM)
+    expected = query(document.duplicate())
+    print('# ECoXiPy Concurrent Read Performance Tests\n')
+    for name, warm_up in [('on demand', False), ('warmed up', True)]:
+        errors = [0]
+
+        def statement():
+            for result in run_threads(document, thread_count, warm_up):
+                if result != expected:
+                    errors[0] += 1
+
+        print('{: <20} {: >8.3f} secs {: >6} errors'.format(name,
+            timeit.timeit(statement, number=repetitions), errors[0]))
@@ -0,0 +1,86 @@
+import gc
+import sys
+import time
+
+from ecoxipy.pyxom import Element
+
+from tests.performance.timeit_tests import LOREM_IPSUM
+from tests.performance import ecoxipy_pyxom_output
+
+
+def use(document):
+    for node in document.descendants():
+        if isinstance(node, Element):
+            node.namespace_uri
+            node.attributes
+        node.next
+        node.previous
+
+
+def no_teardown(document):
+    pass
+
+
+def dispose(document):
+    document.dispose()
+
+
+def weak_parents(document):
+    pass
+
+
+TESTS = [
+    ('no teardown', no_teardown, False),
+    ('dispose()', dispose, False),
+    ('weak parents', weak_parents, True),
+]
+
+
+def run(data_count, teardown, weak):
+    # Returns the time needed to tear down a used document, the time of the
+    # following garbage collection and the number of objects it collected.
+    document = ecoxipy_pyxom_output.create_testdoc(u'Test Page',
+        u'Hello World!', data_count, LOREM_IPSUM)
+    if weak:
+        document.weak_parents = True
+    use(document)
+    start = time.time()
+    teardown(document)
+    del document
+    teardown_time = time.time() - start
+    start = time.time()
+    collected = gc.collect()
+    return teardown_time, time.time() - start, collected
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('''\
+arguments: <repetitions> <data_count>
+
+<repetitions>       Specifies how often the tests should be run.
+
+<data count>        Determines the length of the document, a linear increase
+                    of this value yields exponential test document size
+                    increase.
+''')
+        sys.exit(1)
+    repetitions = int(sys.argv[1])
+    data_count = int(sys.argv[2])
+    print('# ECoXiPy Garbage Collection Pause Tests\n')
+    print('{: <20} {: >13} {: >13} {: >10}'.format('', 'teardown',
+        'GC pause', 'collected'))
+    gc.disable()
+    try:
+        for name, teardown, weak in TESTS:
+            gc.collect()
+            teardown_time = gc_time = collected = 0
+            for i in range(repetitions):
+                results = run(data_count, teardown, weak)
+                teardown_time += results[0]
+                gc_time += results[1]
+                collected += results[2]
+            print('{: <20} {: >8.3f} secs {: >8.3f} secs {: >10}'.format(
+                name, teardown_time, gc_time, collected))
+    finally:
+        gc.enable()
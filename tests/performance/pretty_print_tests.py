@@ -0,0 +1,41 @@
+import sys
+import timeit
+
+from tests.performance.timeit_tests import LOREM_IPSUM
+
+
+SETUP = '''\
+from io import BytesIO
+from tests.performance import ecoxipy_pyxom_output
+document = ecoxipy_pyxom_output.create_testdoc(u'Test Page', u'Hello World!',
+    {}, u'{}')
+'''
+
+TESTS = [
+    ('SAX events', 'document.create_sax_events(out=BytesIO())'),
+    ('SAX events, pretty',
+        "document.create_sax_events(out=BytesIO(), indent_incr='    ')"),
+    ('write()', 'document.write(BytesIO())'),
+    ('write(), pretty', "document.write(BytesIO(), indent_incr='    ')"),
+]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('''\
+arguments: <repetitions> <data_count>
+
+<repetitions>       Specifies how often the tests should be run by `timeit`.
+
+<data count>        Determines the length of the document, a linear increase
+                    of this value yields exponential test document size
+                    increase.
+''')
+        sys.exit(1)
+    repetitions = int(sys.argv[1])
+    data_count = int(sys.argv[2])
+    setup = SETUP.format(data_count, LOREM_IPSUM)
+    print('# ECoXiPy Pretty Printing Performance Tests\n')
+    for name, statement in TESTS:
+        print('{: <20} {: >8.3f} secs'.format(name,
+            timeit.timeit(statement, setup=setup, number=repetitions)))
@@ -0,0 +1,55 @@
+import sys
+import timeit
+
+from tests.performance.timeit_tests import LOREM_IPSUM
+
+
+SETUP = '''\
+from ecoxipy import MarkupBuilder
+from tests.performance import ecoxipy_pyxom_output
+b = MarkupBuilder()
+document = ecoxipy_pyxom_output.create_testdoc(u'Test Page', u'Hello World!',
+    {}, u'{}')
+document.track_sizes = {}
+body = document[0][1]
+'''
+
+# Splits the appended records into pages of about 16 KiB by querying the
+# size after each modification.
+STATEMENT = '''\
+pages = []
+page = b.div()
+body.append(page)
+for i in range({}):
+    page.append(b.p(u'Record {{}}'.format(i), number=i))
+    if page.serialized_length > 16384:
+        pages.append(page.descendant_count)
+        page = b.div()
+        body.append(page)
+document.serialized_length
+'''
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print('''\
+arguments: <repetitions> <data_count> <record_count>
+
+<repetitions>       Specifies how often the tests should be run by `timeit`.
+
+<data count>        Determines the length of the document, a linear increase
+                    of this value yields exponential test document size
+                    increase.
+
+<record count>      The number of records appended to the document.
+''')
+        sys.exit(1)
+    repetitions = int(sys.argv[1])
+    data_count = int(sys.argv[2])
+    record_count = int(sys.argv[3])
+    statement = STATEMENT.format(record_count)
+    print('# ECoXiPy Subtree Size Performance Tests\n')
+    for name, track_sizes in [('computed', False), ('tracked', True)]:
+        setup = SETUP.format(data_count, LOREM_IPSUM, track_sizes)
+        print('{: <20} {: >8.3f} secs'.format(name,
+            timeit.timeit(statement, setup, number=repetitions)))
@@ -0,0 +1,61 @@
+import sys
+import timeit
+
+from ecoxipy.parsing import MarkupHandler
+from ecoxipy.pyxom.output import PyXOMOutput, TextInterner
+
+
+STATUSES = [u'true', u'false', u'ok', u'failed', u'pending']
+
+
+def create_data(record_count):
+    # Creates a data-heavy XML document consisting of many short, repeated
+    # texts.
+    records = []
+    for number in range(record_count):
+        records.append(
+            u'<record><id>{}</id><status>{}</status><count>{}</count>'
+            u'<active>{}</active></record>'.format(number % 100,
+                STATUSES[number % len(STATUSES)], number % 7,
+                u'true' if number % 3 else u'false'))
+    return u'<data>{}</data>'.format(u''.join(records)).encode('UTF-8')
+
+
+def count_strings(document):
+    # Returns the number of text nodes and of distinct content strings.
+    texts = [node for node in document.descendants()
+        if getattr(node, '_IS_TEXT_NODE', False)]
+    return len(texts), len(set(id(text.content) for text in texts))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('''\
+arguments: <repetitions> <record_count>
+
+<repetitions>       Specifies how often the tests should be run by `timeit`.
+
+<record count>      The number of records in the parsed document, each
+                    containing four short texts.
+''')
+        sys.exit(1)
+    repetitions = int(sys.argv[1])
+    record_count = int(sys.argv[2])
+    data = create_data(record_count)
+    print('# ECoXiPy Text Interning Tests\n')
+    print('{: <20} {: >13} {: >10} {: >10}'.format('', 'parsing', 'texts',
+        'strings'))
+    for name, intern_text in [('not interned', False), ('interned', True)]:
+        def parse():
+            return MarkupHandler(PyXOMOutput(intern_text=intern_text)).parse(
+                data)
+        duration = timeit.timeit(parse, number=repetitions)
+        text_count, string_count = count_strings(parse())
+        print('{: <20} {: >8.3f} secs {: >10} {: >10}'.format(name,
+            duration, text_count, string_count))
+    interner = TextInterner()
+    MarkupHandler(PyXOMOutput(intern_text=interner)).parse(data)
+    statistics = interner.statistics
+    print('\n{} entries, {} of {} lookups hit, {} bytes saved'.format(
+        statistics.entries, statistics.hits, statistics.lookups,
+        statistics.saved))